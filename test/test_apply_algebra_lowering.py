@@ -4,6 +4,9 @@ import pytest
 from ufl import *
 from ufl.compound_expressions import *
 from ufl.algorithms.renumbering import renumber_indices
+from ufl.algorithms.apply_algebra_lowering import apply_algebra_lowering
+from ufl.classes import Determinant, Inverse, Trace
+from ufl.corealg.traversal import unique_pre_traversal
 
 
 @pytest.fixture
@@ -108,3 +111,25 @@ def xtest_pseudo_inverse31(A31):
 def xtest_pseudo_inverse32(A32):
     expected = todo
     assert renumber_indices(inverse_expr(A32)) == renumber_indices(expected)
+
+
+def test_lowering_preserves_types(A3):
+    expr = det(A3) + tr(inv(A3))
+    lowered = apply_algebra_lowering(expr, preserve_types=(Determinant, Inverse))
+    types = set(type(o) for o in unique_pre_traversal(lowered))
+    assert Determinant in types
+    assert Inverse in types
+    assert Trace not in types
+
+
+def test_lowering_inverse_from_cofactor(A2, A3):
+    # The inverse is lowered by inverse_expr by default
+    assert renumber_indices(apply_algebra_lowering(inv(A3))) == renumber_indices(inverse_expr(A3))
+    for A, Av in ((A2, ((1.5, 0.3), (0.2, 2.0))),
+                  (A3, ((1.5, 0.3, 0.1), (0.2, 2.0, 0.4), (0.3, 0.5, 1.7)))):
+        lowered = apply_algebra_lowering(inv(A), share_cofactors=True)
+        expected = inverse_expr(A)
+        n = len(Av)
+        for i in range(n):
+            for j in range(n):
+                assert lowered[i, j]((0.0,)*n, {A: Av}) == pytest.approx(expected[i, j]((0.0,)*n, {A: Av}))
@@ -0,0 +1,84 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_data, compute_argument_factorization
+from ufl.algorithms import compute_integral_data_factorizations, extract_arguments
+from ufl.algorithms.check_arities import ArityMismatch
+
+
+@pytest.fixture
+def functions():
+    V = VectorElement("CG", triangle, 2)
+    f = Coefficient(FiniteElement("CG", triangle, 1))
+    w = Coefficient(V)
+    return TrialFunction(V), TestFunction(V), f, w
+
+
+def test_factorization_of_bilinear_form(functions):
+    u, v, f, w = functions
+    a = exp(f)*inner(grad(u), grad(v))*dx + f**2*dot(u, v)*dx + dot(grad(u)*w, v)*f*dx
+    integrand = compute_form_data(a).integral_data[0].integrals[0].integrand()
+    F = compute_argument_factorization(integrand)
+
+    # Components of u, v, grad(u) and grad(v)
+    assert len(F.argument_factors) == 2 + 2 + 4 + 4
+    assert len(F.monomials) == 2 + 4 + 4
+    assert all(len(key) == 2 for key in F.monomials)
+    assert exp(f) in F.coefficients
+    assert f**2 in F.coefficients
+    assert not any(extract_arguments(c) for c in F.coefficients)
+
+    # The coefficients of the diffusion terms are shared
+    assert len(set(F.monomials.values())) == len(F.coefficients) == 4
+
+    # The rebuilt integrand has the same factorization
+    G = compute_argument_factorization(F.expression())
+    assert set(G.argument_factors) == set(F.argument_factors)
+    assert set(G.coefficients) == set(F.coefficients)
+    assert len(G.monomials) == len(F.monomials)
+
+
+def test_factorization_of_special_operators(functions):
+    u, v, f, w = functions
+    F = compute_argument_factorization(f**2*v[0]*conditional(lt(f, 0), u[1], 0)/f)
+    (key, i), = F.monomials.items()
+    assert [F.argument_factors[k] for k in key] == [v[0], u[1]]
+    assert F.coefficients[i] == f**2*conditional(lt(f, 0), 1, 0)/f
+
+    F = compute_argument_factorization(conj(3*v[1] + f*v[0]))
+    assert len(F.monomials) == 2
+    assert conj(v[1]) in F.argument_factors
+
+    # Functionals have a single monomial without argument factors
+    F = compute_argument_factorization(f**2)
+    assert F.monomials == {(): 0}
+    assert F.coefficients == (f**2,)
+
+    with pytest.raises(ArityMismatch):
+        compute_argument_factorization(u[0]*v[0]*v[1])
+    with pytest.raises(ArityMismatch):
+        compute_argument_factorization(exp(v[0]))
+    with pytest.raises(ArityMismatch):
+        compute_argument_factorization(v[0] + f)
+    with pytest.raises(ArityMismatch):
+        compute_argument_factorization(u[0]*v[0] + f*v[0])
+    with pytest.raises(ArityMismatch):
+        compute_argument_factorization(conditional(lt(f, 0), u[0]*v[0], v[1]))
+    with pytest.raises(ArityMismatch):
+        i = Index()
+        compute_argument_factorization(as_vector((u[0]*v[0], v[1]))[i]*w[i])
+
+
+def test_factorizations_are_cached_on_integral_data(functions):
+    u, v, f, w = functions
+    fd = compute_form_data(f*dot(u, v)*dx(1) + f*dot(u, v)*dx(2) + dot(u, v)*ds,
+                           do_apply_function_pullbacks=True,
+                           do_apply_integral_scaling=True,
+                           do_apply_geometry_lowering=True)
+    factorizations = [compute_integral_data_factorizations(itg_data) for itg_data in fd.integral_data]
+    assert [len(F) for F in factorizations] == [1, 1, 1]
+    assert fd.integral_data[0].argument_factorizations is factorizations[0]
+    assert compute_integral_data_factorizations(fd.integral_data[0]) is factorizations[0]
+    assert len(factorizations[0][0].monomials) == 2
+    assert len(factorizations[0][0].coefficients) == 1
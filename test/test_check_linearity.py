@@ -0,0 +1,119 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_linearity, compute_form_data
+from ufl.algorithms.check_linearity import compute_integrand_linearity
+
+
+@pytest.fixture
+def spaces():
+    cell = triangle
+    V = FiniteElement("CG", cell, 1)
+    return cell, V
+
+
+def test_form_linearity_of_poisson_problem(spaces):
+    cell, V = spaces
+    u = Coefficient(V)
+    g = Coefficient(V)
+    v = TestFunction(V)
+    du = TrialFunction(V)
+    c = Constant(cell)
+
+    F = inner(grad(u), grad(v))*dx - c*g*v*dx
+    J = derivative(F, u, du)
+
+    assert compute_form_linearity(F, u) == "affine"
+    assert compute_form_linearity(F, g) == "affine"
+    assert compute_form_linearity(c*g*v*dx, g) == "linear"
+    assert compute_form_linearity(c*g*v*dx, c) == "linear"
+    assert compute_form_linearity(J, u) == "independent"
+    assert compute_form_linearity(inner(grad(u), grad(v))*dx, u) == "linear"
+
+
+def test_form_linearity_of_nonlinear_problem(spaces):
+    cell, V = spaces
+    u = Coefficient(V)
+    w = Coefficient(V)
+    v = TestFunction(V)
+    du = TrialFunction(V)
+
+    F = (1 + u**2)*inner(grad(u), grad(v))*dx + w*v*dx
+    J = derivative(F, u, du)
+
+    assert compute_form_linearity(F, u) == "nonlinear"
+    assert compute_form_linearity(J, u) == "nonlinear"
+    assert compute_form_linearity(J, w) == "independent"
+    assert compute_form_linearity(F, w) == "affine"
+    assert compute_form_linearity(u*u*v*dx, u) == "nonlinear"
+    assert compute_form_linearity(exp(w)*u*v*dx, u) == "linear"
+    assert compute_form_linearity(u/w*v*dx, u) == "linear"
+    assert compute_form_linearity(w/u*v*dx, u) == "nonlinear"
+
+
+def test_form_linearity_of_compound_and_conditional_expressions(spaces):
+    cell, V = spaces
+    u = Coefficient(V)
+    w = Coefficient(V)
+    v = TestFunction(V)
+
+    assert compute_form_linearity(dot(as_vector((u, 0)), grad(v))*dx, u) == "linear"
+    assert compute_form_linearity(conditional(lt(w, 0.5), u, 0)*v*dx, u) == "linear"
+    assert compute_form_linearity(conditional(lt(w, 0.5), u, 1)*v*dx, u) == "affine"
+    assert compute_form_linearity(conditional(lt(u, 0.5), u, 0)*v*dx, u) == "nonlinear"
+    assert compute_form_linearity(u('+')*v('+')*dS + u*v*ds, u) == "linear"
+
+
+def test_integrand_linearity_of_preprocessed_form(spaces):
+    cell, V = spaces
+    u = Coefficient(V)
+    v = TestFunction(V)
+    du = TrialFunction(V)
+
+    F = u**3*v*dx
+    fd = compute_form_data(derivative(F, u, du))
+    integrand = fd.preprocessed_form.integrals()[0].integrand()
+    assert compute_integrand_linearity(integrand, u) == "nonlinear"
+
+
+def test_linearity_requires_coefficient_or_constant(spaces):
+    cell, V = spaces
+    v = TestFunction(V)
+    with pytest.raises(UFLException):
+        compute_form_linearity(v*dx, v)
+
+
+def test_coefficient_dependencies_of_form_data(spaces):
+    cell, V = spaces
+    f = Coefficient(V)
+    g = Coefficient(V)
+    k = Constant(cell)
+    v = TestFunction(V)
+
+    a = k*f*v*dx + exp(g)*v*dx(1) + (g + 1)*v*ds + f**2*v*ds(2)
+    assert compute_form_data(a).coefficient_dependencies is None
+    fd = compute_form_data(a, do_compute_coefficient_dependencies=True)
+    keys = [(itg_data.integral_type, itg_data.subdomain_id) for itg_data in fd.integral_data]
+    assert keys == [("cell", 1), ("cell", "otherwise"),
+                    ("exterior_facet", 2), ("exterior_facet", "otherwise")]
+
+    dependencies = fd.coefficient_dependencies
+    assert set(dependencies) == set((f, g, k))
+    assert dependencies[f] == [(0, "affine"), (1, "linear"), (2, "nonlinear")]
+    assert dependencies[g] == [(0, "nonlinear"), (2, "affine"), (3, "affine")]
+    assert dependencies[k] == [(0, "affine"), (1, "linear")]
+    assert fd.integral_data[1].integral_constants == set((k,))
+    assert fd.integral_data[3].integral_constants == set()
+
+
+def test_linearity_of_nested_nonlinear_operators(spaces):
+    cell, V = spaces
+    f = Coefficient(V)
+    g = Coefficient(V)
+    e = g
+    for i in range(200):
+        e = sin(e)
+    assert compute_integrand_linearity(f*e, f) == "linear"
+    assert compute_integrand_linearity(f*e, g) == "nonlinear"
+    assert compute_integrand_linearity(e + sin(f), f) == "nonlinear"
@@ -0,0 +1,74 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_data, eliminate_common_subexpressions
+from ufl.algorithms import eliminate_integral_data_subexpressions, estimate_integrand_cost
+from ufl.classes import Variable, Label
+from ufl.corealg.traversal import unique_pre_traversal
+
+
+def labels(expressions):
+    return sorted(set(o.ufl_operands[1].count() for e in expressions
+                      for o in unique_pre_traversal(e) if isinstance(o, Variable)))
+
+
+@pytest.fixture
+def f():
+    return Coefficient(FiniteElement("CG", triangle, 1))
+
+
+def test_repeated_subexpression_is_labelled(f):
+    g = f*f + 2
+    e = sin(g)*g
+    (r,), saved = eliminate_common_subexpressions([e])
+    assert labels([r]) == [0]
+    assert r == sin(Variable(g, Label(0)))*Variable(g, Label(0))
+    # f*f + 2 is evaluated once instead of twice
+    assert saved == 2
+
+
+def test_subexpressions_shared_between_expressions(f):
+    g = f*f + 2
+    r, saved = eliminate_common_subexpressions([sin(g), cos(g), f + 1])
+    assert r[0] == sin(Variable(g, Label(0)))
+    assert r[1] == cos(Variable(g, Label(0)))
+    assert r[2] == f + 1
+    assert saved == 2
+
+
+def test_cheap_subexpressions_are_not_labelled(f):
+    w = Coefficient(VectorElement("CG", triangle, 1))
+    (r,), saved = eliminate_common_subexpressions([w[0]*w[1] + w[0]*f])
+    assert labels([r]) == []
+    assert saved == 0
+
+
+def test_stable_label_numbering(f):
+    g = Variable(f + 1, Label(7))
+    e = exp(f*g)*(f*g) + sin(f*f)*cos(f*f)
+    r1, saved1 = eliminate_common_subexpressions([e])
+    r2, saved2 = eliminate_common_subexpressions([e])
+    assert r1 == r2
+    assert saved1 == saved2 == 3
+    assert labels(r1) == [7, 8, 9]
+
+
+def test_integral_data_subexpressions():
+    V = FiniteElement("CG", triangle, 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    n = FacetNormal(triangle)
+    a = inner(grad(u), grad(v))*dx + jump(grad(u), n)*avg(v)*dS
+    fd = compute_form_data(a,
+                           do_apply_function_pullbacks=True,
+                           do_apply_geometry_lowering=True,
+                           do_apply_integral_scaling=True)
+    for itg_data in fd.integral_data:
+        integrals, saved = eliminate_integral_data_subexpressions(itg_data)
+        assert saved > 0
+        assert len(integrals) == len(itg_data.integrals)
+        integrand = integrals[0].integrand()
+        assert labels([integrand])
+        # The labelled integrand has the same DAG cost up to the variables
+        assert estimate_integrand_cost(integrand) == estimate_integrand_cost(itg_data.integrals[0].integrand())
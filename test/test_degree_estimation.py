@@ -132,3 +132,79 @@ def test_some_compound_types():
 
     assert etpd(dot(grad(v), grad(v))) == 2 - 1 + 2 - 1
     assert etpd(inner(grad(v), grad(v))) == 2 - 1 + 2 - 1
+
+
+def test_split_integrands_by_degree():
+    V = FiniteElement("CG", triangle, 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    f = Coefficient(FiniteElement("CG", triangle, 2))
+    F = u*v*dx + f**3*inner(grad(u), grad(v))*dx + (f*u*v + u*v)*ds(degree=3)
+
+    def degrees(fd):
+        return [(itg_data.integral_type,
+                 [itg.metadata()["estimated_polynomial_degree"] for itg in itg_data.integrals])
+                for itg_data in fd.integral_data]
+
+    assert degrees(compute_form_data(F)) == [("cell", [6]), ("exterior_facet", [4])]
+
+    # Integrals with a given quadrature degree are not split
+    fd = compute_form_data(F, do_split_integrands_by_degree=True)
+    assert degrees(fd) == [("cell", [2, 6]), ("exterior_facet", [4])]
+    low, high = fd.integral_data[0].integrals
+    assert low.integrand() == u*v
+    assert estimate_total_polynomial_degree(high.integrand()) == 6
+
+
+def test_argument_degree_estimation():
+    V = FiniteElement("CG", triangle, 3)
+    W = FiniteElement("CG", triangle, 1)
+    u = TrialFunction(W)
+    v = TestFunction(V)
+    f = Coefficient(FiniteElement("CG", triangle, 2))
+    x = SpatialCoordinate(triangle)
+
+    assert estimate_argument_degrees(u*v*dx) == {0: 3, 1: 1, None: 0}
+    assert estimate_argument_degrees(f**2*x[0]*u*v) == {0: 3, 1: 1, None: 5}
+    assert estimate_argument_degrees(inner(grad(u), grad(v))*dx + f*u*v*ds) == {0: 3, 1: 1, None: 2}
+    assert estimate_argument_degrees(exp(f)*v) == {0: 3, None: 4}
+
+
+def test_nonpolynomial_degree_bounds():
+    V = FiniteElement("CG", triangle, 3)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    f = Coefficient(FiniteElement("CG", triangle, 2))
+
+    etpd = estimate_total_polynomial_degree
+    assert etpd(exp(f)) == 4
+    assert etpd(exp(f), nonpolynomial_increment=1) == 3
+    assert etpd(exp(f), max_nonpolynomial_degree=3) == 3
+    assert etpd(f**0.5, max_nonpolynomial_degree=1) == 1
+    assert etpd(exp(f)*u*v, max_nonpolynomial_degree=1) == 7
+
+    # Division by a nonconstant is bounded below by the numerator
+    assert etpd(u*v/f) == 8
+    assert etpd(u*v/f, max_nonpolynomial_degree=3) == 6
+    assert etpd(u*v/2, max_nonpolynomial_degree=3) == 6
+
+    a = exp(f)*inner(grad(u), grad(v))*dx + u*v/f*dx
+    fd = compute_form_data(a)
+    assert fd.integral_data[0].integrals[0].metadata()["estimated_polynomial_degree"] == 8
+    fd = compute_form_data(a, degree_estimation_options={"max_nonpolynomial_degree": 2})
+    assert fd.integral_data[0].integrals[0].metadata()["estimated_polynomial_degree"] == 6
+
+
+def test_degree_estimation_cache():
+    V = FiniteElement("CG", triangle, 2)
+    f = Coefficient(V)
+    g = Coefficient(V)
+    cache = {}
+    assert estimate_total_polynomial_degree(sin(f)*g, cache=cache) == 6
+    assert estimate_total_polynomial_degree(sin(f)*g**2, cache=cache) == 8
+    vcache, = cache.values()
+    assert vcache[sin(f)] == 4
+
+    # Other options do not share results
+    assert estimate_total_polynomial_degree(sin(f)*g, max_nonpolynomial_degree=2, cache=cache) == 4
+    assert len(cache) == 2
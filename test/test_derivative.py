@@ -11,6 +11,10 @@ from itertools import chain
 from ufl import *
 from ufl.constantvalue import as_ufl
 from ufl.algorithms import expand_indices, strip_variables, post_traversal, compute_form_data
+from ufl.algorithms.apply_algebra_lowering import apply_algebra_lowering
+from ufl.algorithms.apply_derivatives import apply_derivatives
+from ufl.classes import Determinant, Inverse, Cofactor, ReferenceGrad, ReferenceValue
+from ufl.corealg.traversal import unique_pre_traversal
 
 
 def assertEqualBySampling(actual, expected):
@@ -539,6 +543,84 @@ def test_vector_coefficient_derivatives_of_product(self):
 
     # TODO: Add tests covering more cases, in particular mixed stuff
 
+def test_derivative_of_preserved_determinant_and_inverse(self):
+    T = TensorElement("CG", tetrahedron, 1)
+    A = Coefficient(T)
+    B = Coefficient(T)
+    Av = ((1.5, 0.3, 0.1), (0.2, 2.0, 0.4), (0.3, 0.5, 1.7))
+    Bv = ((0.1, -0.2, 0.3), (0.4, 0.5, -0.6), (0.7, -0.8, 0.9))
+    mapping = {A: Av, B: Bv}
+    x = (0.1, 0.2, 0.3)
+    preserve_types = (Determinant, Inverse, Cofactor)
+
+    for f in (det(A)**2, inv(A)[0, 1]*det(A), cofac(A)[1, 0], tr(inv(A)*cofac(A))):
+        for g in (derivative(f, A, B), derivative(derivative(f, A, B), A, B)):
+            expected = apply_derivatives(apply_algebra_lowering(g))
+            actual = apply_algebra_lowering(g, preserve_types=preserve_types)
+            actual = apply_algebra_lowering(apply_derivatives(actual), share_cofactors=True)
+            assert actual(x, mapping) == pytest.approx(expected(x, mapping))
+
+
+def test_derivative_of_preserved_2x2_cofactor(self):
+    T = TensorElement("CG", triangle, 1)
+    A = Coefficient(T)
+    B = Coefficient(T)
+    mapping = {A: ((1.5, 0.3), (0.2, 2.0)), B: ((0.1, -0.2), (0.4, 0.5))}
+    x = (0.1, 0.2)
+    preserve_types = (Determinant, Inverse, Cofactor)
+
+    for f in (cofac(A)[0, 1], cofac(A)[1, 1]*det(A), tr(cofac(A)*inv(A)), inner(cofac(A), cofac(A))):
+        for g in (derivative(f, A, B), derivative(derivative(f, A, B), A, B)):
+            expected = apply_derivatives(apply_algebra_lowering(g))
+            actual = apply_algebra_lowering(g, preserve_types=preserve_types)
+            actual = apply_algebra_lowering(apply_derivatives(actual), share_cofactors=True)
+            assert actual(x, mapping) == pytest.approx(expected(x, mapping))
+
+
+def test_cofactor_lowering_reduces_hyperelasticity_jacobian(self):
+    V = VectorElement("CG", tetrahedron, 1)
+    u = Coefficient(V)
+    v = TestFunction(V)
+    du = TrialFunction(V)
+    F = Identity(3) + grad(u)
+    J = det(F)
+    psi = (tr(F.T*F) - 3)/2 - ln(J) + (J - 1)**2/2
+    a = derivative(derivative(psi*dx, u, v), u, du)
+
+    def count_nodes(fd):
+        integrand = fd.preprocessed_form.integrals()[0].integrand()
+        return len(list(unique_pre_traversal(integrand)))
+
+    n0 = count_nodes(compute_form_data(a))
+    n1 = count_nodes(compute_form_data(a, do_apply_cofactor_lowering=True))
+    assert n1 < n0
+
+def test_coordinate_derivative_shares_jacobian_variation(self):
+    cell = triangle
+    mesh = Mesh(VectorElement("P", cell, 1))
+    V = FunctionSpace(mesh, FiniteElement("P", cell, 1))
+    W = FunctionSpace(mesh, VectorElement("P", cell, 1))
+    u = Coefficient(V)
+    X = SpatialCoordinate(mesh)
+    dX = TestFunction(W)
+
+    J = inner(grad(u), grad(u))*dx(1) + u**2*dx(2)
+    fd = compute_form_data(derivative(J, X, dX),
+                           do_apply_function_pullbacks=True,
+                           do_apply_integral_scaling=True,
+                           do_apply_geometry_lowering=True,
+                           preserve_geometry_types=(Jacobian,))
+    assert len(fd.integral_data) == 2
+
+    # The variation of the Jacobian is built once and shared by both integrals
+    variations = set()
+    for itg_data in fd.integral_data:
+        for itg in itg_data.integrals:
+            for o in post_traversal(itg.integrand()):
+                if isinstance(o, ReferenceGrad) and o.ufl_operands[0] == ReferenceValue(dX):
+                    variations.add(id(o))
+    assert len(variations) == 1
+
 # --- Some actual forms
 
 
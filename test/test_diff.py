@@ -10,6 +10,8 @@ import math
 from ufl import *
 from ufl.constantvalue import as_ufl
 from ufl.algorithms import expand_derivatives
+from ufl.classes import ComponentTensor
+from ufl.corealg.traversal import unique_pre_traversal
 
 
 def get_variables():
@@ -199,3 +201,28 @@ def testDiffX():
     assert round(df11 - 2 * 4 * 3, 7) == 0
 
 # TODO: More tests involving wrapper types and indices
+
+
+def test_repeated_diff_shares_ruleset_and_results():
+    cell = tetrahedron
+    T = TensorElement("CG", cell, 1)
+    F = Coefficient(T)
+    C = variable(F.T*F)
+    I1 = tr(C)
+    psi = exp(I1)*I1**2
+
+    # Two separate diff calls on the same variable, where the
+    # differentiated expressions share the subexpression psi
+    e = expand_derivatives(diff(psi, C)[0, 0] + diff(psi*I1, C)[1, 1])
+
+    # The derivative of psi is built once and used in both terms
+    a, b = e.ufl_operands
+    dpsi = a.ufl_operands[0]
+    assert dpsi in set(unique_pre_traversal(b))
+
+    # Variables of the same shape share the identity tensor dv/dv
+    D = variable(2*F)
+    e = expand_derivatives(diff(tr(C), C) + diff(tr(D), D))
+    identities = [o for o in unique_pre_traversal(e)
+                  if isinstance(o, ComponentTensor) and len(o.ufl_shape) == 4]
+    assert len(identities) == 1
@@ -9,6 +9,7 @@ import pytest
 from ufl import *
 from ufl.domain import as_domain, default_domain
 from ufl.algorithms import compute_form_data
+from ufl.algorithms.map_integrands import map_integrands
 
 all_cells = (interval, triangle, tetrahedron,
              quadrilateral, hexahedron)
@@ -208,6 +209,106 @@ def test_everywhere_integrals_with_backwards_compatibility():
     assert itg1.ufl_element() == itg2.ufl_element()
 
 
+def test_integrals_over_many_subdomains_share_integrands():
+    D = Mesh(triangle)
+    V = FunctionSpace(D, FiniteElement("CG", triangle, 1))
+    f = Coefficient(V)
+    g = Coefficient(V)
+
+    n = 2000
+    a = f*dx(tuple(range(n))) + g*dx(tuple(range(0, n, 2))) + f*g*dx
+    fd = compute_form_data(a)
+    assert [ida.subdomain_id for ida in fd.integral_data] == list(range(n)) + ["otherwise"]
+
+    # Subdomains with the same integrals are processed once
+    even, odd = fd.integral_data[0], fd.integral_data[1]
+    assert len(set(id(ida.integrals[0].integrand()) for ida in fd.integral_data[:-1])) == 2
+    assert fd.integral_data[2].integrals[0].integrand() is even.integrals[0].integrand()
+    assert fd.integral_data[3].integrals[0].integrand() is odd.integrals[0].integrand()
+    assert fd.integral_data[-2].signature == odd.signature
+    assert even.integral_coefficients == set((f, g))
+    assert odd.integral_coefficients == set((f, g))
+    assert even.signature != odd.signature
+
+    # Integrands stay shared through pullbacks, scaling and geometry lowering
+    D = Mesh(VectorElement("CG", triangle, 1))
+    V = FunctionSpace(D, FiniteElement("CG", triangle, 1))
+    f = Coefficient(V)
+    a = f*dx(tuple(range(n))) + f**2*dx(tuple(range(0, n, 2)))
+    fd = compute_form_data(a,
+                           do_apply_function_pullbacks=True,
+                           do_apply_integral_scaling=True,
+                           do_apply_geometry_lowering=True)
+    assert len(fd.integral_data) == n
+    assert len(set(id(ida.integrals[0].integrand()) for ida in fd.integral_data)) == 2
+
+
+def test_map_integrands_maps_each_integral():
+    D = Mesh(triangle)
+    V = FunctionSpace(D, FiniteElement("CG", triangle, 1))
+    f = Coefficient(V)
+    a = f*dx((1, 2))
+    assert a.integrals()[0].integrand() is a.integrals()[1].integrand()
+
+    mapped = []
+
+    def function(integrand):
+        mapped.append(integrand)
+        return 2*integrand
+
+    b = map_integrands(function, a)
+    assert mapped == [f, f]
+    assert [itg.integrand() for itg in b.integrals()] == [2*f, 2*f]
+
+
+def test_merging_integral_data_over_subdomains_with_identical_integrals():
+    D = Mesh(triangle)
+    V = FunctionSpace(D, FiniteElement("CG", triangle, 1))
+    f = Coefficient(V)
+    g = Coefficient(V)
+
+    a = f*dx((1, 2, 3, 4)) + g*dx((2, 4)) + f*g*dx(5) + f*ds((1, 2))
+    fd = compute_form_data(a, do_merge_subdomains=True, do_compute_integral_digests=True)
+    assert [(ida.integral_type, ida.subdomain_id) for ida in fd.integral_data] == \
+        [("cell", (1, 3)), ("cell", (2, 4)), ("cell", 5), ("exterior_facet", (1, 2))]
+    for ida in fd.integral_data:
+        assert all(itg.subdomain_id() == ida.subdomain_id for itg in ida.integrals)
+    assert fd.max_subdomain_ids == {"cell": 6, "exterior_facet": 3}
+
+    # The merged integral data carry the integrals of each subdomain
+    unmerged = compute_form_data(a)
+    assert len(unmerged.integral_data) == 7
+    signatures = dict((ida.subdomain_id, ida.signature) for ida in unmerged.integral_data
+                      if ida.integral_type == "cell")
+    assert fd.integral_data[0].signature == signatures[1] == signatures[3]
+    assert fd.integral_data[1].signature == signatures[2] == signatures[4]
+
+    # Incremental updates of merged integral data
+    fd2 = compute_form_data(f*dx((1, 2, 3, 4)) + g*dx((2, 4)) + f*g*dx(5) + g*ds((1, 2)),
+                            do_merge_subdomains=True, previous_form_data=fd)
+    assert [ida.subdomain_id for ida in fd2.integral_data] == [(1, 3), (2, 4), 5, (1, 2)]
+    assert fd2.changed_integral_data == [False, False, False, True]
+
+
+def test_merging_integral_data_keeps_subdomain_data_apart():
+    from ufl.algorithms.domain_analysis import build_integral_data
+    D = Mesh(triangle)
+    V = FunctionSpace(D, FiniteElement("CG", triangle, 1))
+    f = Coefficient(V)
+    markers1 = object()
+    markers2 = object()
+
+    # Identical integrals except for the subdomain data
+    integrals = [Integral(f, "cell", D, 1, {}, markers1),
+                 Integral(f, "cell", D, 2, {}, markers2),
+                 Integral(f, "cell", D, 3, {}, markers1)]
+    merged, single = build_integral_data(integrals, do_merge_subdomains=True)
+    assert merged.subdomain_id == (1, 3)
+    assert single.subdomain_id == 2
+    assert all(itg.subdomain_data() is markers1 for itg in merged.integrals)
+    assert all(itg.subdomain_data() is markers2 for itg in single.integrals)
+
+
 def xtest_mixed_elements_on_overlapping_regions():  # Old sketch, not working
 
     # Create domain and both disjoint and overlapping regions
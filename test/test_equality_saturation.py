@@ -0,0 +1,93 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_data, optimize_expression, optimize_integrands
+from ufl.algorithms.apply_algebra_lowering import apply_algebra_lowering
+from ufl.algorithms.equality_saturation import EGraph, _dag_cost
+from ufl.classes import ComponentTensor, Indexed, IndexSum, MultiIndex
+from ufl.corealg.traversal import unique_pre_traversal
+
+
+@pytest.fixture
+def coefficients():
+    V = FiniteElement("CG", triangle, 1)
+    W = VectorElement("CG", triangle, 1)
+    f, g, h = [Coefficient(V) for k in range(3)]
+    w, u = [Coefficient(W) for k in range(2)]
+    values = {f: 2.0, g: 3.0, h: 5.0, w: (1.0, 7.0), u: (-2.0, 0.5)}
+    return f, g, h, w, u, values
+
+
+def test_egraph_merges_congruent_classes(coefficients):
+    f, g, h, w, u, values = coefficients
+    egraph = EGraph()
+    a = egraph.add(f*g + h)
+    assert egraph.add(h + g*f) == a
+    b = egraph.add(f + h)
+    egraph.union(egraph.add(f*g), egraph.add(f))
+    egraph.rebuild()
+    assert egraph.find(a) == egraph.find(b)
+
+
+def test_factoring(coefficients):
+    f, g, h, w, u, values = coefficients
+    e = f*g + f*h
+    r = optimize_expression(e)
+    assert r == f*(g + h)
+    assert _dag_cost(r) < _dag_cost(e)
+
+
+def test_index_sum_hoisting(coefficients):
+    f, g, h, w, u, values = coefficients
+    i = Index()
+    e = (f*w[i])*u[i]
+    assert isinstance(e, IndexSum)
+    r = optimize_expression(e)
+    assert r == f*(w[i]*u[i])
+    assert r((0, 0), values) == e((0, 0), values)
+
+
+def test_component_tensor_elimination(coefficients):
+    f, g, h, w, u, values = coefficients
+    i, j = indices(2)
+    e = Indexed(ComponentTensor(w[i]*f, MultiIndex((i,))), MultiIndex((j,)))
+    assert optimize_expression(e) == w[j]*f
+
+
+def test_conjugates(coefficients):
+    f, g, h, w, u, values = coefficients
+    e = conj(f)*conj(g) + conj(f)*conj(h)
+    r = optimize_expression(e)
+    assert r == conj(f*(g + h))
+
+
+def test_optimized_expressions_are_equivalent_and_cheaper(coefficients):
+    f, g, h, w, u, values = coefficients
+    expressions = [
+        f*inner(w, u) + g*inner(w, u)*conj(h) + f*g + f*h,
+        inner(f*w + g*w + h*u, g*w + (f + g)*u),
+        dot(w, u)*f*g - f*g*dot(u, u),
+        f + g*h,
+    ]
+    for e in expressions:
+        e = apply_algebra_lowering(e)
+        r = optimize_expression(e)
+        assert _dag_cost(r) <= _dag_cost(e)
+        assert r((0, 0), values) == pytest.approx(e((0, 0), values))
+    assert optimize_expression(f + g*h) == f + g*h
+
+
+def test_optimize_integrands():
+    V = FiniteElement("CG", triangle, 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    f = Coefficient(V)
+    g = Coefficient(V)
+    a = (f*inner(grad(u), grad(v)) + g*inner(grad(u), grad(v)))*dx
+    fd = compute_form_data(a)
+    integrand = fd.preprocessed_form.integrals()[0].integrand()
+    optimized = optimize_integrands(fd.preprocessed_form).integrals()[0].integrand()
+    assert _dag_cost(optimized) < _dag_cost(integrand)
+    # The index sum is evaluated once
+    assert len([o for o in unique_pre_traversal(optimized) if isinstance(o, IndexSum)]) == 1
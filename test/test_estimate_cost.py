@@ -0,0 +1,63 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import estimate_integrand_cost, compute_form_data
+
+
+@pytest.fixture
+def functions():
+    V = VectorElement("CG", triangle, 2)
+    f = Coefficient(FiniteElement("CG", triangle, 1))
+    return TrialFunction(V), TestFunction(V), f
+
+
+def test_cost_of_scalar_operations(functions):
+    u, v, f = functions
+    g = Coefficient(f.ufl_element())
+    cost = estimate_integrand_cost(exp(f)*g + f/g + f**3)
+    assert cost["additions"] == 2
+    assert cost["multiplications"] == 1 + 2
+    assert cost["divisions"] == 1
+    assert cost["transcendental_calls"] == 1
+    assert cost["arithmetic_operations"] == 6
+    assert cost["coefficient_evaluations"] == 2
+    assert cost["argument_evaluations"] == 0
+
+    cost = estimate_integrand_cost(conditional(lt(f, 0), f**0.5, abs(g)))
+    assert cost["comparisons"] == 2
+    assert cost["transcendental_calls"] == 1
+    assert cost["other_operations"] == 1
+
+
+def test_cost_counts_unique_nodes_and_indices(functions):
+    u, v, f = functions
+    a = f**2*dot(u, v)*dx + exp(f)*inner(grad(u), grad(v))*dx
+    cost = estimate_integrand_cost(compute_form_data(a).preprocessed_form)
+
+    # Two index sums over 2 and 2x2 values, the shared f**2 and exp(f)
+    # are counted once
+    assert cost["additions"] == 1 + 3 + 1
+    assert cost["transcendental_calls"] == 1
+    assert cost["coefficient_evaluations"] == 1
+    # u, v and their gradients
+    assert cost["argument_evaluations"] == 2 + 2 + 4 + 4
+    assert cost["geometry_evaluations"] == 0
+
+
+def test_cost_of_lowered_geometry(functions):
+    u, v, f = functions
+    fd = compute_form_data(inner(grad(u), grad(v))*dx,
+                           do_apply_function_pullbacks=True,
+                           do_apply_integral_scaling=True,
+                           do_apply_geometry_lowering=True)
+    cost = estimate_integrand_cost(fd.preprocessed_form.integrals()[0])
+    # The Jacobian and the quadrature weight
+    assert cost["geometry_evaluations"] == 4 + 1
+    assert cost["divisions"] > 0
+    assert cost["arithmetic_operations"] > cost["multiplications"]
+
+
+def test_cost_requires_expression():
+    with pytest.raises(UFLException):
+        estimate_integrand_cost(1.0)
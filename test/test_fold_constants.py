@@ -0,0 +1,113 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+import ufl
+from ufl import *
+from ufl.algorithms import compute_form_data, fold_constants
+from ufl.classes import Indexed, MultiIndex, FixedIndex, FloatValue, IntValue, Product
+from ufl.algorithms.apply_algebra_lowering import apply_algebra_lowering
+from ufl.corealg.traversal import unique_pre_traversal
+
+
+@pytest.fixture
+def constant_folding():
+    with ufl.constantvalue.constant_folding():
+        yield
+
+
+@pytest.fixture
+def f():
+    return Coefficient(FiniteElement("CG", tetrahedron, 1))
+
+
+def fixed(*indices):
+    return MultiIndex(tuple(FixedIndex(i) for i in indices))
+
+
+def test_construction_without_constant_folding(f):
+    e = (2.0*f)*3.0
+    assert isinstance(e.ufl_operands[1], Product)
+    assert isinstance(Indexed(Identity(3), fixed(0, 1)), Indexed)
+
+
+def test_fold_nested_literals(constant_folding, f):
+    assert (2.0*f)*3.0 == FloatValue(6.0)*f
+    assert (2*f)*(3*f) == 6*(f*f)
+    assert (0.5*f)*2 == f
+    assert 2 + (3 + f) == 5 + f
+    assert (2 + f) + (-2) == f
+    assert (4*f)/2 == FloatValue(2.0)*f
+    assert f/2/4 == f/8
+
+
+def test_constant_folding_context_is_restored(f):
+    with ufl.constantvalue.constant_folding():
+        with ufl.constantvalue.constant_folding():
+            pass
+        assert (2*f)*3 == 6*f
+    assert (2*f)*3 != 6*f
+    with pytest.raises(RuntimeError):
+        with ufl.constantvalue.constant_folding():
+            raise RuntimeError()
+    assert (2*f)*3 != 6*f
+
+
+def test_fold_fixed_index_lookups(constant_folding, f):
+    assert Indexed(Identity(3), fixed(1, 1)) == IntValue(1)
+    assert Indexed(Identity(3), fixed(0, 1)) == zero()
+    assert Indexed(PermutationSymbol(3), fixed(1, 0, 2)) == IntValue(-1)
+    v = as_vector((f, 2*f))
+    assert Indexed(v, fixed(1)) == 2*f
+    w = Coefficient(VectorElement("CG", tetrahedron, 1))
+    A = as_matrix(((w[0], w[1]), (f, 3*f)))
+    assert Indexed(A, fixed(0, 1)) == w[1]
+    B = as_tensor((w, w))
+    assert Indexed(B, fixed(1, 2)) == w[2]
+
+
+def test_fold_constants_pass(f):
+    I = Identity(3)
+    e = Indexed(I, fixed(0, 0))*f + Indexed(I, fixed(0, 1))*f*f + (2.0*f)*3.0
+    assert fold_constants(e) == f + FloatValue(6.0)*f
+    assert fold_constants((2 + f) + (-2)) == f
+    assert fold_constants((4*f)/2) == FloatValue(2.0)*f
+
+    w = Coefficient(VectorElement("CG", tetrahedron, 1))
+    assert fold_constants(w[0]/2/4) == w[0]/8
+    assert fold_constants((3*w[0])/2/4) == FloatValue(0.375)*w[0]
+    assert fold_constants(as_vector((f, w[1]))[1]) == w[1]
+
+    # Folding does not change construction of new expressions
+    assert (2*f)*3 != 6*f
+
+
+def test_fold_identity_contractions():
+    A = Coefficient(TensorElement("CG", tetrahedron, 1))
+    I = Identity(3)
+    i, j, k = indices(3)
+    e = fold_constants(I[i, j]*A[j, k])
+    assert e == A[i, k]
+    assert fold_constants(I[i, j]*I[j, k]) == I[i, k]
+    assert fold_constants(I[0, j]*A[j, k]) == A[0, k]
+
+    # The diagonal of A cannot be written without the index sum
+    e = I[i, j]*A[i, j]
+    assert fold_constants(e) == e
+
+    e = fold_constants(apply_algebra_lowering(tr(dot(I, A))))
+    assert not any(isinstance(o, Identity) for o in unique_pre_traversal(e))
+
+
+def test_compute_form_data_folds_constants():
+    element = VectorElement("CG", tetrahedron, 1)
+    u = TrialFunction(element)
+    v = TestFunction(element)
+    a = inner(grad(u) + grad(u).T, grad(v))*dx + div(u)*tr(Identity(3)*grad(v))*dx
+
+    fd = compute_form_data(a)
+    folded = compute_form_data(a, do_fold_constants=True)
+    integrand = fd.integral_data[0].integrals[0].integrand()
+    folded_integrand = folded.integral_data[0].integrals[0].integrand()
+    assert any(isinstance(o, Identity) for o in unique_pre_traversal(integrand))
+    assert not any(isinstance(o, Identity) for o in unique_pre_traversal(folded_integrand))
+    assert len(list(unique_pre_traversal(folded_integrand))) < len(list(unique_pre_traversal(integrand)))
@@ -134,3 +134,32 @@ def test_form_call():
         a = u*v*dx
         M = eval("(a @ f) @ g")
         assert M == g*f*dx
+
+
+def test_form_sum_collects_integrals_when_requested(element):
+    v = TestFunction(element)
+    u = TrialFunction(element)
+    c = Constant(triangle)
+    mass = u*v*dx
+    stiffness = inner(grad(u), grad(v))*dx
+    a = mass + 2*stiffness
+    b = -(c*a) + u*v*ds
+
+    integrals = b.integrals()
+    assert [itg.integral_type() for itg in integrals] == ["cell", "cell", "exterior_facet"]
+    assert integrals[0] == -(c*mass.integrals()[0])
+    assert integrals[1] == -(c*(2*stiffness.integrals()[0]))
+    assert b.equals(Form([-(c*itg) for itg in a.integrals()] + list((u*v*ds).integrals())))
+    assert b.signature() == (-(c*(mass + 2*stiffness)) + u*v*ds).signature()
+    assert b.constants() == [c]
+
+
+def test_form_sum_of_many_terms(element):
+    v = TestFunction(element)
+    f = Coefficient(element)
+    a = Form([])
+    for i in range(5000):
+        a += (i + 1)*f*v*dx(i % 3)
+    assert len(a.integrals()) == 5000
+    assert [itg.subdomain_id() for itg in a.integrals()[::1667]] == [0, 1, 2]
+    assert a.integrals()[1].integrand() == 4*f*v
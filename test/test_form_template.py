@@ -0,0 +1,112 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import FormTemplate, compute_form_data
+from ufl.log import UFLException
+
+
+@pytest.fixture
+def spaces():
+    V = FiniteElement("CG", triangle, 1)
+    Q = FiniteElement("DG", triangle, 0)
+    return V, Q
+
+
+def test_form_template_instantiation(spaces):
+    V, Q = spaces
+    f = Coefficient(V)
+    k = Coefficient(Q)
+    c = Constant(triangle)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    template = FormTemplate(k*inner(grad(u), grad(v))*dx + c*f*u*v*ds)
+    fd = template.form_data()
+    assert fd.reduced_coefficients == [f, k]
+
+    # New coefficients created in the opposite order
+    k2 = Coefficient(Q)
+    f2 = Coefficient(V)
+    c2 = Constant(triangle)
+    fd2 = template.instantiate({f: f2, k: k2, c: c2})
+    reference = compute_form_data(k2*inner(grad(u), grad(v))*dx + c2*f2*u*v*ds)
+
+    # Kernel argument order of the template is kept
+    assert fd2.reduced_coefficients == [f2, k2]
+    assert fd2.original_coefficient_positions == [1, 0]
+    assert [reference.original_form.coefficients()[i] for i in fd2.original_coefficient_positions] == [f2, k2]
+    assert fd2.coefficient_map[c] == c2
+    assert fd2.reduced_constants == [c2]
+
+    # The forms refer to the new coefficients and constants
+    assert fd2.original_form == reference.original_form
+    assert fd2.preprocessed_form.signature() == reference.preprocessed_form.signature()
+    assert fd2.preprocessed_form.coefficients() == (k2, f2)
+    assert fd.original_form.coefficients() == (f, k)
+
+    assert fd2.function_replace_map[f2] == fd.function_replace_map[f]
+    assert fd2.function_replace_map[k2] == fd.function_replace_map[k]
+    for itg_data, itg_data2 in zip(fd.integral_data, fd2.integral_data):
+        assert itg_data2.integrals is itg_data.integrals
+        assert itg_data2.signature == itg_data.signature
+        assert itg_data2.enabled_coefficients == itg_data.enabled_coefficients
+        assert itg_data2.integral_coefficients == set(fd2.coefficient_map.get(w, w)
+                                                      for w in itg_data.integral_coefficients)
+        assert itg_data2 is not itg_data
+        for name in type(itg_data).__slots__:
+            if name not in ("integral_coefficients", "integral_constants"):
+                assert getattr(itg_data2, name) == getattr(itg_data, name)
+
+    # The template is unchanged
+    assert fd.reduced_coefficients == [f, k]
+
+
+def test_form_template_rejects_invalid_mappings(spaces):
+    V, Q = spaces
+    f = Coefficient(V)
+    v = TestFunction(V)
+    template = FormTemplate(f*v*dx)
+    with pytest.raises(UFLException):
+        template.instantiate({f: Coefficient(Q)})
+    with pytest.raises(UFLException):
+        template.instantiate({Coefficient(V): f})
+
+    # Coefficients may not be collapsed
+    g = Coefficient(V)
+    template = FormTemplate(f*g*v*dx)
+    h = Coefficient(V)
+    with pytest.raises(UFLException):
+        template.instantiate({f: h, g: h})
+    with pytest.raises(UFLException):
+        template.instantiate({f: g})
+    fd = template.instantiate({f: g, g: f})
+    assert fd.reduced_coefficients == [g, f]
+
+
+def test_form_template_constants(spaces):
+    V, Q = spaces
+    f = Coefficient(V)
+    c = Constant(triangle)
+    d = Constant(triangle, shape=(2,))
+    v = TestFunction(V)
+    template = FormTemplate(c*f*v*dx + dot(d, grad(v))*dx)
+    fd = template.form_data()
+    assert fd.reduced_constants == [c, d]
+    assert fd.original_constant_positions == [0, 1]
+
+    # New constants created in the opposite order
+    d2 = Constant(triangle, shape=(2,))
+    c2 = Constant(triangle)
+    fd2 = template.instantiate({c: c2, d: d2})
+    assert fd2.reduced_constants == [c2, d2]
+    assert fd2.original_form.constants() == [d2, c2]
+    assert fd2.original_constant_positions == [1, 0]
+    assert set().union(*(itg_data.integral_constants for itg_data in fd2.integral_data)) == set((c2, d2))
+
+    # Unapplied derivatives are kept
+    w = Coefficient(V)
+    template = FormTemplate(derivative(c*w**2*v*dx, w))
+    w2 = Coefficient(V)
+    fd2 = template.instantiate({w: w2, c: c2})
+    assert fd2.original_form == derivative(c2*w2**2*v*dx, w2)
+    assert fd2.reduced_coefficients == [w2]
@@ -0,0 +1,93 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_data, compute_geometry_tables
+from ufl.algorithms.loop_invariance import compute_dependencies, CELL_GEOMETRY
+from ufl.classes import Restricted, QuadratureWeight
+from ufl.corealg.traversal import unique_pre_traversal
+
+
+def form_data(a):
+    return compute_form_data(a,
+                             do_apply_function_pullbacks=True,
+                             do_apply_geometry_lowering=True,
+                             do_apply_integral_scaling=True,
+                             do_compute_geometry_tables=True)
+
+
+@pytest.fixture
+def poisson_forms():
+    V = FiniteElement("CG", triangle, 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    n = FacetNormal(triangle)
+    return inner(grad(u), grad(v))*dx, jump(grad(u), n)*avg(v)*dS
+
+
+def test_geometry_table_entries(poisson_forms):
+    a, b = poisson_forms
+    fd = form_data(a + b)
+    domain, = fd.geometry_tables
+    table = fd.geometry_tables[domain]
+    assert len(set(table)) == len(table)
+    deps = compute_dependencies(table)
+    for entry in table:
+        assert deps[entry] == frozenset((CELL_GEOMETRY,))
+        assert entry.ufl_free_indices == ()
+        assert not any(isinstance(o, Restricted) for o in unique_pre_traversal(entry))
+
+
+def test_geometry_references(poisson_forms):
+    a, b = poisson_forms
+    fd = form_data(a + b)
+    table, = fd.geometry_tables.values()
+    cell, interior_facet = fd.integral_data
+    for itg_data in fd.integral_data:
+        integrand, = [itg.integrand() for itg in itg_data.integrals]
+        subexpressions = set(unique_pre_traversal(integrand))
+        for o, (i, restriction) in itg_data.geometry_references.items():
+            assert o in subexpressions
+            assert 0 <= i < len(table)
+        # The quadrature weight varies between points
+        assert not any(isinstance(o, QuadratureWeight) for o in itg_data.geometry_references)
+    assert set(r for i, r in cell.geometry_references.values()) == set((None,))
+    assert set(r for i, r in interior_facet.geometry_references.values()) == set(("+", "-"))
+
+    # The inverse Jacobian of either side of the facet is shared with
+    # the cell integral
+    cell_entries = set(i for i, r in cell.geometry_references.values())
+    plus = set(i for i, r in interior_facet.geometry_references.values() if r == "+")
+    minus = set(i for i, r in interior_facet.geometry_references.values() if r == "-")
+    assert cell_entries & plus & minus
+
+
+def test_geometry_table_of_integral_data(poisson_forms):
+    a, b = poisson_forms
+    table, = form_data(a + b).geometry_tables.values()
+    fd = form_data(a)
+    tables, references = compute_geometry_tables(fd.integral_data)
+    assert tables == fd.geometry_tables
+    assert references == [itg_data.geometry_references for itg_data in fd.integral_data]
+    assert set(tables[a.ufl_domain()]) < set(table)
+
+
+def test_geometry_tables_are_optional(poisson_forms):
+    a, b = poisson_forms
+    fd = compute_form_data(a + b, do_apply_geometry_lowering=True)
+    assert fd.geometry_tables is None
+    assert all(itg_data.geometry_references is None for itg_data in fd.integral_data)
+
+    # The integral data are not modified
+    tables, references = compute_geometry_tables(fd.integral_data)
+    assert len(references) == len(fd.integral_data)
+    assert all(itg_data.geometry_references is None and itg_data.expression_dependencies is None
+               for itg_data in fd.integral_data)
+
+
+def test_nonaffine_geometry_is_not_tabulated():
+    V = FiniteElement("Q", quadrilateral, 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    fd = form_data(inner(grad(u), grad(v))*dx)
+    assert fd.geometry_tables[fd.integral_data[0].domain] == ()
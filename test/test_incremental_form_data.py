@@ -0,0 +1,85 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_data
+
+
+@pytest.fixture
+def coefficients():
+    V = FiniteElement("CG", triangle, 1)
+    f = Coefficient(V)
+    g = Coefficient(V)
+    h = Coefficient(V)
+    v = TestFunction(V)
+    return f, g, h, v
+
+
+def changed_subdomains(fd):
+    return {itg_data.subdomain_id: changed
+            for itg_data, changed in zip(fd.integral_data, fd.changed_integral_data)}
+
+
+def signatures(fd):
+    return [(itg_data.subdomain_id, itg_data.signature) for itg_data in fd.integral_data]
+
+
+def test_incremental_form_data_reuses_unchanged_integrals(coefficients):
+    f, g, h, v = coefficients
+    fd1 = compute_form_data(f**2*v*dx(1) + g*v*dx(2) + h*v*dx, do_compute_integral_digests=True)
+    assert all(fd1.changed_integral_data)
+
+    F = f**2*v*dx(1) + (g + 1)*v*dx(2) + h*v*dx
+    fd2 = compute_form_data(F, previous_form_data=fd1)
+    assert changed_subdomains(fd2) == {1: False, 2: True, "otherwise": False}
+    assert signatures(fd2) == signatures(compute_form_data(F))
+
+    # The preprocessed integrals of unchanged integral data are reused
+    for itg_data1, itg_data2 in zip(fd1.integral_data, fd2.integral_data):
+        if itg_data2.subdomain_id != 2:
+            assert all(a is b for a, b in zip(itg_data1.integrals, itg_data2.integrals))
+
+    # An equal form built again from the same terminals is unchanged
+    fd3 = compute_form_data(f**2*v*dx(1) + (g + 1)*v*dx(2) + h*v*dx, previous_form_data=fd2)
+    assert not any(fd3.changed_integral_data)
+    assert signatures(fd3) == signatures(fd2)
+
+
+def test_incremental_form_data_tracks_everywhere_integrals(coefficients):
+    f, g, h, v = coefficients
+    fd1 = compute_form_data(f*v*dx(1) + g*v*dx((1, 2)) + h*v*dx, do_compute_integral_digests=True)
+
+    # Everywhere integrals are appended to each subdomain
+    F = f*v*dx(1) + g*v*dx((1, 2)) + h**2*v*dx
+    fd2 = compute_form_data(F, previous_form_data=fd1)
+    assert changed_subdomains(fd2) == {1: True, 2: True, "otherwise": True}
+    assert signatures(fd2) == signatures(compute_form_data(F))
+
+    # Integrals over several subdomains are split
+    F = f*v*dx(1) + g*v*dx((1, 3)) + h**2*v*dx
+    fd3 = compute_form_data(F, previous_form_data=fd2)
+    assert changed_subdomains(fd3) == {1: False, 3: True, "otherwise": False}
+    assert signatures(fd3) == signatures(compute_form_data(F))
+
+
+def test_incremental_form_data_recomputes_for_other_options(coefficients):
+    f, g, h, v = coefficients
+    F = f*v*dx(1) + g*v*ds
+    fd1 = compute_form_data(F, do_compute_integral_digests=True)
+    fd2 = compute_form_data(F, previous_form_data=fd1, do_apply_geometry_lowering=True,
+                            do_apply_integral_scaling=True)
+    assert all(fd2.changed_integral_data)
+    fd3 = compute_form_data(F, previous_form_data=fd1)
+    assert not any(fd3.changed_integral_data)
+
+
+def test_incremental_form_data_needs_digests(coefficients):
+    f, g, h, v = coefficients
+    F = f*v*dx(1) + g*v*ds
+    fd1 = compute_form_data(F)
+    assert fd1.integral_data_digests is None
+    fd2 = compute_form_data(F, previous_form_data=fd1)
+    assert all(fd2.changed_integral_data)
+    assert fd2.integral_data_digests is not None
+    fd3 = compute_form_data(F, previous_form_data=fd2)
+    assert not any(fd3.changed_integral_data)
@@ -0,0 +1,73 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_data, compute_dependencies, compute_integral_data_dependencies
+from ufl.algorithms.loop_invariance import CELL_GEOMETRY, QUADRATURE_POINT, COEFFICIENT
+from ufl.algorithms.loop_invariance import TEST_FUNCTION, TRIAL_FUNCTION
+from ufl.classes import ReferenceGrad, ReferenceValue
+
+
+@pytest.fixture
+def functions():
+    V = VectorElement("CG", triangle, 1)
+    f = Coefficient(FiniteElement("CG", triangle, 2))
+    return TrialFunction(V), TestFunction(V), f
+
+
+def test_dependencies_of_terminals(functions):
+    u, v, f = functions
+    k = Constant(triangle)
+    g = Coefficient(FiniteElement("DG", triangle, 0))
+    x = SpatialCoordinate(triangle)
+    n = FacetNormal(triangle)
+    e = k*g*f*x[0]*n[1]*u[0]*v[1]
+    deps = compute_dependencies([e])
+    assert deps[k] == frozenset()
+    assert deps[g] == frozenset((COEFFICIENT,))
+    assert deps[f] == frozenset((COEFFICIENT, QUADRATURE_POINT))
+    assert deps[x] == frozenset((CELL_GEOMETRY, QUADRATURE_POINT))
+    assert deps[n] == frozenset((CELL_GEOMETRY,))
+    assert deps[u] == frozenset((TRIAL_FUNCTION, QUADRATURE_POINT))
+    assert deps[v] == frozenset((TEST_FUNCTION, QUADRATURE_POINT))
+    assert deps[k*g] == frozenset((COEFFICIENT,))
+    assert deps[e] == frozenset((CELL_GEOMETRY, QUADRATURE_POINT, COEFFICIENT,
+                                 TEST_FUNCTION, TRIAL_FUNCTION))
+
+
+def test_dependencies_of_derivatives(functions):
+    u, v, f = functions
+    deps = compute_dependencies([grad(u), grad(grad(f)), grad(f)])
+    # Gradients of linear functions on affine cells are cellwise constant
+    assert deps[grad(u)] == frozenset((TRIAL_FUNCTION, CELL_GEOMETRY))
+    assert deps[grad(grad(f))] == frozenset((COEFFICIENT, CELL_GEOMETRY))
+    assert deps[grad(f)] == frozenset((COEFFICIENT, CELL_GEOMETRY, QUADRATURE_POINT))
+
+    Q = FiniteElement("Q", quadrilateral, 1)
+    w = TestFunction(Q)
+    deps = compute_dependencies([grad(w)])
+    assert QUADRATURE_POINT in deps[grad(w)]
+
+
+def test_dependencies_of_integral_data(functions):
+    u, v, f = functions
+    fd = compute_form_data(exp(f)*inner(grad(u), grad(v))*dx,
+                           do_apply_function_pullbacks=True,
+                           do_apply_integral_scaling=True,
+                           do_apply_geometry_lowering=True)
+    itg_data = fd.integral_data[0]
+    deps = compute_integral_data_dependencies(itg_data)
+    assert itg_data.expression_dependencies is deps
+    assert compute_integral_data_dependencies(itg_data) is deps
+
+    integrand = itg_data.integrals[0].integrand()
+    assert deps[integrand] == frozenset((CELL_GEOMETRY, QUADRATURE_POINT, COEFFICIENT,
+                                         TEST_FUNCTION, TRIAL_FUNCTION))
+
+    # The geometry of an affine cell is invariant in the quadrature
+    # loop, and the reference gradients of linear basis functions are
+    # invariant over cells
+    J = [e for e in deps if isinstance(e, ReferenceGrad) and isinstance(e.ufl_operands[0], SpatialCoordinate)]
+    assert [deps[e] for e in J] == [frozenset((CELL_GEOMETRY,))]
+    dv = [e for e in deps if isinstance(e, ReferenceGrad) and e.ufl_operands[0] == ReferenceValue(v)]
+    assert [deps[e] for e in dv] == [frozenset((TEST_FUNCTION,))]
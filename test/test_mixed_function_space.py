@@ -10,7 +10,7 @@ import pytest
 
 from ufl import *
 from ufl.domain import default_domain
-from ufl.algorithms.formsplitter import extract_blocks 
+from ufl.algorithms.formsplitter import extract_blocks, extract_all_blocks, split_blocks, FormSplitter
 
 
 
@@ -78,3 +78,47 @@ def test_mixed_functionspace(self):
     assert ( extract_blocks(f,0) == f_3 )
     assert ( extract_blocks(f,1) == f_2 )
     assert ( extract_blocks(f,2) == f_1 )
+
+
+def test_extract_all_blocks(self):
+    domain = default_domain(triangle)
+    V = FunctionSpace(domain, VectorElement("CG", triangle, 2))
+    Q = FunctionSpace(domain, FiniteElement("CG", triangle, 1))
+    W = MixedFunctionSpace(V, Q)
+    u, p = TrialFunctions(W)
+    v, q = TestFunctions(W)
+    f = Coefficient(Q)
+
+    a_00 = inner(grad(u), grad(v))*dx
+    a_01 = div(v)*p*dx
+    a_10 = div(u)*q*dx
+    a = a_00 + a_01 + a_10
+    L = f*q*dx
+
+    blocks = extract_all_blocks(a)
+    assert len(blocks) == 2 and all(len(row) == 2 for row in blocks)
+    assert blocks[0][1] == extract_blocks(a, 0, 1)
+    assert blocks[1][0] == extract_blocks(a, 1, 0)
+    # Structurally zero blocks are not constructed
+    assert blocks[1][1] is None
+    assert extract_blocks(a, 1, 1) is None
+    assert extract_blocks(a)[3] is None
+
+    assert extract_all_blocks(L) == (L,)
+
+
+def test_split_blocks_of_mixed_element():
+    P2 = VectorElement("CG", triangle, 2)
+    P1 = FiniteElement("CG", triangle, 1)
+    TH = MixedElement([P2, P1])
+    u, p = TrialFunctions(TH)
+    v, q = TestFunctions(TH)
+    f = Coefficient(P1)
+    a = inner(grad(u), grad(v))*dx + div(v)*p*dx + div(u)*q*dx \
+        + conditional(lt(f, 0.5), dot(u, v), f*dot(u, v))*ds
+
+    blocks = split_blocks(a)
+    assert sorted(blocks) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    splitter = FormSplitter()
+    for (i, j), block in blocks.items():
+        assert block == splitter.split(a, i, j)
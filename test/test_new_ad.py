@@ -6,6 +6,7 @@ from ufl import *
 
 from ufl.tensors import as_tensor
 from ufl.classes import Grad
+from ufl.corealg.traversal import pre_traversal
 from ufl.algorithms import tree_format
 from ufl.algorithms.renumbering import renumber_indices
 from ufl.algorithms.apply_derivatives import apply_derivatives, GenericDerivativeRuleset, \
@@ -215,3 +216,23 @@ def test_variable_ruleset():
 
 def test_gateaux_ruleset():
     pass
+
+
+def test_nested_grads_are_shared_within_pass():
+    cell = triangle
+    V = FiniteElement("Lagrange", cell, 3)
+    u = Coefficient(V)
+    v = TestFunction(V)
+
+    # Biharmonic-like expression with several grad(grad(u)) occurrences
+    f = grad(grad(u))[0, 0]*grad(grad(u))[1, 1] + grad(grad(u))[0, 1]**2
+    df = apply_derivatives(derivative(f, u, v))
+
+    ggv = set(id(o) for o in pre_traversal(df)
+              if isinstance(o, Grad) and o.ufl_operands[0] == grad(v))
+    assert len(ggv) == 1
+
+    # Objects built for identical nested grads are reused
+    rules = GradRuleset(cell.geometric_dimension())
+    assert rules(grad(grad(u))) is rules(grad(grad(u)))
+    assert rules(grad(grad(u))) == grad(grad(grad(u)))
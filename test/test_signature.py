@@ -506,3 +506,64 @@ def test_signature_of_forms_change_with_operators(self):
                 a = f*dx
                 yield a
     check_unique_signatures(forms())
+
+
+def test_integral_data_signature_is_shared_between_forms():
+    from ufl.algorithms import compute_form_data
+    cell = triangle
+    V = FiniteElement("CG", cell, 1)
+    v = TestFunction(V)
+    f = Coefficient(V)
+    g = Coefficient(V)
+    h = Coefficient(V)
+    c = Constant(cell)
+
+    fd1 = compute_form_data(f*v*dx + c*g*v*ds)
+    fd2 = compute_form_data(h*g*v*dx + c*h*v*ds)
+    fd3 = compute_form_data(f*v*dx(1) + g*v*dx(2) + c*g*v*ds(metadata={"quadrature_degree": 4}))
+
+    sigs1 = {itgd.integral_type: itgd.signature for itgd in fd1.integral_data}
+    sigs2 = {itgd.integral_type: itgd.signature for itgd in fd2.integral_data}
+    assert all(isinstance(s, str) for s in sigs1.values())
+
+    # Same integrand structure with different coefficients and constants
+    assert sigs1["exterior_facet"] == sigs2["exterior_facet"]
+    assert sigs1["cell"] != sigs2["cell"]
+
+    # Subdomain ids do not affect the signature, metadata does
+    sigs3 = [itgd.signature for itgd in fd3.integral_data]
+    assert sigs3[0] == sigs3[1] == sigs1["cell"]
+    assert sigs3[2] != sigs1["exterior_facet"]
+
+
+def test_integral_data_signature_is_affected_by_elements():
+    from ufl.algorithms import compute_form_data
+    cell = triangle
+    V1 = FiniteElement("CG", cell, 1)
+    V2 = FiniteElement("CG", cell, 2)
+    v = TestFunction(V1)
+    f1 = Coefficient(V1)
+    f2 = Coefficient(V2)
+
+    sig1, = [itgd.signature for itgd in compute_form_data(f1*v*dx).integral_data]
+    sig2, = [itgd.signature for itgd in compute_form_data(f2*v*dx).integral_data]
+    assert sig1 != sig2
+
+
+def test_integral_data_signature_is_computed_on_first_access():
+    from ufl.algorithms import compute_form_data
+    cell = tetrahedron
+    V = VectorElement("CG", cell, 1)
+    u = Coefficient(V)
+    v = TestFunction(V)
+    F = Identity(3) + grad(u)
+    J = det(F)
+    # The tree of the derivative is much larger than its DAG
+    a = derivative(derivative(ln(J)**2*tr(F.T*F)*dx, u, v), u)
+    fd = compute_form_data(a)
+    itg_data, = fd.integral_data
+    assert itg_data._signature is None
+    sig = itg_data.signature
+    assert isinstance(sig, str)
+    assert itg_data.signature is sig
+    assert compute_form_data(a).integral_data[0].signature == sig
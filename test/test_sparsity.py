@@ -0,0 +1,76 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.domain import default_domain
+from ufl.algorithms import compute_form_sparsity, compute_form_block_sparsity
+
+
+@pytest.fixture
+def taylor_hood():
+    P2 = VectorElement("CG", triangle, 2)
+    P1 = FiniteElement("CG", triangle, 1)
+    return MixedElement([P2, P1])
+
+
+def diagonal(n):
+    return set(((None, (i,)), (None, (i,))) for i in range(n))
+
+
+def test_vector_laplacian_sparsity():
+    V = VectorElement("CG", triangle, 1)
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    assert compute_form_sparsity(inner(grad(u), grad(v))*dx) == diagonal(2)
+    assert compute_form_sparsity(dot(u, v)*dx + inner(grad(u), grad(v))*ds) == diagonal(2)
+    assert compute_form_sparsity(u[0]*v[1]*dx) == set([((None, (1,)), (None, (0,)))])
+
+    # The symmetric gradient couples all components
+    a = inner(sym(grad(u)), sym(grad(v)))*dx
+    assert len(compute_form_sparsity(a)) == 4
+
+
+def test_sparsity_with_coefficients():
+    V = VectorElement("CG", triangle, 1)
+    f = Coefficient(FiniteElement("CG", triangle, 1))
+    u = TrialFunction(V)
+    v = TestFunction(V)
+    a = exp(f)*dot(u, v)*dx + conditional(lt(f, 0), 1, 2)*u[1]*v[1]*ds
+    assert compute_form_sparsity(a) == diagonal(2)
+
+    # Nonlinear functions of arguments are handled conservatively
+    a = abs(u[0]*f)*v[1]*dx
+    assert compute_form_sparsity(a) == set([((None, (1,)), (None, (0,)))])
+
+
+def test_stokes_block_sparsity(taylor_hood):
+    u, p = TrialFunctions(taylor_hood)
+    v, q = TestFunctions(taylor_hood)
+    a = inner(grad(u), grad(v))*dx - div(v)*p*dx - div(u)*q*dx
+    assert compute_form_block_sparsity(a) == set([(0, 0), (0, 1), (1, 0)])
+    assert compute_form_block_sparsity(a + 1e-3*p*q*dx) == set([(0, 0), (0, 1), (1, 0), (1, 1)])
+
+    # The velocity components only couple through the pressure
+    sparsity = compute_form_sparsity(a)
+    assert ((None, (0,)), (None, (1,))) not in sparsity
+    assert ((None, (0,)), (None, (2,))) in sparsity
+    assert ((None, (2,)), (None, (2,))) not in sparsity
+
+
+def test_mixed_function_space_block_sparsity():
+    cell = triangle
+    domain = default_domain(cell)
+    V = FunctionSpace(domain, FiniteElement("CG", cell, 1))
+    Q = FunctionSpace(domain, FiniteElement("DG", cell, 0))
+    W = MixedFunctionSpace(V, Q)
+    u, p = TrialFunctions(W)
+    v, q = TestFunctions(W)
+    a = inner(grad(u), grad(v))*dx + p*v*dx + p*q*dx
+    assert compute_form_block_sparsity(a) == set([(0, 0), (0, 1), (1, 1)])
+
+
+def test_sparsity_requires_bilinear_form():
+    V = FiniteElement("CG", triangle, 1)
+    v = TestFunction(V)
+    with pytest.raises(UFLException):
+        compute_form_sparsity(v*dx)
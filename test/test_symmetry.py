@@ -0,0 +1,95 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_symmetry, is_symmetric_form
+
+
+@pytest.fixture
+def arguments():
+    V = VectorElement("CG", triangle, 1)
+    return TrialFunction(V), TestFunction(V)
+
+
+def test_elasticity_is_symmetric(arguments):
+    u, v = arguments
+    mu = Constant(triangle)
+    lmbda = Constant(triangle)
+
+    def sigma(w):
+        return 2*mu*sym(grad(w)) + lmbda*tr(sym(grad(w)))*Identity(2)
+
+    a = inner(sigma(u), sym(grad(v)))*dx
+    assert is_symmetric_form(a)
+
+    # Complex constants make the form non-Hermitian
+    assert not is_symmetric_form(a, complex_mode=True)
+
+
+def test_diffusion_is_symmetric(arguments):
+    u, v = arguments
+    f = Coefficient(FiniteElement("CG", triangle, 1))
+    assert is_symmetric_form(f*inner(grad(u), grad(v))*dx + 2*dot(u, v)*ds)
+    assert is_symmetric_form((u[0]*v[1] + u[1]*v[0])*dx)
+    assert is_symmetric_form(inner(jump(u), jump(v))*dS)
+    assert not is_symmetric_form(u[0]*v[1]*dx)
+    assert not is_symmetric_form(inner(avg(u), jump(v))*dS)
+    assert not is_symmetric_form(dot(grad(u)*Coefficient(u.ufl_element()), v)*dx)
+
+
+def test_symmetry_per_integral(arguments):
+    u, v = arguments
+    a = inner(grad(u), grad(v))*dx + u[0]*v[1]*ds
+    symmetry = compute_form_symmetry(a)
+    assert sorted((itg.integral_type(), s) for itg, s in symmetry.items()) == \
+        [("cell", True), ("exterior_facet", False)]
+    assert not is_symmetric_form(a)
+
+
+def test_hermitian_forms(arguments):
+    u, v = arguments
+    f = Coefficient(FiniteElement("CG", triangle, 1))
+    assert is_symmetric_form(inner(grad(u), grad(v))*dx + abs(f)*inner(u, v)*ds,
+                             complex_mode=True)
+    assert is_symmetric_form(1j*(u[0]*conj(v[1]) - u[1]*conj(v[0]))*dx, complex_mode=True)
+    assert not is_symmetric_form(1j*inner(u, v)*dx, complex_mode=True)
+    assert not is_symmetric_form(f*inner(u, v)*dx, complex_mode=True)
+
+
+def test_different_spaces_are_not_symmetric():
+    u = TrialFunction(FiniteElement("CG", triangle, 2))
+    v = TestFunction(FiniteElement("CG", triangle, 1))
+    assert not is_symmetric_form(u*v*dx)
+
+
+def test_nonlinear_jacobians_are_symmetric():
+    V = VectorElement("CG", triangle, 1)
+    w = Coefficient(V)
+    v = TestFunction(V)
+    du = TrialFunction(V)
+    a = derivative(derivative(ln(1 + dot(w, w))*dx, w, v), w, du)
+    assert is_symmetric_form(a)
+    assert not is_symmetric_form(du[0]*v[1]/(1 + dot(w, w))*dx)
+
+    # Compressible neo-Hookean hyperelasticity
+    V = VectorElement("CG", tetrahedron, 1)
+    u = Coefficient(V)
+    v = TestFunction(V)
+    du = TrialFunction(V)
+    mu = Constant(tetrahedron)
+    lmbda = Constant(tetrahedron)
+    F = Identity(3) + grad(u)
+    C = F.T*F
+    J = det(F)
+    psi = (mu/2)*(tr(C) - 3) - mu*ln(J) + (lmbda/2)*ln(J)**2
+    a = derivative(derivative(psi*dx, u, v), u, du)
+    assert is_symmetric_form(a)
+
+
+def test_symmetry_of_vanishing_forms(arguments):
+    u, v = arguments
+    # The derivative of the integrand vanishes
+    f = Coefficient(u.ufl_element())
+    g = Coefficient(u.ufl_element())
+    a = derivative(dot(g, v)*dx, f, u)
+    assert is_symmetric_form(a)
@@ -0,0 +1,92 @@
+#!/usr/bin/env py.test
+# -*- coding: utf-8 -*-
+import pytest
+from ufl import *
+from ufl.algorithms import compute_form_data, extract_tensor_product_factors
+from ufl.algorithms import compute_integral_data_tensor_product_factors, is_sum_factorizable
+from ufl.classes import ReferenceGrad, ReferenceValue
+
+
+def form_data(a):
+    return compute_form_data(a,
+                             do_apply_function_pullbacks=True,
+                             do_apply_geometry_lowering=True,
+                             do_apply_integral_scaling=True,
+                             do_apply_restrictions=True)
+
+
+def test_factors_of_quadrilateral_element():
+    element = FiniteElement("Q", quadrilateral, 3)
+    v = TestFunction(element)
+    line = FiniteElement("CG", interval, 3)
+    assert extract_tensor_product_factors(ReferenceValue(v)) == ((line, 0), (line, 0))
+    dv = ReferenceGrad(ReferenceValue(v))
+    assert extract_tensor_product_factors(dv[0]) == ((line, 1), (line, 0))
+    assert extract_tensor_product_factors(ReferenceGrad(dv)[1, 1]) == ((line, 0), (line, 2))
+
+    # Physical derivatives do not separate
+    assert extract_tensor_product_factors(grad(v)[0]) is None
+
+
+def test_factors_of_tensor_product_element():
+    A = FiniteElement("CG", interval, 2)
+    B = FiniteElement("DG", interval, 1)
+    C = FiniteElement("CG", interval, 1)
+    element = TensorProductElement(TensorProductElement(A, B, cell=quadrilateral), C,
+                                   cell=hexahedron)
+    v = TestFunction(element)
+    dv = ReferenceGrad(ReferenceValue(v))
+    assert extract_tensor_product_factors(dv[1]) == ((A, 0), (B, 1), (C, 0))
+
+
+def test_factors_of_vector_element():
+    element = VectorElement("DQ", hexahedron, 1)
+    v = TestFunction(element)
+    line = FiniteElement("DG", interval, 1)
+    dv = ReferenceGrad(ReferenceValue(v))
+    assert extract_tensor_product_factors(dv[2, 0]) == ((line, 1), (line, 0), (line, 0))
+
+
+def test_non_tensor_product_elements():
+    for element in (FiniteElement("CG", triangle, 2),
+                    FiniteElement("S", quadrilateral, 2)):
+        v = TestFunction(element)
+        assert extract_tensor_product_factors(ReferenceValue(v)) is None
+    v = TestFunction(FiniteElement("RTCF", quadrilateral, 1))
+    assert extract_tensor_product_factors(ReferenceValue(v)[0]) is None
+
+
+def test_laplace_on_hexahedra_is_sum_factorizable():
+    element = FiniteElement("Q", hexahedron, 2)
+    u = TrialFunction(element)
+    v = TestFunction(element)
+    f = Coefficient(element)
+    fd = form_data(f*inner(grad(u), grad(v))*dx)
+    itg_data, = fd.integral_data
+    assert is_sum_factorizable(itg_data)
+    factors, = compute_integral_data_tensor_product_factors(itg_data)
+    assert len(factors) == 6
+    line = FiniteElement("CG", interval, 2)
+    for f in factors.values():
+        assert sorted(n for e, n in f) == [0, 0, 1]
+        assert all(e == line for e, n in f)
+    assert itg_data.tensor_product_factors is not None
+
+
+def test_triangles_are_not_sum_factorizable():
+    element = FiniteElement("CG", triangle, 2)
+    u = TrialFunction(element)
+    v = TestFunction(element)
+    itg_data, = form_data(u*v*dx).integral_data
+    assert not is_sum_factorizable(itg_data)
+
+
+def test_mixed_element_on_quadrilateral():
+    P2 = VectorElement("Q", quadrilateral, 2)
+    S = FiniteElement("S", quadrilateral, 1)
+    u, p = TrialFunctions(P2*S)
+    v, q = TestFunctions(P2*S)
+    itg_data, = form_data(inner(grad(u), grad(v))*dx + p*q*dx).integral_data
+    assert not is_sum_factorizable(itg_data)
+    itg_data, = form_data(inner(grad(u), grad(v))*dx).integral_data
+    assert is_sum_factorizable(itg_data)
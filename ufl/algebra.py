@@ -13,6 +13,7 @@ from ufl.log import error
 from ufl.core.ufl_type import ufl_type
 from ufl.core.expr import ufl_err_str
 from ufl.core.operator import Operator
+from ufl import constantvalue
 from ufl.constantvalue import Zero, zero, ScalarValue, IntValue, ComplexValue, as_ufl
 from ufl.checks import is_ufl_scalar, is_true_ufl_scalar
 from ufl.index_combination_utils import merge_unique_indices
@@ -22,6 +23,60 @@ from ufl.precedence import parstr
 # --- Algebraic operators ---
 
 
+def _has_literal_operand(e, cls):
+    "Check if e is a cls operator with a literal first operand."
+    return isinstance(e, cls) and isinstance(e.ufl_operands[0], ScalarValue)
+
+
+def _split_literal_operand(e, cls):
+    """Split e into the value of a literal operand and the remaining
+    operand of a cls operator, or None if missing."""
+    if isinstance(e, ScalarValue):
+        return e._value, None
+    if _has_literal_operand(e, cls):
+        return e.ufl_operands[0]._value, e.ufl_operands[1]
+    return None, e
+
+
+def _fold_sum(a, b):
+    """Collect the literal terms of nested sums, e.g. 2 + (3 + f) -> 5 + f,
+    or return None if there is nothing to fold."""
+    if not (_has_literal_operand(a, Sum) or _has_literal_operand(b, Sum)):
+        return None
+    ca, fa = _split_literal_operand(a, Sum)
+    cb, fb = _split_literal_operand(b, Sum)
+    terms = [f for f in (fa, fb) if f is not None]
+    value = (0 if ca is None else ca) + (0 if cb is None else cb)
+    return Sum(as_ufl(value), terms[0] if len(terms) == 1 else Sum(*terms))
+
+
+def _fold_product(a, b):
+    """Collect the literal factors of nested products, e.g. 2*(3*f) -> 6*f,
+    or return None if there is nothing to fold."""
+    if not (_has_literal_operand(a, Product) or _has_literal_operand(b, Product)):
+        return None
+    ca, fa = _split_literal_operand(a, Product)
+    cb, fb = _split_literal_operand(b, Product)
+    factors = [f for f in (fa, fb) if f is not None]
+    value = (1 if ca is None else ca) * (1 if cb is None else cb)
+    return Product(as_ufl(value), factors[0] if len(factors) == 1 else Product(*factors))
+
+
+def _fold_division(a, b):
+    """Fold a literal denominator into the literal factor of a product,
+    e.g. (4*f)/2 -> 2*f, or into the literal denominator of a division,
+    e.g. f/2/4 -> f/8, or return None if there is nothing to fold."""
+    if not isinstance(b, ScalarValue):
+        return None
+    if _has_literal_operand(a, Product):
+        c, f = a.ufl_operands
+        return Product(Division(c, b), f)
+    if isinstance(a, Division) and isinstance(a.ufl_operands[1], ScalarValue):
+        f, c = a.ufl_operands
+        return Division(f, Product(c, b))
+    return None
+
+
 @ufl_type(num_ops=2,
           inherit_shape_from_operand=0, inherit_indices_from_operand=0,
           binop="__add__", rbinop="__radd__")
@@ -50,6 +105,12 @@ class Sum(Operator):
         elif isinstance(b, Zero):
             return a
 
+        # Collect the literal terms of nested sums
+        if constantvalue._constant_folding:
+            folded = _fold_sum(a, b)
+            if folded is not None:
+                return folded
+
         # Handle scalars specially and sort operands
         sa = isinstance(a, ScalarValue)
         sb = isinstance(b, ScalarValue)
@@ -135,6 +196,11 @@ class Product(Operator):
                                            b.ufl_free_indices,
                                            b.ufl_index_dimensions)
             return Zero((), fi, fid)
+        # Collect the literal factors of nested products
+        if constantvalue._constant_folding:
+            folded = _fold_product(a, b)
+            if folded is not None:
+                return folded
         sa = isinstance(a, ScalarValue)
         sb = isinstance(b, ScalarValue)
         if sa and sb:  # const * const = const
@@ -231,6 +297,12 @@ class Division(Operator):
                 return as_ufl(float(a._value) / float(b._value))
             except TypeError:
                 return as_ufl(complex(a._value) / complex(b._value))
+        # Fold literal denominators into literal factors and
+        # denominators of the nominator
+        if constantvalue._constant_folding:
+            folded = _fold_division(a, b)
+            if folded is not None:
+                return folded
         # Simplification "a / a" -> "1"
         # if not a.ufl_free_indices and not a.ufl_shape and a == b:
         #    return as_ufl(1)
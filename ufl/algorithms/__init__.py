@@ -19,8 +19,24 @@
 
 __all__ = [
     "estimate_total_polynomial_degree",
+    "estimate_argument_degrees",
+    "estimate_integrand_cost",
+    "compute_argument_factorization",
+    "compute_integral_data_factorizations",
+    "compute_dependencies",
+    "compute_integral_data_dependencies",
+    "extract_tensor_product_factors",
+    "compute_integral_data_tensor_product_factors",
+    "is_sum_factorizable",
+    "compute_geometry_tables",
+    "eliminate_common_subexpressions",
+    "eliminate_integral_data_subexpressions",
+    "fold_constants",
+    "optimize_expression",
+    "optimize_integrands",
     "sort_elements",
     "compute_form_data",
+    "FormTemplate",
     "purge_list_tensors",
     "apply_transformer",
     "ReuseTransformer",
@@ -50,6 +66,11 @@ __all__ = [
     "compute_form_rhs",
     "compute_form_functional",
     "compute_form_signature",
+    "compute_form_linearity",
+    "compute_form_sparsity",
+    "compute_form_block_sparsity",
+    "compute_form_symmetry",
+    "is_symmetric_form",
     "tree_format",
 ]
 
@@ -80,9 +101,13 @@ from ufl.algorithms.analysis import (
 # Preprocessing a form to extract various meta data
 # from ufl.algorithms.formdata import FormData
 from ufl.algorithms.compute_form_data import compute_form_data
+from ufl.algorithms.form_template import FormTemplate
 
 # Utilities for checking properties of forms
 from ufl.algorithms.signature import compute_form_signature
+from ufl.algorithms.check_linearity import compute_form_linearity
+from ufl.algorithms.sparsity import compute_form_sparsity, compute_form_block_sparsity
+from ufl.algorithms.symmetry import compute_form_symmetry, is_symmetric_form
 
 # Utilities for error checking of forms
 from ufl.algorithms.checks import validate_form
@@ -98,7 +123,18 @@ from ufl.algorithms.replace import replace
 from ufl.algorithms.change_to_reference import change_to_reference_grad
 from ufl.algorithms.expand_compounds import expand_compounds
 # from ufl.algorithms.estimate_degrees import SumDegreeEstimator
-from ufl.algorithms.estimate_degrees import estimate_total_polynomial_degree
+from ufl.algorithms.estimate_degrees import estimate_total_polynomial_degree, estimate_argument_degrees
+from ufl.algorithms.estimate_cost import estimate_integrand_cost
+from ufl.algorithms.argument_factorization import compute_argument_factorization
+from ufl.algorithms.argument_factorization import compute_integral_data_factorizations
+from ufl.algorithms.loop_invariance import compute_dependencies, compute_integral_data_dependencies
+from ufl.algorithms.tensor_product_structure import extract_tensor_product_factors
+from ufl.algorithms.tensor_product_structure import compute_integral_data_tensor_product_factors, is_sum_factorizable
+from ufl.algorithms.geometry_table import compute_geometry_tables
+from ufl.algorithms.common_subexpressions import eliminate_common_subexpressions
+from ufl.algorithms.common_subexpressions import eliminate_integral_data_subexpressions
+from ufl.algorithms.fold_constants import fold_constants
+from ufl.algorithms.equality_saturation import optimize_expression, optimize_integrands
 from ufl.algorithms.expand_indices import expand_indices, purge_list_tensors
 
 # Utilities for transforming complete Forms into other Forms
@@ -12,7 +12,7 @@ equivalent representations using basic operators."""
 
 from ufl.log import error
 
-from ufl.classes import Product, Grad, Conj
+from ufl.classes import Expr, Product, Grad, Conj
 from ufl.core.multiindex import indices, Index, FixedIndex
 from ufl.tensors import as_tensor, as_matrix, as_vector
 
@@ -26,8 +26,18 @@ class LowerCompoundAlgebra(MultiFunction):
     """Expands high level compound operators (e.g. inner) to equivalent
     representations using basic operators (e.g. index notation)."""
 
-    def __init__(self):
+    def __init__(self, preserve_types=(), share_cofactors=False):
         MultiFunction.__init__(self)
+        self._share_cofactors = share_cofactors
+        # Store preserve_types as boolean lookup table
+        self._preserve_types = [False] * Expr._ufl_num_typecodes_
+        for cls in preserve_types:
+            self._preserve_types[cls._ufl_typecode_] = True
+
+        # Lowered determinant and cofactor expressions for each
+        # operand, shared between det, cofactor and inverse
+        self._determinants = {}
+        self._cofactors = {}
 
     expr = MultiFunction.reuse_if_untouched
 
@@ -125,14 +135,44 @@ class LowerCompoundAlgebra(MultiFunction):
         s = Conj(a[ii]) * b[jj]
         return as_tensor(s, ii + jj)
 
+    def _determinant_expr(self, A):
+        "Lower det(A), reusing the expression if already lowered for this A."
+        detA = self._determinants.get(A)
+        if detA is None:
+            detA = determinant_expr(A)
+            self._determinants[A] = detA
+        return detA
+
+    def _cofactor_expr(self, A):
+        "Lower cofactor(A), reusing the expression if already lowered for this A."
+        cofA = self._cofactors.get(A)
+        if cofA is None:
+            cofA = cofactor_expr(A)
+            self._cofactors[A] = cofA
+        return cofA
+
     def determinant(self, o, A):
-        return determinant_expr(A)
+        if self._preserve_types[o._ufl_typecode_]:
+            return self.reuse_if_untouched(o, A)
+        return self._determinant_expr(A)
 
     def cofactor(self, o, A):
-        return cofactor_expr(A)
+        if self._preserve_types[o._ufl_typecode_]:
+            return self.reuse_if_untouched(o, A)
+        return self._cofactor_expr(A)
 
     def inverse(self, o, A):
-        return inverse_expr(A)
+        if self._preserve_types[o._ufl_typecode_]:
+            return self.reuse_if_untouched(o, A)
+        n = A.ufl_shape[0]
+        if not self._share_cofactors or n not in (2, 3):
+            return inverse_expr(A)
+        # inv(A) = adj(A) / det(A) = cofactor(A)^T / det(A), built from
+        # the same determinant and cofactor nodes as det(A) and
+        # cofactor(A) such that these are shared in the lowered DAG
+        cofA = self._cofactor_expr(A)
+        adjA = as_matrix([[cofA[j, i] for j in range(n)] for i in range(n)])
+        return adjA / self._determinant_expr(A)
 
     # ------------ Compound differential operators
 
@@ -169,7 +209,18 @@ class LowerCompoundAlgebra(MultiFunction):
         error("Invalid shape %s of curl argument." % (sh,))
 
 
-def apply_algebra_lowering(expr):
+def apply_algebra_lowering(expr, preserve_types=(), share_cofactors=False):
     """Expands high level compound operators (e.g. inner) to equivalent
-    representations using basic operators (e.g. index notation)."""
-    return map_integrand_dags(LowerCompoundAlgebra(), expr)
+    representations using basic operators (e.g. index notation).
+
+    Operators with types in *preserve_types* are kept, with their
+    operands lowered.  Preserving ``Determinant``, ``Inverse`` and
+    ``Cofactor`` allows apply_derivatives to differentiate these
+    without expanding them first, after which a second call to this
+    function lowers them.
+
+    If *share_cofactors* is true, the inverses of 2x2 and 3x3 matrices
+    are lowered as the transposed cofactor divided by the determinant,
+    using a single shared determinant and cofactor expression per
+    operand and integrand for det, cofac and inv."""
+    return map_integrand_dags(LowerCompoundAlgebra(preserve_types, share_cofactors), expr)
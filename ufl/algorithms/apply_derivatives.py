@@ -23,10 +23,12 @@ from ufl.classes import Indexed, ListTensor, ComponentTensor
 from ufl.classes import ExprList, ExprMapping
 from ufl.classes import Product, Sum, IndexSum
 from ufl.classes import Conj, Real, Imag
+from ufl.classes import Determinant, Inverse, Cofactor
 from ufl.classes import JacobianInverse
 from ufl.classes import SpatialCoordinate
 
 from ufl.constantvalue import is_true_ufl_scalar, is_ufl_scalar
+from ufl.compound_expressions import cofactor_expr
 from ufl.operators import (conditional, sign,
                            sqrt, exp, ln, cos, sin, cosh, sinh,
                            bessel_J, bessel_Y, bessel_I, bessel_K,
@@ -34,7 +36,7 @@ from ufl.operators import (conditional, sign,
 
 from math import pi
 
-from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.multifunction import MultiFunction, memoized_handler
 from ufl.corealg.map_dag import map_expr_dag
 from ufl.algorithms.map_integrands import map_integrand_dags
 
@@ -53,6 +55,28 @@ from ufl.differentiation import CoordinateDerivative
 CONDITIONAL_WORKAROUND = False
 
 
+def _nested_grads(f, ngrads, grad_cache):
+    """Return Grad applied ngrads times to f, reusing nested Grad objects
+    previously built for the same f from grad_cache."""
+    if ngrads == 0:
+        return f
+    key = (f, ngrads)
+    g = grad_cache.get(key)
+    if g is None:
+        g = Grad(_nested_grads(f, ngrads - 1, grad_cache))
+        grad_cache[key] = g
+    return g
+
+
+def _split_grads(o):
+    "Return the terminal and number of Grads wrapping it in o = grad(...grad(f))."
+    ngrads = 0
+    while isinstance(o, Grad):
+        o, = o.ufl_operands
+        ngrads += 1
+    return o, ngrads
+
+
 class GenericDerivativeRuleset(MultiFunction):
     def __init__(self, var_shape):
         MultiFunction.__init__(self)
@@ -292,6 +316,45 @@ class GenericDerivativeRuleset(MultiFunction):
         # return conditional(eq(f, 0), 0, Product(sign(f), df))
         return sign(f) * df
 
+    # --- Compound tensor algebra
+
+    # These are normally lowered by apply_algebra_lowering before
+    # differentiation, but may be preserved to avoid differentiating
+    # the expanded determinant and cofactor formulas.
+
+    def determinant(self, o, dA):
+        "d(det A) = cofactor(A) : dA"
+        if isinstance(dA, Zero):
+            return self.independent_operator(o)
+        A, = o.ufl_operands
+        i, j = indices(2)
+        kk = indices(len(dA.ufl_shape) - 2)
+        return as_tensor(Cofactor(A)[i, j] * dA[(i, j) + kk], kk)
+
+    def inverse(self, o, dA):
+        "d(inv A) = -inv(A) dA inv(A)"
+        if isinstance(dA, Zero):
+            return self.independent_operator(o)
+        i, j, k, l = indices(4)
+        kk = indices(len(dA.ufl_shape) - 2)
+        return as_tensor(-o[i, k] * dA[(k, l) + kk] * o[l, j], (i, j) + kk)
+
+    def cofactor(self, o, dA):
+        "d(cofactor A) = d(det(A) inv(A)^T), assuming A is invertible"
+        if isinstance(dA, Zero):
+            return self.independent_operator(o)
+        A, = o.ufl_operands
+        i, j, k, l = indices(4)
+        kk = indices(len(dA.ufl_shape) - 2)
+        if A.ufl_shape[0] == 2:
+            # The 2x2 cofactor is linear in A
+            dcof = cofactor_expr(as_tensor(dA[(k, l) + kk], (k, l)))
+            return as_tensor(dcof[i, j], (i, j) + kk)
+        dAkl = dA[(k, l) + kk]
+        Ainv = Inverse(A)
+        op = Determinant(A) * (Ainv[l, k] * dAkl * Ainv[j, i] - Ainv[j, k] * dAkl * Ainv[l, i])
+        return as_tensor(op, (i, j) + kk)
+
     # --- Complex algebra
 
     def conj(self, o, df):
@@ -479,9 +542,12 @@ class GenericDerivativeRuleset(MultiFunction):
 
 
 class GradRuleset(GenericDerivativeRuleset):
-    def __init__(self, geometric_dimension):
+    def __init__(self, geometric_dimension, grad_cache=None):
         GenericDerivativeRuleset.__init__(self, var_shape=(geometric_dimension,))
         self._Id = Identity(geometric_dimension)
+        # Table (f, ngrads) -> grad(...grad(f)), may be shared between
+        # rulesets to reuse nested Grad objects
+        self._grad_cache = {} if grad_cache is None else grad_cache
 
     # --- Specialized rules for geometric quantities
 
@@ -523,7 +589,7 @@ class GradRuleset(GenericDerivativeRuleset):
     def coefficient(self, o):
         if is_cellwise_constant(o):
             return self.independent_terminal(o)
-        return Grad(o)
+        return _nested_grads(o, 1, self._grad_cache)
 
     def argument(self, o):
         # TODO: Enable this after fixing issue#13, unless we move
@@ -532,7 +598,7 @@ class GradRuleset(GenericDerivativeRuleset):
         #     # Collapse gradient of cellwise constant function to zero
         #     # TODO: Missing this type
         #     return AnnotatedZero(o.ufl_shape + self._var_shape, arguments=(o,))
-        return Grad(o)
+        return _nested_grads(o, 1, self._grad_cache)
 
     # --- Rules for values or derivatives in reference frame
 
@@ -570,18 +636,12 @@ class GradRuleset(GenericDerivativeRuleset):
         if not isinstance(o.ufl_operands[0], (Grad, Terminal)):
             error("Expecting only grads applied to a terminal.")
 
-        return Grad(o)
-
-    def _grad(self, o):
-        pass
         # TODO: Not sure how to detect that gradient of f is cellwise constant.
         #       Can we trust element degrees?
-        # if is_cellwise_constant(o):
-        #     return self.terminal(o)
         # TODO: Maybe we can ask "f.has_derivatives_of_order(n)" to check
         #       if we should make a zero here?
-        # 1) n = count number of Grads, get f
-        # 2) if not f.has_derivatives(n): return zero(...)
+        f, ngrads = _split_grads(o)
+        return _nested_grads(f, ngrads + 1, self._grad_cache)
 
     cell_avg = GenericDerivativeRuleset.independent_operator
     facet_avg = GenericDerivativeRuleset.independent_operator
@@ -647,15 +707,25 @@ class ReferenceGradRuleset(GenericDerivativeRuleset):
 
 
 class VariableRuleset(GenericDerivativeRuleset):
-    def __init__(self, var):
+    def __init__(self, var, identity_cache=None):
         GenericDerivativeRuleset.__init__(self, var_shape=var.ufl_shape)
         if var.ufl_free_indices:
             error("Differentiation variable cannot have free indices.")
         self._variable = var
+        # Table shape -> identity tensor, may be shared between
+        # rulesets to reuse the identity of variables of the same shape
+        self._identity_cache = {} if identity_cache is None else identity_cache
         self._Id = self._make_identity(self._var_shape)
 
     def _make_identity(self, sh):
         "Create a higher order identity tensor to represent dv/dv."
+        fp = self._identity_cache.get(sh)
+        if fp is None:
+            fp = self._build_identity(sh)
+            self._identity_cache[sh] = fp
+        return fp
+
+    def _build_identity(self, sh):
         res = None
         if sh == ():
             # Scalar dv/dv is scalar
@@ -759,7 +829,8 @@ class GateauxDerivativeRuleset(GenericDerivativeRuleset):
 
     """
 
-    def __init__(self, coefficients, arguments, coefficient_derivatives):
+    def __init__(self, coefficients, arguments, coefficient_derivatives,
+                 grad_cache=None, gprime_cache=None):
         GenericDerivativeRuleset.__init__(self, var_shape=())
 
         # Type checking
@@ -781,6 +852,13 @@ class GateauxDerivativeRuleset(GenericDerivativeRuleset):
         cd = coefficient_derivatives.ufl_operands
         self._cd = {cd[2 * i]: cd[2 * i + 1] for i in range(len(cd) // 2)}
 
+        # Tables (f, ngrads) -> grad(...grad(f)) and
+        # (vval, ngrads, vcomp, wshape, wcomp) -> variation term, may
+        # be shared between rulesets to reuse derivatives of nested
+        # gradients of the same terminal
+        self._grad_cache = {} if grad_cache is None else grad_cache
+        self._gprime_cache = {} if gprime_cache is None else gprime_cache
+
     # Explicitly defining dg/dw == 0
     geometric_quantity = GenericDerivativeRuleset.independent_terminal
 
@@ -866,6 +944,7 @@ class GateauxDerivativeRuleset(GenericDerivativeRuleset):
         #       this to allow the user to write
         #       derivative(...ReferenceValue...,...).
 
+    @memoized_handler
     def grad(self, g):
         # If we hit this type, it has already been propagated to a
         # coefficient (or grad of a coefficient), # FIXME: Assert
@@ -874,18 +953,12 @@ class GateauxDerivativeRuleset(GenericDerivativeRuleset):
         # derivatives w.r.t. single components...
 
         # Figure out how many gradients are around the inner terminal
-        ngrads = 0
-        o = g
-        while isinstance(o, Grad):
-            o, = o.ufl_operands
-            ngrads += 1
+        o, ngrads = _split_grads(g)
         if not isinstance(o, FormArgument):
             error("Expecting gradient of a FormArgument, not %s" % ufl_err_str(o))
 
         def apply_grads(f):
-            for i in range(ngrads):
-                f = Grad(f)
-            return f
+            return _nested_grads(f, ngrads, self._grad_cache)
 
         # Find o among all w without any indexing, which makes this
         # easy
@@ -914,6 +987,10 @@ class GateauxDerivativeRuleset(GenericDerivativeRuleset):
             return vval, vcomp
 
         def compute_gprimeterm(ngrads, vval, vcomp, wshape, wcomp):
+            key = (vval, ngrads, vcomp, wshape, tuple(wcomp))
+            gprimeterm = self._gprime_cache.get(key)
+            if gprimeterm is not None:
+                return gprimeterm
             # Apply gradients directly to argument vval, and get the
             # right indexed scalar component(s)
             kk = indices(ngrads)
@@ -925,6 +1002,7 @@ class GateauxDerivativeRuleset(GenericDerivativeRuleset):
             else:
                 Ejj, jj = 1, ()
             gprimeterm = as_tensor(Ejj * Dvkk, jj + kk)
+            self._gprime_cache[key] = gprimeterm
             return gprimeterm
 
         # Accumulate contributions from variations in different
@@ -1022,6 +1100,17 @@ class GateauxDerivativeRuleset(GenericDerivativeRuleset):
 class DerivativeRuleDispatcher(MultiFunction):
     def __init__(self):
         MultiFunction.__init__(self)
+        # Tables shared by all rulesets created during this pass, such
+        # that nested gradients of the same terminal and their
+        # variations are only built once
+        self._grad_cache = {}
+        self._gprime_cache = {}
+        self._identity_cache = {}
+
+        # Rulesets and result caches for each differentiation
+        # variable, such that repeated diff(f, v) with the same v only
+        # differentiate shared subexpressions of f once
+        self._variable_rules = {}
 
     def terminal(self, o):
         return o
@@ -1032,7 +1121,7 @@ class DerivativeRuleDispatcher(MultiFunction):
     expr = MultiFunction.reuse_if_untouched
 
     def grad(self, o, f):
-        rules = GradRuleset(o.ufl_shape[-1])
+        rules = GradRuleset(o.ufl_shape[-1], grad_cache=self._grad_cache)
         return map_expr_dag(rules, f)
 
     def reference_grad(self, o, f):
@@ -1040,12 +1129,18 @@ class DerivativeRuleDispatcher(MultiFunction):
         return map_expr_dag(rules, f)
 
     def variable_derivative(self, o, f, dummy_v):
-        rules = VariableRuleset(o.ufl_operands[1])
-        return map_expr_dag(rules, f)
+        v = o.ufl_operands[1]
+        cached = self._variable_rules.get(v)
+        if cached is None:
+            cached = (VariableRuleset(v, identity_cache=self._identity_cache), {}, {})
+            self._variable_rules[v] = cached
+        rules, vcache, rcache = cached
+        return map_expr_dag(rules, f, vcache=vcache, rcache=rcache)
 
     def coefficient_derivative(self, o, f, dummy_w, dummy_v, dummy_cd):
         dummy, w, v, cd = o.ufl_operands
-        rules = GateauxDerivativeRuleset(w, v, cd)
+        rules = GateauxDerivativeRuleset(w, v, cd, grad_cache=self._grad_cache,
+                                         gprime_cache=self._gprime_cache)
         return map_expr_dag(rules, f)
 
     def coordinate_derivative(self, o, f, dummy_w, dummy_v, dummy_cd):
@@ -1132,6 +1227,7 @@ class CoordinateDerivativeRuleset(GenericDerivativeRuleset):
     def grad(self, o):
         error("CoordinateDerivative grad in physical space is not implemented.")
 
+    @memoized_handler
     def spatial_coordinate(self, o):
         do = self._w2v.get(o)
         # d x /d x => Argument(x.function_space())
@@ -1147,6 +1243,7 @@ class CoordinateDerivativeRuleset(GenericDerivativeRuleset):
         else:
             return self.independent_terminal(o)
 
+    @memoized_handler
     def reference_grad(self, g):
         # d (grad_X(...(x)) / dx => grad_X(...(Argument(x.function_space()))
         o = g
@@ -1170,6 +1267,7 @@ class CoordinateDerivativeRuleset(GenericDerivativeRuleset):
                 return apply_grads(v)
         return self.independent_terminal(o)
 
+    @memoized_handler
     def jacobian(self, o):
         # d (grad_X(x))/d x => grad_X(Argument(x.function_space())
         for (w, v) in zip(self._w, self._v):
@@ -1181,6 +1279,10 @@ class CoordinateDerivativeRuleset(GenericDerivativeRuleset):
 class CoordinateDerivativeRuleDispatcher(MultiFunction):
     def __init__(self):
         MultiFunction.__init__(self)
+        # Rulesets for each (coordinates, direction, coefficient
+        # derivatives) triple, reused for all integrals of a form such
+        # that the memoized variations of geometry terminals are shared
+        self._rulesets = {}
 
     def terminal(self, o):
         return o
@@ -1208,7 +1310,11 @@ class CoordinateDerivativeRuleDispatcher(MultiFunction):
                   "This is because their pullback is not implemented in UFL." % unsupported_spaces)
         f, w, v, cd = o.ufl_operands
         f = self(f)  # transform f
-        rules = CoordinateDerivativeRuleset(w, v, cd)
+        key = (w, v, cd)
+        rules = self._rulesets.get(key)
+        if rules is None:
+            rules = CoordinateDerivativeRuleset(w, v, cd)
+            self._rulesets[key] = rules
         return map_expr_dag(rules, f)
 
 
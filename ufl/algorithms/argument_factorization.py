@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for factorizing integrands into sums of products of
+argument factors and argument independent coefficients, such that
+form compilers can evaluate the coefficients outside of the loops
+over the basis functions."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from itertools import product
+
+from ufl.log import error
+from ufl.classes import Conj, ComponentTensor, Indexed, Index, MultiIndex, FixedIndex, Zero, IntValue
+from ufl.conditional import Conditional
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dag
+from ufl.algorithms.check_arities import ArityMismatch
+
+
+def _all_components(shape):
+    return product(*[range(d) for d in shape])
+
+
+def _conj(e):
+    if isinstance(e, Conj):
+        return e.ufl_operands[0]
+    return Conj(e)
+
+
+def _component(expr, c, ii):
+    """Scalar index free expression for the component c and free index
+    values ii of expr."""
+    if c:
+        expr = Indexed(expr, MultiIndex(tuple(FixedIndex(k) for k in c)))
+    if ii:
+        indices = MultiIndex(tuple(Index(count=k) for k in expr.ufl_free_indices))
+        expr = Indexed(ComponentTensor(expr, indices), MultiIndex(tuple(FixedIndex(k) for k in ii)))
+    return expr
+
+
+def _add_monomials(result, monomials):
+    for factors, coefficient in monomials.items():
+        if factors in result:
+            result[factors] = result[factors] + coefficient
+        else:
+            result[factors] = coefficient
+
+
+def _argument_numbers(table):
+    "The tuples of argument numbers of the monomials of a monomial table."
+    return set(tuple(_argument_of(f).number() for f in factors)
+               for monomials in table.values() for factors in monomials)
+
+
+def _check_matching_arguments(tables, message):
+    "Raise an ArityMismatch if the monomial tables depend on different arguments."
+    numbers = [_argument_numbers(table) for table in tables]
+    numbers = [n for n in numbers if n]
+    if any(n != numbers[0] for n in numbers[1:]):
+        raise ArityMismatch(message)
+
+
+class _ModifiedArgument(object):
+    "An argument modified by derivatives, restrictions and reference value."
+    __slots__ = ("expr",)
+
+    def __init__(self, expr):
+        self.expr = expr
+
+
+class ArgumentFactorizer(MultiFunction):
+    """Factorize each component of a subexpression into a sum of
+    products of argument factors and coefficients.
+
+    Each subexpression is mapped to None if it does not depend on any
+    argument. Modified arguments are mapped to a _ModifiedArgument,
+    and other subexpressions to a dict from keys (component, free
+    index values) to a dict of monomials, which maps a tuple of scalar
+    argument factors sorted by argument number to their scalar
+    coefficient. The coefficients are built from the argument
+    independent subexpressions, keeping them shared.
+    """
+
+    def _table(self, o, op):
+        "Monomial table of an operand, converting modified arguments."
+        if isinstance(op, _ModifiedArgument):
+            return dict(((c, ()), {(_component(op.expr, c, ()),): IntValue(1)})
+                        for c in _all_components(op.expr.ufl_shape))
+        return op
+
+    def _values(self, o):
+        "Monomial table of an argument independent operand, with the empty tuple of factors."
+        return dict(((c, ii), {(): _component(o, c, ii)})
+                    for c in _all_components(o.ufl_shape)
+                    for ii in _all_components(o.ufl_index_dimensions))
+
+    def expr(self, o, *ops):
+        if any(op is not None for op in ops):
+            raise ArityMismatch("Applying nonlinear operator {0} to expression depending on form argument.".format(o._ufl_class_.__name__))
+        return None
+
+    def terminal(self, o):
+        return None
+
+    def multi_index(self, o):
+        return None
+
+    def label(self, o):
+        return None
+
+    def argument(self, o):
+        return _ModifiedArgument(o)
+
+    def _modifier(self, o, a):
+        if a is None:
+            return None
+        if isinstance(a, _ModifiedArgument):
+            return _ModifiedArgument(o)
+        error("Expecting %s to be applied directly to an argument, please apply "
+              "derivatives and restrictions first." % o._ufl_class_.__name__)
+
+    grad = _modifier
+    reference_grad = _modifier
+    reference_value = _modifier
+    positive_restricted = _modifier
+    negative_restricted = _modifier
+    cell_avg = _modifier
+    facet_avg = _modifier
+
+    def variable(self, o, a, l):
+        return a
+
+    def sum(self, o, a, b):
+        if a is None and b is None:
+            return None
+        if a is None or b is None:
+            raise ArityMismatch("Adding expressions with non-matching form arguments.")
+        a = self._table(o, a)
+        b = self._table(o, b)
+        _check_matching_arguments((a, b), "Adding expressions with non-matching form arguments.")
+        result = {}
+        for key in set(a) | set(b):
+            monomials = dict(a.get(key, {}))
+            _add_monomials(monomials, b.get(key, {}))
+            result[key] = monomials
+        return result
+
+    def product(self, o, a, b):
+        if a is None and b is None:
+            return None
+        a_expr, b_expr = o.ufl_operands
+        a = self._values(a_expr) if a is None else self._table(o, a)
+        b = self._values(b_expr) if b is None else self._table(o, b)
+        a_fi = a_expr.ufl_free_indices
+        b_fi = b_expr.ufl_free_indices
+        o_fi = o.ufl_free_indices
+        result = {}
+        for (ac, aii), am in a.items():
+            for (bc, bii), bm in b.items():
+                # Match the values of shared free indices
+                values = dict(zip(a_fi, aii))
+                if any(values.setdefault(i, v) != v for i, v in zip(b_fi, bii)):
+                    continue
+                monomials = result.setdefault(((), tuple(values[i] for i in o_fi)), {})
+                for af, acoeff in am.items():
+                    for bf, bcoeff in bm.items():
+                        factors = af + bf
+                        numbers = [f_arg.number() for f_arg in map(_argument_of, factors)]
+                        if len(set(numbers)) != len(numbers):
+                            raise ArityMismatch("Multiplying expressions with overlapping form argument number.")
+                        factors = tuple(f for _, f in sorted(zip(numbers, factors), key=lambda x: x[0]))
+                        _add_monomials(monomials, {factors: acoeff*bcoeff})
+        return result
+
+    def division(self, o, a, b):
+        if b is not None:
+            raise ArityMismatch("Cannot divide by form argument.")
+        if a is None:
+            return None
+        a = self._table(o, a)
+        a_expr, b_expr = o.ufl_operands
+        a_fi = a_expr.ufl_free_indices
+        b_fi = b_expr.ufl_free_indices
+        result = {}
+        for (c, ii), monomials in a.items():
+            values = dict(zip(a_fi, ii))
+            denominator = _component(b_expr, (), tuple(values[i] for i in b_fi))
+            result[(c, ii)] = dict((factors, coefficient/denominator)
+                                   for factors, coefficient in monomials.items())
+        return result
+
+    def conj(self, o, a):
+        if a is None:
+            return None
+        a = self._table(o, a)
+        return dict((key, dict((tuple(_conj(f) for f in factors), _conj(coefficient))
+                               for factors, coefficient in monomials.items()))
+                    for key, monomials in a.items())
+
+    def conditional(self, o, c, t, f):
+        if c is not None:
+            raise ArityMismatch("Condition cannot depend on form arguments.")
+        if t is None and f is None:
+            return None
+        condition, t_expr, f_expr = o.ufl_operands
+        if condition.ufl_free_indices:
+            error("Conditions with free indices are not supported.")
+        tables = []
+        for table, expr in ((t, t_expr), (f, f_expr)):
+            if table is None:
+                if not isinstance(expr, Zero):
+                    raise ArityMismatch("Conditional subexpressions with non-matching form arguments.")
+                table = {}
+            tables.append(self._table(o, table))
+        _check_matching_arguments(tables, "Conditional subexpressions with non-matching form arguments.")
+        t, f = tables
+        zero = Zero()
+        result = {}
+        for key in set(t) | set(f):
+            tm = t.get(key, {})
+            fm = f.get(key, {})
+            result[key] = dict((factors, Conditional(condition, tm.get(factors, zero), fm.get(factors, zero)))
+                               for factors in set(tm) | set(fm))
+        return result
+
+    def indexed(self, o, A, ii):
+        if A is None:
+            return None
+        A = self._table(o, A)
+        A_expr, multiindex = o.ufl_operands
+        A_fi = A_expr.ufl_free_indices
+        o_fi = o.ufl_free_indices
+        result = {}
+        for (c, Aii), monomials in A.items():
+            values = dict(zip(A_fi, Aii))
+            for k, i in zip(c, multiindex):
+                if isinstance(i, FixedIndex):
+                    if int(i) != k:
+                        break
+                elif values.setdefault(i.count(), k) != k:
+                    break
+            else:
+                key = ((), tuple(values[i] for i in o_fi))
+                _add_monomials(result.setdefault(key, {}), monomials)
+        return result
+
+    def component_tensor(self, o, A, ii):
+        if A is None:
+            return None
+        A = self._table(o, A)
+        A_expr, multiindex = o.ufl_operands
+        A_fi = A_expr.ufl_free_indices
+        o_fi = o.ufl_free_indices
+        result = {}
+        for (c, Aii), monomials in A.items():
+            values = dict(zip(A_fi, Aii))
+            key = (tuple(values[i.count()] for i in multiindex),
+                   tuple(values[i] for i in o_fi))
+            result[key] = monomials
+        return result
+
+    def index_sum(self, o, A, i):
+        if A is None:
+            return None
+        A = self._table(o, A)
+        A_expr, multiindex = o.ufl_operands
+        A_fi = A_expr.ufl_free_indices
+        o_fi = o.ufl_free_indices
+        result = {}
+        for (c, Aii), monomials in A.items():
+            values = dict(zip(A_fi, Aii))
+            key = (c, tuple(values[j] for j in o_fi))
+            _add_monomials(result.setdefault(key, {}), monomials)
+        return result
+
+    def list_tensor(self, o, *ops):
+        if all(op is None for op in ops):
+            return None
+        result = {}
+        tables = []
+        for k, (op, expr) in enumerate(zip(ops, o.ufl_operands)):
+            if op is None:
+                if not isinstance(expr, Zero):
+                    raise ArityMismatch("Listtensor components must depend on the same arguments.")
+                continue
+            tables.append(self._table(o, op))
+            for (c, ii), monomials in tables[-1].items():
+                result[((k,) + c, ii)] = monomials
+        _check_matching_arguments(tables, "Listtensor components must depend on the same arguments.")
+        return result
+
+
+def _argument_of(factor):
+    "Return the argument of a scalar argument factor."
+    while not factor._ufl_is_terminal_:
+        factor = factor.ufl_operands[0]
+    return factor
+
+
+class ArgumentFactorization(object):
+    """The factorization of a scalar integrand into a sum of products
+    of argument factors and argument independent coefficients.
+
+    ``argument_factors`` is a tuple of the unique scalar argument
+    factors, i.e. components of arguments with derivatives,
+    restrictions and reference values applied, and ``coefficients`` a
+    tuple of the unique scalar coefficient expressions, which share
+    the subexpressions of the integrand. ``monomials`` maps a tuple of
+    positions in ``argument_factors``, one for each argument in order
+    of argument number, to the position of its coefficient in
+    ``coefficients``.
+    """
+
+    def __init__(self, monomials):
+        factors = {}
+        coefficients = {}
+        self.monomials = {}
+        for key, coefficient in monomials.items():
+            if isinstance(coefficient, Zero):
+                continue
+            key = tuple(factors.setdefault(f, len(factors)) for f in key)
+            self.monomials[key] = coefficients.setdefault(coefficient, len(coefficients))
+        self.argument_factors = tuple(sorted(factors, key=factors.get))
+        self.coefficients = tuple(sorted(coefficients, key=coefficients.get))
+
+    def expression(self):
+        "Rebuild the integrand from the factorization."
+        terms = []
+        for key, i in sorted(self.monomials.items()):
+            term = self.coefficients[i]
+            for k in key:
+                term = term*self.argument_factors[k]
+            terms.append(term)
+        if not terms:
+            return Zero()
+        return sum(terms[1:], terms[0])
+
+    def __str__(self):
+        return " + ".join("[%s] * %s" % (self.coefficients[i],
+                                         " * ".join(str(self.argument_factors[k]) for k in key))
+                          for key, i in sorted(self.monomials.items()))
+
+
+def compute_argument_factorization(integrand):
+    """Factorize a scalar integrand into a sum of products of argument
+    factors and argument independent coefficients.
+
+    The integrand is assumed to be preprocessed, i.e. with compound
+    operators lowered and derivatives and restrictions applied, and to
+    be linear in each argument. An ArityMismatch is raised otherwise.
+    Returns an ArgumentFactorization.
+    """
+    if integrand.ufl_shape or integrand.ufl_free_indices:
+        error("Expecting scalar valued integrand without free indices.")
+    rules = ArgumentFactorizer()
+    table = map_expr_dag(rules, integrand, compress=False)
+    if table is None:
+        monomials = {(): integrand}
+    else:
+        monomials = rules._table(integrand, table).get(((), ()), {})
+    return ArgumentFactorization(monomials)
+
+
+def compute_integral_data_factorizations(integral_data):
+    """Return the argument factorizations of the integrands of the
+    integrals of integral_data, in the same order.
+
+    The factorizations are computed once and cached on the integral
+    data, and shared between integrals with the same integrand.
+    """
+    if integral_data.argument_factorizations is None:
+        factorizations = {}
+        for itg in integral_data.integrals:
+            integrand = itg.integrand()
+            if id(integrand) not in factorizations:
+                factorizations[id(integrand)] = compute_argument_factorization(integrand)
+        integral_data.argument_factorizations = \
+            [factorizations[id(itg.integrand())] for itg in integral_data.integrals]
+    return integral_data.argument_factorizations
@@ -173,5 +173,10 @@ def check_integrand_arity(expr, arguments, complex_mode=False):
 
 
 def check_form_arity(form, arguments, complex_mode=False):
+    # Integrals over many subdomains typically share integrands
+    checked = {}
     for itg in form.integrals():
-        check_integrand_arity(itg.integrand(), arguments, complex_mode)
+        integrand = itg.integrand()
+        if id(integrand) not in checked:
+            check_integrand_arity(integrand, arguments, complex_mode)
+            checked[id(integrand)] = integrand
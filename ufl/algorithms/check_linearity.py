@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for classifying how expressions and forms depend on a
+coefficient, i.e. whether they are independent of, linear in, affine
+in or nonlinear in the coefficient."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from ufl.log import error
+from ufl.form import Form
+from ufl.classes import Coefficient, Constant
+from ufl.corealg.traversal import unique_post_traversal
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dag
+from ufl.algorithms.apply_algebra_lowering import apply_algebra_lowering
+from ufl.algorithms.apply_derivatives import apply_derivatives
+
+
+# Internal linearity levels, ordered such that combining a
+# homogeneous and an inhomogeneous term gives an affine term
+_zero = -1
+_independent = 0
+_linear = 1
+_affine = 2
+_nonlinear = 3
+
+_linearity_names = {
+    _zero: "independent",
+    _independent: "independent",
+    _linear: "linear",
+    _affine: "affine",
+    _nonlinear: "nonlinear",
+}
+
+
+def _sum_linearity(a, b):
+    "Linearity of a sum of terms with linearity a and b."
+    if a == _zero:
+        return b
+    elif b == _zero:
+        return a
+    elif a == b:
+        return a
+    elif _nonlinear in (a, b):
+        return _nonlinear
+    else:
+        # Mixing independent, linear and affine terms
+        return _affine
+
+
+class LinearityChecker(MultiFunction):
+    """Compute the linearity of each subexpression with respect to a
+    single coefficient or constant."""
+
+    def __init__(self, f):
+        MultiFunction.__init__(self)
+        self._f = f
+        self._depends = {}
+        self._visited = set()
+
+    def _depends_on_f(self, o):
+        """Return whether f occurs in o, memoizing the result for each
+        subexpression such that shared and nested subexpressions are
+        visited once."""
+        depends = self._depends
+        for e in unique_post_traversal(o, self._visited):
+            depends[e] = e == self._f or any(depends[op] for op in e.ufl_operands)
+        return depends[o]
+
+    def terminal(self, o):
+        return _independent
+
+    def zero(self, o):
+        return _zero
+
+    def coefficient(self, o):
+        if o == self._f:
+            return _linear
+        return _independent
+
+    constant = coefficient
+
+    def nonlinear_operator(self, o):
+        # Cutoff traversal by not having *ops in argument list of this
+        # handler, nonlinear operators are only independent of f if f
+        # does not occur anywhere below
+        if self._depends_on_f(o):
+            return _nonlinear
+        return _independent
+
+    expr = nonlinear_operator
+
+    def sum(self, o, a, b):
+        return _sum_linearity(a, b)
+
+    def product(self, o, a, b):
+        if _zero in (a, b):
+            return _zero
+        elif a == _independent:
+            return b
+        elif b == _independent:
+            return a
+        else:
+            # At least quadratic in f
+            return _nonlinear
+
+    # inner, outer and dot all behave as product
+    inner = product
+    dot = product
+    outer = product
+
+    def division(self, o, a, b):
+        if b in (_zero, _independent):
+            return a
+        return _nonlinear
+
+    def linear_operator(self, o, a):
+        return a
+
+    # Restrictions, averages and derivatives are linear operators
+    positive_restricted = linear_operator
+    negative_restricted = linear_operator
+    cell_avg = linear_operator
+    facet_avg = linear_operator
+    grad = linear_operator
+    reference_grad = linear_operator
+    reference_value = linear_operator
+
+    # Complex conjugation and real and imaginary parts are real-linear
+    conj = linear_operator
+    real = linear_operator
+    imag = linear_operator
+
+    def variable(self, o, f, l):
+        return f
+
+    def conditional(self, o, c, a, b):
+        if c not in (_zero, _independent):
+            return _nonlinear
+        # Linear on each side of the condition, allowing e.g.
+        # conditional(c, f, 0) to be linear in f
+        return _sum_linearity(a, b)
+
+    def linear_indexed_type(self, o, a, i):
+        return a
+
+    # All of these indexed thingies behave as a linear_indexed_type
+    indexed = linear_indexed_type
+    index_sum = linear_indexed_type
+    component_tensor = linear_indexed_type
+
+    def list_tensor(self, o, *ops):
+        r = _zero
+        for a in ops:
+            r = _sum_linearity(r, a)
+        return r
+
+
+def _check_linearity_variable(f):
+    if not isinstance(f, (Coefficient, Constant)):
+        error("Expecting a Coefficient or Constant, not %s." % f._ufl_class_.__name__)
+
+
+def _compute_integrand_linearity(expr, f):
+    rules = LinearityChecker(f)
+    return map_expr_dag(rules, expr, compress=False)
+
+
+def compute_integrand_linearity(expr, f):
+    """Classify the dependency of expr on the coefficient or constant f.
+
+    Returns one of the strings ``"independent"``, ``"linear"``,
+    ``"affine"`` or ``"nonlinear"``. The expression is assumed to
+    have derivatives applied and compound operators lowered, as in the
+    integrands of a preprocessed form. Remaining derivatives and
+    compound operators are conservatively treated as nonlinear.
+    """
+    _check_linearity_variable(f)
+    return _linearity_names[_compute_integrand_linearity(expr, f)]
+
+
+def compute_integrands_linearity(integrands, f, cache=None):
+    """Classify the dependency of the sum of integrands on the
+    coefficient or constant f, as for compute_integrand_linearity.
+
+    If a dict is given as cache, the linearity of each integrand is
+    stored in it by id of the integrand and f, for reuse between calls
+    with integrands shared by several integrals. The integrands must
+    then be kept alive by the caller as long as the cache is used.
+    """
+    _check_linearity_variable(f)
+    if cache is None:
+        cache = {}
+    r = _zero
+    for integrand in integrands:
+        key = (id(integrand), f)
+        if key not in cache:
+            cache[key] = _compute_integrand_linearity(integrand, f)
+        r = _sum_linearity(r, cache[key])
+    return _linearity_names[r]
+
+
+def compute_form_linearity(form, f):
+    """Classify the dependency of form on the coefficient or constant f.
+
+    Returns one of the strings ``"independent"``, ``"linear"``,
+    ``"affine"`` or ``"nonlinear"``. Algebra lowering and derivatives
+    are applied before the analysis. For example, a Jacobian form is
+    unchanged between Newton iterations when it is independent of the
+    solution coefficient, which holds if the residual form is affine
+    in it.
+    """
+    _check_linearity_variable(f)
+    if not isinstance(form, Form):
+        error("Expecting a Form.")
+    form = apply_algebra_lowering(form)
+    form = apply_derivatives(form)
+    r = _zero
+    for itg in form.integrals():
+        r = _sum_linearity(r, _compute_integrand_linearity(itg.integrand(), f))
+    return _linearity_names[r]
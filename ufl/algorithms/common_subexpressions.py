@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for labelling the subexpressions that are used more than
+once in the integrands of an integral data, such that form compilers
+traversing the integrands as trees evaluate them only once."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from ufl.classes import Condition, Label, Variable
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dags
+from ufl.corealg.traversal import unique_post_traversal
+from ufl.algorithms.estimate_cost import compute_operation_counts
+
+
+class SubexpressionLabeller(MultiFunction):
+    """Rebuild an expression, wrapping the subexpressions with a given
+    label number in a Variable with a Label of that number."""
+
+    def __init__(self, label_numbers):
+        MultiFunction.__init__(self)
+        self.label_numbers = label_numbers
+
+    def expr(self, o, *ops):
+        r = self.reuse_if_untouched(o, *ops)
+        number = self.label_numbers.get(o)
+        if number is not None:
+            r = Variable(r, Label(number))
+        return r
+
+    def terminal(self, o):
+        return o
+
+
+def _count_uses(expressions):
+    """Return the unique nodes of the expressions in post order, and a
+    dict mapping each node to its number of uses by unique parents and
+    as one of the expressions."""
+    nodes = []
+    uses = {}
+    visited = set()
+    for expression in expressions:
+        uses[expression] = uses.get(expression, 0) + 1
+        for o in unique_post_traversal(expression, visited):
+            nodes.append(o)
+            for op in o.ufl_operands:
+                uses[op] = uses.get(op, 0) + 1
+    return nodes, uses
+
+
+def _tree_operations(nodes, operations, labelled):
+    """Count the operations of evaluating each node as a tree, with the
+    labelled subexpressions evaluated separately."""
+    counts = {}
+    for o in nodes:
+        counts[o] = operations[o] + sum(0 if op in labelled else counts[op]
+                                        for op in o.ufl_operands)
+    return counts
+
+
+def eliminate_common_subexpressions(expressions):
+    """Label the subexpressions used more than once in the expressions.
+
+    Each subexpression that is used by more than one unique parent, or
+    also as one of the expressions, is wrapped in a Variable, if it
+    needs any operations to be evaluated and has no free indices.
+    Equal subexpressions are identified by structural equality. The
+    labels are numbered in the order the subexpressions are reached
+    in a post order traversal of the expressions, starting after the
+    largest label number already used in the expressions, such that
+    the numbering is stable between runs.
+
+    Returns a list of the labelled expressions, in the same order, and
+    the number of operations saved by evaluating each labelled
+    subexpression once instead of at each use, counted as in
+    estimate_integrand_cost.
+    """
+    nodes, uses = _count_uses(expressions)
+    operations = compute_operation_counts(expressions)
+
+    # Evaluating the expressions as trees without labels
+    counts = _tree_operations(nodes, operations, ())
+    before = sum(counts[e] for e in set(expressions))
+
+    first = 1 + max([o.count() for o in nodes if isinstance(o, Label)] + [-1])
+    label_numbers = {}
+    for o in nodes:
+        if uses[o] > 1 and counts[o] > 0 and not o.ufl_free_indices and \
+           not isinstance(o, (Variable, Condition)):
+            label_numbers[o] = first + len(label_numbers)
+    if not label_numbers:
+        return list(expressions), 0
+
+    # Evaluating each labelled subexpression once
+    counts = _tree_operations(nodes, operations, label_numbers)
+    after = sum(counts[o] for o in set(expressions) | set(label_numbers))
+
+    result = map_expr_dags(SubexpressionLabeller(label_numbers), expressions)
+    return result, before - after
+
+
+def eliminate_integral_data_subexpressions(integral_data):
+    """Label the subexpressions used more than once in the integrands of
+    the integrals of integral_data, see eliminate_common_subexpressions.
+
+    Subexpressions are shared between all integrands, and integrands
+    shared between integrals are labelled once. Since restrictions
+    are propagated to terminals in the preprocessed integrands of
+    interior facet integrals, the subexpressions restricted to each
+    side of the facet are labelled separately.
+
+    Returns a list of the integrals with labelled integrands, in the
+    same order, and the number of operations saved.
+    """
+    integrands = list(dict((id(itg.integrand()), itg.integrand())
+                           for itg in integral_data.integrals).values())
+    labelled, saved = eliminate_common_subexpressions(integrands)
+    labelled = dict((id(e), r) for e, r in zip(integrands, labelled))
+    integrals = [itg.reconstruct(integrand=labelled[id(itg.integrand())])
+                 for itg in integral_data.integrals]
+    return integrals, saved
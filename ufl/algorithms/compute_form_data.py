@@ -9,17 +9,23 @@ raw input form given by a user."""
 #
 # SPDX-License-Identifier:    LGPL-3.0-or-later
 
+from collections import defaultdict
 from itertools import chain
 
 from ufl.log import error, info
 from ufl.utils.sequences import max_degree
+from ufl.utils.sorting import canonicalize_metadata, sorted_by_count
 
 from ufl.classes import GeometricFacetQuantity, Coefficient, Form, FunctionSpace
+from ufl.classes import Determinant, Inverse, Cofactor, Sum
 from ufl.corealg.traversal import traverse_unique_terminals
-from ufl.algorithms.analysis import extract_coefficients, extract_sub_elements, unique_tuple
+from ufl.algorithms.analysis import extract_coefficients, extract_constants, extract_sub_elements, unique_tuple
+from ufl.algorithms.check_linearity import compute_integrands_linearity
+from ufl.algorithms.geometry_table import compute_geometry_tables
 from ufl.algorithms.formdata import FormData
 from ufl.algorithms.formtransformations import compute_form_arities
 from ufl.algorithms.check_arities import check_form_arity
+from ufl.algorithms.signature import compute_integral_digest
 
 # These are the main symbolic processing steps:
 from ufl.algorithms.apply_function_pullbacks import apply_function_pullbacks
@@ -30,12 +36,14 @@ from ufl.algorithms.apply_geometry_lowering import apply_geometry_lowering
 from ufl.algorithms.apply_restrictions import apply_restrictions, apply_default_restrictions
 from ufl.algorithms.estimate_degrees import estimate_total_polynomial_degree
 from ufl.algorithms.remove_complex_nodes import remove_complex_nodes
+from ufl.algorithms.fold_constants import fold_constants
 from ufl.algorithms.comparison_checker import do_comparison_check
 
 # See TODOs at the call sites of these below:
 from ufl.algorithms.domain_analysis import build_integral_data
 from ufl.algorithms.domain_analysis import reconstruct_form_from_integral_data
 from ufl.algorithms.domain_analysis import group_form_integrals
+from ufl.algorithms.domain_analysis import integral_subdomain_ids
 
 
 def _auto_select_degree(elements):
@@ -106,7 +114,9 @@ def _compute_max_subdomain_ids(integral_data):
     for itg_data in integral_data:
         it = itg_data.integral_type
         si = itg_data.subdomain_id
-        if isinstance(si, int):
+        if isinstance(si, tuple):
+            newmax = max(si) + 1
+        elif isinstance(si, int):
             newmax = si + 1
         else:
             newmax = 0
@@ -194,53 +204,232 @@ def _build_coefficient_replace_map(coefficients, element_mapping=None):
     return new_coefficients, replace_map
 
 
-def attach_estimated_degrees(form):
+def _compute_coefficient_dependencies(integral_data, integrand_coefficients):
+    """Map each coefficient and constant to a list of pairs (i,
+    linearity) of the integral data integral_data[i] depending on it
+    and the linearity of this dependency.
+
+    The coefficients and constants of each integrand are given in
+    integrand_coefficients by id of the integrand."""
+    dependencies = {}
+    cache = {}
+    for i, itg_data in enumerate(integral_data):
+        integrands = dict((id(itg.integrand()), itg.integrand()) for itg in itg_data.integrals)
+        for f in chain(sorted_by_count(itg_data.integral_coefficients),
+                       sorted_by_count(itg_data.integral_constants)):
+            f_integrands = [integrand for k, integrand in integrands.items()
+                            if f in integrand_coefficients[k][1] or f in integrand_coefficients[k][2]]
+            linearity = compute_integrands_linearity(f_integrands, f, cache)
+            dependencies.setdefault(f, []).append((i, linearity))
+    return dependencies
+
+
+def _split_integrand_by_degree(integrand, degree_estimation_options, cache):
+    """Split the terms of a sum into groups of terms with the same
+    estimated polynomial degree.
+
+    Returns a list of pairs of degree and sum of the terms of that
+    degree, sorted by degree.
+    """
+    terms = []
+    stack = [integrand]
+    while stack:
+        t = stack.pop()
+        if isinstance(t, Sum):
+            stack.extend(reversed(t.ufl_operands))
+        else:
+            terms.append(t)
+
+    groups = {}
+    for t in terms:
+        degree = estimate_total_polynomial_degree(t, cache=cache, **degree_estimation_options)
+        groups.setdefault(degree, []).append(t)
+    if len(groups) == 1:
+        degree, = groups
+        return [(degree, integrand)]
+    return [(degree, sum(groups[degree][1:], groups[degree][0]))
+            for degree in sorted(groups)]
+
+
+def attach_estimated_degrees(form, do_split_integrands=False, degree_estimation_options={}):
     """Attach estimated polynomial degree to a form's integrals.
 
     :arg form: The :class:`~.Form` to inspect.
+    :arg do_split_integrands: If true, the terms of integrands are
+        grouped by estimated degree into separate integrals, such that
+        low degree terms can be integrated with fewer quadrature
+        points. Integrals with a quadrature degree given in their
+        metadata are not split.
+    :arg degree_estimation_options: Keyword arguments passed to
+        :func:`~.estimate_total_polynomial_degree`, e.g.
+        ``max_nonpolynomial_degree``.
     :returns: A new Form with estimate degrees attached.
     """
     integrals = form.integrals()
 
+    # Integrals over many subdomains typically share integrands, and
+    # integrands typically share subexpressions
+    degrees = {}
+    cache = {}
     new_integrals = []
     for integral in integrals:
-        md = {}
-        md.update(integral.metadata())
-        degree = estimate_total_polynomial_degree(integral.integrand())
-        md["estimated_polynomial_degree"] = degree
-        new_integrals.append(integral.reconstruct(metadata=md))
+        integrand = integral.integrand()
+        split = do_split_integrands and "quadrature_degree" not in integral.metadata()
+        key = (id(integrand), split)
+        if key not in degrees:
+            if split:
+                parts = _split_integrand_by_degree(integrand, degree_estimation_options, cache)
+            else:
+                degree = estimate_total_polynomial_degree(integrand, cache=cache,
+                                                          **degree_estimation_options)
+                parts = [(degree, integrand)]
+            degrees[key] = (integrand, parts)
+        for degree, part in degrees[key][1]:
+            md = {}
+            md.update(integral.metadata())
+            md["estimated_polynomial_degree"] = degree
+            new_integrals.append(integral.reconstruct(integrand=part, metadata=md))
     return Form(new_integrals)
 
 
-def compute_form_data(form,
-                      # Default arguments configured to behave the way old FFC expects it:
-                      do_apply_function_pullbacks=False,
-                      do_apply_integral_scaling=False,
-                      do_apply_geometry_lowering=False,
-                      preserve_geometry_types=(),
-                      do_apply_default_restrictions=True,
-                      do_apply_restrictions=True,
-                      do_estimate_degrees=True,
-                      do_append_everywhere_integrals=True,
-                      complex_mode=False,
-                      ):
-
-    # TODO: Move this to the constructor instead
-    self = FormData()
-
-    # --- Store untouched form for reference.
-    # The user of FormData may get original arguments,
-    # original coefficients, and form signature from this object.
-    # But be aware that the set of original coefficients are not
-    # the same as the ones used in the final UFC form.
-    # See 'reduced_coefficients' below.
-    self.original_form = form
-
-    # --- Pass form integrands through some symbolic manipulation
-
-    # Note: Default behaviour here will process form the way that is
-    # currently expected by vanilla FFC
-
+def _integral_data_keys(itg_data):
+    "Return the (domain, integral_type, subdomain_id) keys of the subdomains of an integral data."
+    subdomain_ids = itg_data.subdomain_id
+    if not isinstance(subdomain_ids, tuple):
+        subdomain_ids = (subdomain_ids,)
+    return [(itg_data.domain, itg_data.integral_type, did) for did in subdomain_ids]
+
+
+def _select_unchanged_integrals(integrals, integral_data_digests, changed_keys):
+    """Select the preprocessed integrals of a previous form data that
+    belong to unchanged integral data, with one subdomain id each."""
+    selected = []
+    for itg in integrals:
+        subdomain_ids = itg.subdomain_id()
+        merged = isinstance(subdomain_ids, tuple)
+        if not merged:
+            subdomain_ids = (subdomain_ids,)
+        for did in subdomain_ids:
+            key = (itg.ufl_domain(), itg.integral_type(), did)
+            if key in integral_data_digests and key not in changed_keys:
+                selected.append(itg.reconstruct(subdomain_id=did) if merged else itg)
+    return selected
+
+
+def _compute_integral_data_digests(form, do_append_everywhere_integrals):
+    """Find the integrals of form contributing to each integral data.
+
+    Returns a mapping from the (domain, integral_type, subdomain_id)
+    key of each integral data that preprocessing of form will produce
+    to the positions of the contributing integrals in form, and a
+    mapping from the same keys to the sorted digests of these
+    integrals.
+    """
+    integrals = form.integrals()
+    contributions = defaultdict(list)
+    everywhere_integrals = defaultdict(list)
+    for i, itg in enumerate(integrals):
+        dids = integral_subdomain_ids(itg)
+        if dids == "otherwise":
+            error("'otherwise' integrals should never occur before preprocessing.")
+        elif dids == "everywhere":
+            everywhere_integrals[(itg.ufl_domain(), itg.integral_type())].append(i)
+        else:
+            for did in dids:
+                contributions[(itg.ufl_domain(), itg.integral_type(), did)].append(i)
+
+    # Everywhere integrals contribute to 'otherwise' and, optionally,
+    # to each subdomain of the same domain and integral type
+    if do_append_everywhere_integrals:
+        for key in list(contributions):
+            contributions[key].extend(everywhere_integrals.get(key[:2], ()))
+    for (domain, integral_type), indices in everywhere_integrals.items():
+        contributions[(domain, integral_type, "otherwise")] = list(indices)
+
+    # Integrals over many subdomains typically share integrands
+    digest_cache = {}
+    digests = []
+    for itg in integrals:
+        key = (id(itg.integrand()), itg.ufl_domain(), itg.integral_type(),
+               canonicalize_metadata(itg.metadata()))
+        if key not in digest_cache:
+            digest_cache[key] = (itg, compute_integral_digest(itg))
+        digests.append(digest_cache[key][1])
+    integral_data_digests = {}
+    for key, indices in contributions.items():
+        integral_data_digests[key] = tuple(sorted(digests[i] for i in indices))
+    return contributions, integral_data_digests
+
+
+def _restrict_form_to_integral_data(form, contributions, keys):
+    """Return a form of the integrals of form contributing to the
+    integral data with the given keys, restricted to their subdomains."""
+    everywhere = set()
+    subdomains = defaultdict(list)
+    for key in keys:
+        subdomain_id = key[2]
+        for i in contributions[key]:
+            if subdomain_id == "otherwise":
+                everywhere.add(i)
+            else:
+                subdomains[i].append(subdomain_id)
+
+    integrals = []
+    for i, itg in enumerate(form.integrals()):
+        if i in everywhere:
+            # Appended to the subdomains of the restricted form when
+            # grouping, which are exactly the changed subdomains
+            integrals.append(itg)
+        elif i in subdomains:
+            integrals.append(itg.reconstruct(subdomain_id=tuple(sorted(subdomains[i]))))
+    return Form(integrals)
+
+
+def _apply_to_shared_integrands(apply_pass, form):
+    """Apply apply_pass, a function mapping forms to forms, to a form
+    with one integral for each integrand shared by integrals of the
+    same type, domain and metadata, such as the integrals over many
+    subdomain ids emitted by group_form_integrals, and share the
+    results between these integrals."""
+    representatives = {}
+    keys = []
+    for itg in form.integrals():
+        key = (id(itg.integrand()), itg.integral_type(), itg.ufl_domain(),
+               canonicalize_metadata(itg.metadata()))
+        if key not in representatives:
+            representatives[key] = (itg, len(representatives))
+        keys.append(key)
+
+    # Number the representatives by subdomain id to recognize the
+    # results, as integrals with zero integrands are dropped
+    mapped = apply_pass(Form([itg.reconstruct(subdomain_id=i)
+                              for itg, i in representatives.values()]))
+    mapped = dict((itg.subdomain_id(), itg) for itg in mapped.integrals())
+
+    integrals = []
+    for itg, key in zip(form.integrals(), keys):
+        new_itg = mapped.get(representatives[key][1])
+        if new_itg is not None:
+            integrals.append(itg.reconstruct(integrand=new_itg.integrand(),
+                                             metadata=new_itg.metadata()))
+    return Form(integrals)
+
+
+def _preprocess_form(form, domains,
+                     do_apply_function_pullbacks,
+                     do_apply_integral_scaling,
+                     do_apply_geometry_lowering,
+                     preserve_geometry_types,
+                     do_apply_default_restrictions,
+                     do_apply_restrictions,
+                     do_estimate_degrees,
+                     do_append_everywhere_integrals,
+                     do_apply_cofactor_lowering,
+                     complex_mode,
+                     do_split_integrands_by_degree,
+                     degree_estimation_options,
+                     do_fold_constants):
+    "Pass form integrands through the symbolic processing steps of compute_form_data."
     # Check that the form does not try to compare complex quantities:
     # if the quantites being compared are 'provably' real, wrap them
     # with Real, otherwise throw an error.
@@ -249,8 +438,14 @@ def compute_form_data(form,
 
     # Lower abstractions for tensor-algebra types into index notation,
     # reducing the number of operators later algorithms and form
-    # compilers need to handle
-    form = apply_algebra_lowering(form)
+    # compilers need to handle.  Optionally keep det, inv and cofactor
+    # through differentiation, using d(det A) = cofactor(A) : dA and
+    # d(inv A) = -inv(A) dA inv(A) instead of differentiating the
+    # expanded formulas.
+    if do_apply_cofactor_lowering:
+        form = apply_algebra_lowering(form, preserve_types=(Determinant, Inverse, Cofactor))
+    else:
+        form = apply_algebra_lowering(form)
 
     # After lowering to index notation, remove any complex nodes that
     # have been introduced but are not wanted when working in real mode,
@@ -264,18 +459,35 @@ def compute_form_data(form,
     # user-defined coefficient relations it just gets too messy
     form = apply_derivatives(form)
 
+    # Fold the literals and identity matrix lookups introduced by
+    # lowering and differentiation, such that the following steps
+    # process smaller integrands
+    if do_fold_constants:
+        form = fold_constants(form)
+
+    # Lower the remaining det, inv and cofactor nodes, with a single
+    # shared determinant and cofactor expression for each operand
+    if do_apply_cofactor_lowering:
+        form = apply_algebra_lowering(form, share_cofactors=True)
+        if not complex_mode:
+            form = remove_complex_nodes(form)
+
     # --- Group form integrals
     # TODO: Refactor this, it's rather opaque what this does
     # TODO: Is self.original_form.ufl_domains() right here?
     #       It will matter when we start including 'num_domains' in ufc form.
-    form = group_form_integrals(form, self.original_form.ufl_domains(),
+    form = group_form_integrals(form, domains,
                                 do_append_everywhere_integrals=do_append_everywhere_integrals)
 
+    # The integrals over subdomain ids of the same group share their
+    # integrand, which the following steps map once per group
+
     # Estimate polynomial degree of integrands now, before applying
     # any pullbacks and geometric lowering.  Otherwise quad degrees
     # blow up horrifically.
     if do_estimate_degrees:
-        form = attach_estimated_degrees(form)
+        form = attach_estimated_degrees(form, do_split_integrands=do_split_integrands_by_degree,
+                                        degree_estimation_options=dict(degree_estimation_options))
 
     if do_apply_function_pullbacks:
         # Rewrite coefficients and arguments in terms of their
@@ -284,56 +496,216 @@ def compute_form_data(form,
         # Decision: Not supporting grad(dolfin.Expression) without a
         #           Domain.  Current dolfin works if Expression has a
         #           cell but this should be changed to a mesh.
-        form = apply_function_pullbacks(form)
+        form = _apply_to_shared_integrands(apply_function_pullbacks, form)
 
     # Scale integrals to reference cell frames
     if do_apply_integral_scaling:
-        form = apply_integral_scaling(form)
+        form = _apply_to_shared_integrands(apply_integral_scaling, form)
 
     # Apply default restriction to fully continuous terminals
     if do_apply_default_restrictions:
-        form = apply_default_restrictions(form)
+        form = _apply_to_shared_integrands(apply_default_restrictions, form)
 
     # Lower abstractions for geometric quantities into a smaller set
     # of quantities, allowing the form compiler to deal with a smaller
     # set of types and treating geometric quantities like any other
     # expressions w.r.t. loop-invariant code motion etc.
     if do_apply_geometry_lowering:
-        form = apply_geometry_lowering(form, preserve_geometry_types)
+        form = _apply_to_shared_integrands(lambda f: apply_geometry_lowering(f, preserve_geometry_types), form)
 
     # Apply differentiation again, because the algorithms above can
     # generate new derivatives or rewrite expressions inside
     # derivatives
     if do_apply_function_pullbacks or do_apply_geometry_lowering:
-        form = apply_derivatives(form)
+        form = _apply_to_shared_integrands(apply_derivatives, form)
 
         # Neverending story: apply_derivatives introduces new Jinvs,
         # which needs more geometry lowering
         if do_apply_geometry_lowering:
-            form = apply_geometry_lowering(form, preserve_geometry_types)
+            form = _apply_to_shared_integrands(lambda f: apply_geometry_lowering(f, preserve_geometry_types), form)
             # Lower derivatives that may have appeared
-            form = apply_derivatives(form)
+            form = _apply_to_shared_integrands(apply_derivatives, form)
 
-    form = apply_coordinate_derivatives(form)
+    form = _apply_to_shared_integrands(apply_coordinate_derivatives, form)
 
     # Propagate restrictions to terminals
     if do_apply_restrictions:
-        form = apply_restrictions(form)
+        form = _apply_to_shared_integrands(apply_restrictions, form)
+
+    if do_fold_constants:
+        form = _apply_to_shared_integrands(fold_constants, form)
+
+    return form
+
+
+def compute_form_data(form,
+                      # Default arguments configured to behave the way old FFC expects it:
+                      do_apply_function_pullbacks=False,
+                      do_apply_integral_scaling=False,
+                      do_apply_geometry_lowering=False,
+                      preserve_geometry_types=(),
+                      do_apply_default_restrictions=True,
+                      do_apply_restrictions=True,
+                      do_estimate_degrees=True,
+                      do_append_everywhere_integrals=True,
+                      do_apply_cofactor_lowering=False,
+                      complex_mode=False,
+                      do_merge_subdomains=False,
+                      do_split_integrands_by_degree=False,
+                      degree_estimation_options=None,
+                      do_fold_constants=False,
+                      do_compute_coefficient_dependencies=False,
+                      do_compute_geometry_tables=False,
+                      do_compute_integral_digests=False,
+                      previous_form_data=None,
+                      ):
+    """Preprocess a form and collect the data needed by form compilers.
+
+    If *previous_form_data* is given, integral data whose contributing
+    integrals are unchanged from the form data of a previous call with
+    the same options reuse the preprocessed integrals of that call,
+    and only the new or changed integrals are passed through the
+    symbolic processing steps. The member ``changed_integral_data`` of
+    the returned form data flags which of its integral data have been
+    recomputed. The integrals are matched by digests, which are
+    computed and stored in the member ``integral_data_digests`` if
+    *do_compute_integral_digests* is true or *previous_form_data* is
+    given, and are None otherwise. Form data without digests are
+    recomputed entirely.
+
+    If *do_merge_subdomains* is true, integral data over subdomains
+    with identical integrals are merged into one integral data whose
+    subdomain id is the tuple of these subdomain ids, such that form
+    compilers can generate one kernel for all of them.
+
+    If *do_split_integrands_by_degree* is true, the terms of each
+    integrand are grouped by estimated polynomial degree into separate
+    integrals of the same integral data, each with its own
+    ``estimated_polynomial_degree`` in the metadata, unless a
+    ``quadrature_degree`` is given in the metadata of the integral.
+
+    The estimation of polynomial degrees can be configured by
+    *degree_estimation_options*, a dict of keyword arguments to
+    ``estimate_total_polynomial_degree`` such as
+    ``max_nonpolynomial_degree``, bounding the estimated degree of
+    nonpolynomial operators.
+
+    If *do_fold_constants* is true, literals are folded, fixed index
+    lookups of identity matrices, permutation symbols and list tensors
+    evaluated and zero and one factors eliminated in the integrands
+    after differentiation and at the end of preprocessing, see
+    ``fold_constants``.
+
+    If *do_compute_coefficient_dependencies* is true, the member
+    ``coefficient_dependencies`` of the returned form data maps each
+    coefficient and constant of the preprocessed integrals to a list
+    of pairs ``(i, linearity)`` of the integral data
+    ``integral_data[i]`` depending on it, with ``linearity`` one of
+    ``"linear"``, ``"affine"`` or ``"nonlinear"`` as classified by
+    ``compute_integrands_linearity``, and it is None otherwise.
+    Coefficients and constants used by each integral data are stored
+    in its members ``integral_coefficients`` and
+    ``integral_constants``.
+
+    If *do_compute_geometry_tables* is true, the member
+    ``geometry_tables`` of the returned form data maps each domain to
+    a tuple of the unique cellwise constant geometric subexpressions
+    of the preprocessed integrands on that domain, and the member
+    ``geometry_references`` of each integral data maps the geometric
+    subexpressions of its integrands to their position in this table
+    and their restriction, see ``compute_geometry_tables``. This is
+    typically combined with *do_apply_geometry_lowering*. Otherwise
+    ``geometry_tables`` is None.
+    """
+
+    # TODO: Move this to the constructor instead
+    self = FormData()
+
+    # --- Store untouched form for reference.
+    # The user of FormData may get original arguments,
+    # original coefficients, and form signature from this object.
+    # But be aware that the set of original coefficients are not
+    # the same as the ones used in the final UFC form.
+    # See 'reduced_coefficients' below.
+    self.original_form = form
+
+    # --- Pass form integrands through some symbolic manipulation
+
+    # Note: Default behaviour here will process form the way that is
+    # currently expected by vanilla FFC
+    options = (do_apply_function_pullbacks,
+               do_apply_integral_scaling,
+               do_apply_geometry_lowering,
+               tuple(preserve_geometry_types),
+               do_apply_default_restrictions,
+               do_apply_restrictions,
+               do_estimate_degrees,
+               do_append_everywhere_integrals,
+               do_apply_cofactor_lowering,
+               complex_mode,
+               do_split_integrands_by_degree,
+               tuple(sorted((degree_estimation_options or {}).items())),
+               do_fold_constants)
+    self.preprocessing_options = options
+
+    # Match the integrals contributing to each integral data against
+    # the previous form data, if any, to find the integral data that
+    # must be recomputed
+    if do_compute_integral_digests or previous_form_data is not None:
+        contributions, self.integral_data_digests = \
+            _compute_integral_data_digests(form, do_append_everywhere_integrals)
+    else:
+        self.integral_data_digests = None
+    if previous_form_data is not None and previous_form_data.integral_data_digests is not None \
+       and previous_form_data.preprocessing_options == options:
+        previous_digests = previous_form_data.integral_data_digests
+        changed_keys = set(key for key, digests in self.integral_data_digests.items()
+                           if previous_digests.get(key) != digests)
+        form = _restrict_form_to_integral_data(form, contributions, changed_keys)
+    else:
+        previous_form_data = None
+        changed_keys = None
+
+    if form.integrals():
+        form = _preprocess_form(form, self.original_form.ufl_domains(), *options)
 
     # --- Group integrals into IntegralData objects
     # Most of the heavy lifting is done above in group_form_integrals.
-    self.integral_data = build_integral_data(form.integrals())
+    integrals = list(form.integrals())
+    if previous_form_data is not None:
+        # Reuse the preprocessed integrals of unchanged integral data
+        for itg_data in previous_form_data.integral_data:
+            integrals.extend(_select_unchanged_integrals(itg_data.integrals,
+                                                         self.integral_data_digests,
+                                                         changed_keys))
+    self.integral_data = build_integral_data(integrals, do_merge_subdomains=do_merge_subdomains)
+    if changed_keys is None:
+        self.changed_integral_data = [True]*len(self.integral_data)
+    else:
+        self.changed_integral_data = [any(key in changed_keys for key in _integral_data_keys(itg_data))
+                                      for itg_data in self.integral_data]
 
     # --- Create replacements for arguments and coefficients
 
-    # Figure out which form coefficients each integral should enable
+    # Figure out which form coefficients and constants each integral
+    # should enable
+    integrand_coefficients = {}
     for itg_data in self.integral_data:
         itg_coeffs = set()
-        # Get all coefficients in integrand
+        itg_consts = set()
+        # Get all coefficients and constants in integrand, which is
+        # typically shared by integrals over many subdomains
         for itg in itg_data.integrals:
-            itg_coeffs.update(extract_coefficients(itg.integrand()))
+            integrand = itg.integrand()
+            if id(integrand) not in integrand_coefficients:
+                integrand_coefficients[id(integrand)] = (integrand,
+                                                         extract_coefficients(integrand),
+                                                         extract_constants(integrand))
+            itg_coeffs.update(integrand_coefficients[id(integrand)][1])
+            itg_consts.update(integrand_coefficients[id(integrand)][2])
         # Store with IntegralData object
         itg_data.integral_coefficients = itg_coeffs
+        itg_data.integral_constants = itg_consts
 
     # Figure out which coefficients from the original form are
     # actually used in any integral (Differentiation may reduce the
@@ -347,12 +719,40 @@ def compute_form_data(form,
     self.original_coefficient_positions = [i for i, c in enumerate(self.original_form.coefficients())
                                            if c in self.reduced_coefficients]
 
+    # Likewise for the constants
+    reduced_constants_set = set()
+    for itg_data in self.integral_data:
+        reduced_constants_set.update(itg_data.integral_constants)
+    self.reduced_constants = sorted(reduced_constants_set,
+                                    key=lambda c: c.count())
+    self.original_constant_positions = [i for i, c in enumerate(self.original_form.constants())
+                                        if c in reduced_constants_set]
+
     # Store back into integral data which form coefficients are used
     # by each integral
     for itg_data in self.integral_data:
         itg_data.enabled_coefficients = [bool(coeff in itg_data.integral_coefficients)
                                          for coeff in self.reduced_coefficients]
 
+    # --- Index the integral data depending on each coefficient and
+    # constant, such that only the integrals affected by changed
+    # coefficients need to be reassembled
+    if do_compute_coefficient_dependencies:
+        self.coefficient_dependencies = _compute_coefficient_dependencies(self.integral_data,
+                                                                          integrand_coefficients)
+    else:
+        self.coefficient_dependencies = None
+
+    # --- Collect the geometric subexpressions of the integrands into a
+    # table for each domain, such that assemblers can compute them
+    # once per cell for all kernels
+    if do_compute_geometry_tables:
+        self.geometry_tables, references = compute_geometry_tables(self.integral_data)
+        for itg_data, itg_references in zip(self.integral_data, references):
+            itg_data.geometry_references = itg_references
+    else:
+        self.geometry_tables = None
+
     # --- Collect some trivial data
 
     # Get rank of form from argument list (assuming not a mixed arity form)
@@ -380,6 +780,11 @@ def compute_form_data(form,
                                        self.element_replace_map)
     self.function_replace_map = function_replace_map
 
+    # --- Store the coefficient replacements with each integral data,
+    # for computing its signature on first access
+    for itg_data in self.integral_data:
+        itg_data.function_replace_map = function_replace_map
+
     # --- Store various lists of elements and sub elements (adds
     #     members to self)
     _compute_form_data_elements(self,
@@ -398,7 +803,9 @@ def compute_form_data(form,
 
     # TODO: This is a very expensive check... Replace with something
     # faster!
-    preprocessed_form = reconstruct_form_from_integral_data(self.integral_data)
+    preprocessed_form = reconstruct_form_from_integral_data(
+        [itg_data for itg_data, changed in zip(self.integral_data, self.changed_integral_data)
+         if changed])
 
     # If in real mode, remove complex nodes entirely.
     if not complex_mode:
@@ -406,6 +813,13 @@ def compute_form_data(form,
 
     check_form_arity(preprocessed_form, self.original_form.arguments(), complex_mode)  # Currently testing how fast this is
 
+    if previous_form_data is not None:
+        # Integrals of unchanged integral data have been checked before
+        unchanged_integrals = _select_unchanged_integrals(previous_form_data.preprocessed_form.integrals(),
+                                                          self.integral_data_digests,
+                                                          changed_keys)
+        preprocessed_form = Form(list(preprocessed_form.integrals()) + unchanged_integrals)
+
     # TODO: This member is used by unit tests, change the tests to
     # remove this!
     self.preprocessed_form = preprocessed_form
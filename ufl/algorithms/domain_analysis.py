@@ -24,13 +24,21 @@ class IntegralData(object):
         subdomain_id, integrals, metadata)
 
     where metadata is an empty dictionary that may be used for
-    associating metadata with each object.
+    associating metadata with each object, and subdomain_id may be a
+    tuple of subdomain ids sharing the same integrals.
 
     """
     __slots__ = ('domain', 'integral_type', 'subdomain_id',
                  'integrals', 'metadata',
                  'integral_coefficients',
-                 'enabled_coefficients')
+                 'integral_constants',
+                 'enabled_coefficients',
+                 'function_replace_map',
+                 '_signature',
+                 'argument_factorizations',
+                 'expression_dependencies',
+                 'tensor_product_factors',
+                 'geometry_references')
 
     def __init__(self, domain, integral_type, subdomain_id, integrals,
                  metadata):
@@ -50,12 +58,28 @@ class IntegralData(object):
         # This is populated in preprocess using data not available at
         # this stage:
         self.integral_coefficients = None
+        self.integral_constants = None
         self.enabled_coefficients = None
+        self.function_replace_map = None
+        self._signature = None
+        self.argument_factorizations = None
+        self.expression_dependencies = None
+        self.tensor_product_factors = None
+        self.geometry_references = None
 
         # TODO: I think we can get rid of this with some refactoring
         # in ffc:
         self.metadata = metadata
 
+    @property
+    def signature(self):
+        """Signature of the integrals, independent of the subdomain id
+        and the other integrals of the form, computed on first access."""
+        if self._signature is None:
+            from ufl.algorithms.signature import compute_integral_data_signature
+            self._signature = compute_integral_data_signature(self, self.function_replace_map)
+        return self._signature
+
     def __lt__(self, other):
         # To preserve behaviour of extract_integral_data:
         return ((self.integral_type, self.subdomain_id,
@@ -149,18 +173,27 @@ def integral_subdomain_ids(integral):
         error("Invalid domain id %s." % did)
 
 
-def rearrange_integrals_by_single_subdomains(integrals, do_append_everywhere_integrals):
-    """Rearrange integrals over multiple subdomains to single subdomain integrals.
+def group_subdomains_by_integrals(integrals, do_append_everywhere_integrals):
+    """Group single subdomain ids by the integrals contributing to them.
 
     Input:
         integrals: list(Integral)
 
     Output:
-        integrals: dict: subdomain_id -> list(Integral) (reconstructed with single subdomain_id)
+        groups: list of (subdomain_ids, integrals) pairs, where
+            subdomain_ids is a sorted tuple of single subdomain ids, or
+            ("otherwise",) for everywhere integrals, and integrals is the
+            list of integrals contributing to each of these subdomain ids,
+            up to their subdomain id
+
+    This is a compact representation of the result of
+    rearrange_integrals_by_single_subdomains for integrals over large
+    sets of subdomain ids, as each group of subdomain ids can be
+    processed once.
     """
     # Split integrals into lists of everywhere and subdomain integrals
     everywhere_integrals = []
-    subdomain_integrals = []
+    single_subdomain_integrals = defaultdict(list)
     for itg in integrals:
         dids = integral_subdomain_ids(itg)
         if dids == "otherwise":
@@ -168,35 +201,57 @@ def rearrange_integrals_by_single_subdomains(integrals, do_append_everywhere_int
         elif dids == "everywhere":
             everywhere_integrals.append(itg)
         else:
-            subdomain_integrals.append((dids, itg))
+            for did in dids:
+                single_subdomain_integrals[did].append(itg)
+
+    # Group subdomain ids by hashing the integrands and metadata of the
+    # contributing integrals, such that e.g. the integrals of
+    # f*dx((1,2)), which shares the integrand between subdomains,
+    # are grouped
+    metadata_keys = {}
+    subdomains_by_contributions = defaultdict(list)
+    for did, ss_integrals in single_subdomain_integrals.items():
+        key = []
+        for itg in ss_integrals:
+            md = itg.metadata()
+            if id(md) not in metadata_keys:
+                metadata_keys[id(md)] = (md, canonicalize_metadata(md))
+            key.append((id(itg.integrand()), metadata_keys[id(md)][1],
+                        id(itg.subdomain_data())))
+        subdomains_by_contributions[tuple(key)].append(did)
+
+    groups = []
+    for dids in subdomains_by_contributions.values():
+        # Integrals of the first subdomain id represent the group
+        group_integrals = list(single_subdomain_integrals[dids[0]])
+        # Add everywhere integrals to each single subdomain id
+        # integral list
+        if do_append_everywhere_integrals:
+            group_integrals.extend(everywhere_integrals)
+        groups.append((tuple(sorted(dids)), group_integrals))
+    groups.sort(key=lambda group: group[0][0])
 
-    # Fill single_subdomain_integrals with lists of integrals from
-    # subdomain_integrals, but split and restricted to single
-    # subdomain ids
-    single_subdomain_integrals = defaultdict(list)
-    for dids, itg in subdomain_integrals:
-        # Region or single subdomain id
-        for did in dids:
-            # Restrict integral to this subdomain!
-            single_subdomain_integrals[did].append(itg.reconstruct(subdomain_id=did))
+    if everywhere_integrals:
+        groups.append((("otherwise",), everywhere_integrals))
 
-    # Add everywhere integrals to each single subdomain id integral
-    # list
-    otherwise_integrals = []
-    for ev_itg in everywhere_integrals:
-        # Restrict everywhere integral to 'otherwise'
-        otherwise_integrals.append(ev_itg.reconstruct(subdomain_id="otherwise"))
+    return groups
 
-        # Restrict everywhere integral to each subdomain
-        # and append to each integral list
-        if do_append_everywhere_integrals:
-            for subdomain_id in sorted(single_subdomain_integrals.keys()):
-                single_subdomain_integrals[subdomain_id].append(
-                    ev_itg.reconstruct(subdomain_id=subdomain_id))
 
-    if otherwise_integrals:
-        single_subdomain_integrals["otherwise"] = otherwise_integrals
+def rearrange_integrals_by_single_subdomains(integrals, do_append_everywhere_integrals):
+    """Rearrange integrals over multiple subdomains to single subdomain integrals.
+
+    Input:
+        integrals: list(Integral)
 
+    Output:
+        integrals: dict: subdomain_id -> list(Integral) (reconstructed with single subdomain_id)
+    """
+    single_subdomain_integrals = {}
+    for dids, group_integrals in group_subdomains_by_integrals(integrals, do_append_everywhere_integrals):
+        for did in dids:
+            # Restrict integral to this subdomain!
+            single_subdomain_integrals[did] = [itg.reconstruct(subdomain_id=did)
+                                               for itg in group_integrals]
     return single_subdomain_integrals
 
 
@@ -234,10 +289,13 @@ def accumulate_integrands_with_same_metadata(integrals):
     return sorted(by_cdid.values(), key=ExprTupleKey)
 
 
-def build_integral_data(integrals):
+def build_integral_data(integrals, do_merge_subdomains=False):
     """Build integral data given a list of integrals.
 
     :arg integrals: An iterable of :class:`~.Integral` objects.
+    :arg do_merge_subdomains: Merge integral data over subdomains with
+        identical integrals into one integral data whose subdomain id
+        is the tuple of these subdomain ids.
     :returns: A tuple of :class:`IntegralData` objects.
 
     The integrals you pass in here must have been rearranged and
@@ -257,11 +315,18 @@ def build_integral_data(integrals):
         # possibly different metadata).
         itgs[(domain, integral_type, subdomain_id)].append(integral)
 
+    if do_merge_subdomains:
+        itgs = merge_subdomain_integrals(itgs)
+
     # Build list with canonical ordering, iteration over dicts
     # is not deterministic across python versions
     def keyfunc(item):
         (d, itype, sid), integrals = item
-        return (d._ufl_sort_key_(), itype, (type(sid).__name__, sid))
+        if isinstance(sid, str):
+            sid_key = ("str", sid)
+        else:
+            sid_key = ("int", sid if isinstance(sid, tuple) else (sid,))
+        return (d._ufl_sort_key_(), itype, sid_key)
 
     integral_datas = []
     for (d, itype, sid), integrals in sorted(itgs.items(), key=keyfunc):
@@ -269,6 +334,42 @@ def build_integral_data(integrals):
     return integral_datas
 
 
+def merge_subdomain_integrals(integrals_by_subdomain):
+    """Merge the integrals over subdomains with identical integrals.
+
+    Input:
+        integrals_by_subdomain: dict: (domain, integral_type, subdomain_id) -> list(Integral)
+
+    Output:
+        integrals_by_subdomain: dict: (domain, integral_type, subdomain_ids) -> list(Integral)
+            where subdomain_ids is either a single subdomain id or a sorted tuple of
+            integer subdomain ids with identical integrals, reconstructed with the tuple
+    """
+    # Group integer subdomain ids by hashing the integrands, metadata
+    # and subdomain data, which are typically shared between
+    # subdomains with the same integrals after group_form_integrals
+    subdomains = defaultdict(list)
+    merged = {}
+    for (d, itype, sid), integrals in integrals_by_subdomain.items():
+        if isinstance(sid, numbers.Integral):
+            key = (d, itype, tuple((itg.integrand(), canonicalize_metadata(itg.metadata()),
+                                    id(itg.subdomain_data()))
+                                   for itg in integrals))
+            subdomains[key].append(sid)
+        else:
+            merged[(d, itype, sid)] = integrals
+
+    for (d, itype, _), sids in subdomains.items():
+        if len(sids) == 1:
+            sid, = sids
+            merged[(d, itype, sid)] = integrals_by_subdomain[(d, itype, sid)]
+        else:
+            sids = tuple(sorted(sids))
+            merged[(d, itype, sids)] = [itg.reconstruct(subdomain_id=sids)
+                                        for itg in integrals_by_subdomain[(d, itype, sids[0])]]
+    return merged
+
+
 def group_form_integrals(form, domains, do_append_everywhere_integrals=True):
     """Group integrals by domain and type, performing canonical simplification.
 
@@ -291,11 +392,13 @@ def group_form_integrals(form, domains, do_append_everywhere_integrals=True):
             # Group integrals by subdomain id, after splitting e.g.
             #   f*dx((1,2)) + g*dx((2,3)) -> f*dx(1) + (f+g)*dx(2) + g*dx(3)
             # (note: before this call, 'everywhere' is a valid subdomain_id,
-            # and after this call, 'otherwise' is a valid subdomain_id)
-            single_subdomain_integrals = \
-                rearrange_integrals_by_single_subdomains(ddt_integrals, do_append_everywhere_integrals)
+            # and after this call, 'otherwise' is a valid subdomain_id).
+            # Subdomain ids sharing the same integrals are processed
+            # together and share the accumulated integrands.
+            subdomain_groups = \
+                group_subdomains_by_integrals(ddt_integrals, do_append_everywhere_integrals)
 
-            for subdomain_id, ss_integrals in sorted_by_key(single_subdomain_integrals):
+            for subdomain_ids, ss_integrals in subdomain_groups:
 
                 # strip the coordinate derivatives from all integrals
                 # this yields a list of the form [(coordinate derivative, integral), ...]
@@ -327,9 +430,11 @@ def group_form_integrals(form, domains, do_append_everywhere_integrals=True):
 
                     for integrand, metadata in integrands_and_cds:
                         integral = Integral(integrand, integral_type, domain,
-                                            subdomain_id, metadata, None)
+                                            subdomain_ids[0], metadata, None)
                         integral = attach_coordinate_derivatives(integral, samecd_integrals[0])
                         integrals.append(integral)
+                        for subdomain_id in subdomain_ids[1:]:
+                            integrals.append(integral.reconstruct(subdomain_id=subdomain_id))
     return Form(integrals)
 
 
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for optimizing integrands by equality saturation, i.e. by
+collecting the expressions obtained by repeatedly applying algebraic
+rewrite rules in an e-graph and extracting the cheapest equivalent
+expression under the cost model of estimate_integrand_cost."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from ufl.log import UFLException
+from ufl.classes import Sum, Product, IndexSum, Indexed, ComponentTensor, Conj, Real
+from ufl.classes import Index, MultiIndex
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dag
+from ufl.corealg.traversal import unique_pre_traversal
+from ufl.algorithms.map_integrands import map_integrands
+from ufl.algorithms.estimate_cost import estimate_node_operations, compute_operation_counts
+
+
+# Operators whose operands are unordered in e-nodes
+_commutative_types = (Sum, Product)
+
+
+class EGraph(object):
+    """An e-graph of UFL expressions.
+
+    Equivalent expressions are collected in classes identified by
+    integer ids. Each class holds a set of e-nodes, which are tuples
+    ``(type, operand class ids)`` for operators and ``(terminal,)``
+    for terminals and multiindices, and a representative expression.
+    The operands of sums and products are sorted, such that
+    commutativity needs no rewrite rule.
+    """
+
+    def __init__(self):
+        self._parent = []
+        self._hashcons = {}
+        self._representatives = {}
+        self._memo = {}
+        self.classes = {}
+
+    def find(self, c):
+        "Return the canonical id of the class c."
+        parent = self._parent
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    def representative(self, c):
+        "Return an expression of the class c."
+        return self._representatives[self.find(c)]
+
+    def num_nodes(self):
+        "Return the number of e-nodes."
+        return len(self._hashcons)
+
+    def nodes(self, c, cls):
+        "Return the operand class ids of the e-nodes of type cls in class c."
+        return [node[1] for node in self.classes[self.find(c)]
+                if len(node) == 2 and node[0] is cls]
+
+    def _canonical(self, node):
+        if len(node) == 1:
+            return node
+        cls, ops = node
+        ops = tuple(self.find(op) for op in ops)
+        if cls in _commutative_types:
+            ops = tuple(sorted(ops))
+        return (cls, ops)
+
+    def add(self, expr):
+        "Add expr and its subexpressions, returning the id of its class."
+        memo = self._memo
+        stack = [expr]
+        while stack:
+            o = stack[-1]
+            if o in memo:
+                stack.pop()
+                continue
+            ops = [op for op in o.ufl_operands if op not in memo]
+            if ops:
+                stack.extend(ops)
+                continue
+            stack.pop()
+            if o._ufl_is_terminal_:
+                node = (o,)
+            else:
+                node = self._canonical((o._ufl_class_, tuple(memo[op] for op in o.ufl_operands)))
+            c = self._hashcons.get(node)
+            if c is None:
+                c = len(self._parent)
+                self._parent.append(c)
+                self._hashcons[node] = c
+                self._representatives[c] = o
+                self.classes[c] = set((node,))
+            memo[o] = self.find(c)
+        return self.find(memo[expr])
+
+    def union(self, a, b):
+        "Merge the classes a and b, returning True if they were different."
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if len(self.classes[a]) < len(self.classes[b]):
+            a, b = b, a
+        self._parent[b] = a
+        self.classes[a] |= self.classes.pop(b)
+        return True
+
+    def rebuild(self):
+        """Merge the classes with equal e-nodes after unions of their
+        operands, until the e-graph is closed under congruence."""
+        while True:
+            hashcons = {}
+            merges = []
+            for c, nodes in self.classes.items():
+                for node in nodes:
+                    other = hashcons.setdefault(self._canonical(node), c)
+                    if other != c:
+                        merges.append((other, c))
+            if not merges:
+                break
+            for a, b in merges:
+                self.union(a, b)
+        for c in self.classes:
+            self.classes[c] = set(self._canonical(node) for node in self.classes[c])
+        self._hashcons = dict((node, c) for c, nodes in self.classes.items() for node in nodes)
+
+    def _build(self, node, ops):
+        if len(node) == 1:
+            return node[0]
+        return node[0](*ops)
+
+    def extract(self, c):
+        """Return the cheapest expression of class c, with the operations
+        of each node counted by estimate_node_operations and the
+        operands counted as trees, breaking ties by size."""
+        best = {}
+        own = {}
+        changed = True
+        while changed:
+            changed = False
+            for k, nodes in self.classes.items():
+                for node in nodes:
+                    if len(node) == 1:
+                        cost = (0, 1)
+                    else:
+                        ops = node[1]
+                        if any(op not in best for op in ops):
+                            continue
+                        if node not in own:
+                            o = self._build(node, [self._representatives[op] for op in ops])
+                            own[node] = estimate_node_operations(o)
+                        cost = (own[node] + sum(best[op][0][0] for op in ops),
+                                1 + sum(best[op][0][1] for op in ops))
+                    if k not in best or cost < best[k][0]:
+                        best[k] = (cost, node)
+                        changed = True
+
+        # Build the chosen nodes, sharing the expressions of each class
+        expressions = {}
+        stack = [self.find(c)]
+        while stack:
+            k = stack[-1]
+            if k in expressions:
+                stack.pop()
+                continue
+            node = best[k][1]
+            ops = [] if len(node) == 1 else node[1]
+            missing = [op for op in ops if op not in expressions]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            expressions[k] = self._build(node, [expressions[op] for op in ops])
+        return expressions[self.find(c)]
+
+
+class IndexRenamer(MultiFunction):
+    "Replace indices of an expression as given by a mapping from index counts to indices."
+    expr = MultiFunction.reuse_if_untouched
+
+    def __init__(self, mapping):
+        MultiFunction.__init__(self)
+        self.mapping = mapping
+
+    def terminal(self, o):
+        return o
+
+    def multi_index(self, o):
+        return MultiIndex(tuple(self.mapping.get(i.count(), i) if isinstance(i, Index) else i
+                                for i in o.indices()))
+
+
+def _rename_indices(e, old, new):
+    """Replace the free indices old of e with the indices new, or
+    return None if the new indices are already used in e."""
+    used = set(i.count() for o in unique_pre_traversal(e) if isinstance(o, MultiIndex)
+               for i in o.indices() if isinstance(i, Index))
+    mapping = dict((i.count(), j) for i, j in zip(old.indices(), new.indices()))
+    if any(isinstance(j, Index) and j.count() in used and j.count() not in mapping
+           for j in new.indices()):
+        return None
+    return map_expr_dag(IndexRenamer(mapping), e)
+
+
+def _rewrites(egraph, applied):
+    """Collect the pairs of class ids and equivalent expressions given
+    by the rewrite rules applied to each e-node of the e-graph, skipping
+    the matches in the set applied and adding the new matches to it."""
+    find = egraph.find
+    R = egraph.representative
+    nodes = egraph.nodes
+    rewrites = []
+
+    def free_indices(c):
+        return R(c).ufl_free_indices
+
+    def emit(c, build, *args):
+        key = (node, build.__code__, tuple(find(a) if isinstance(a, int) else a for a in args))
+        if key in applied:
+            return
+        applied.add(key)
+        try:
+            e = build(*args)
+        except UFLException:
+            return
+        if e is not None:
+            rewrites.append((c, e))
+
+    for c, class_nodes in list(egraph.classes.items()):
+        for node in list(class_nodes):
+            if len(node) == 1:
+                continue
+            node = egraph._canonical(node)
+            cls, ops = node
+            if cls is Sum:
+                for x, y in (ops, ops[::-1]):
+                    # Factoring: a*b + a*d -> a*(b + d)
+                    for a, b in nodes(x, Product):
+                        for d, e in nodes(y, Product):
+                            for f1, r1 in ((a, b), (b, a)):
+                                for f2, r2 in ((d, e), (e, d)):
+                                    if find(f1) == find(f2):
+                                        emit(c, lambda f, r, s: Product(R(f), Sum(R(r), R(s))), f1, r1, r2)
+                    # Associativity: (a + b) + y -> a + (b + y)
+                    for a, b in nodes(x, Sum):
+                        emit(c, lambda a, b: Sum(R(a), Sum(R(b), R(y))), a, b)
+                        emit(c, lambda a, b: Sum(R(b), Sum(R(a), R(y))), a, b)
+                x, y = ops
+                # Index sum merging: sum_i a + sum_i b -> sum_i (a + b)
+                for a, i in nodes(x, IndexSum):
+                    for b, j in nodes(y, IndexSum):
+                        if find(i) == find(j):
+                            emit(c, lambda a, b, i: IndexSum(Sum(R(a), R(b)), R(i)), a, b, i)
+                # Conjugates: conj(a) + conj(b) -> conj(a + b)
+                for wrapper in (Conj, Real):
+                    for a, in nodes(x, wrapper):
+                        for b, in nodes(y, wrapper):
+                            emit(c, lambda a, b, w: w(Sum(R(a), R(b))), a, b, wrapper)
+
+            elif cls is Product:
+                for x, y in (ops, ops[::-1]):
+                    # Distribution: x*(a + b) -> x*a + x*b
+                    for a, b in nodes(y, Sum):
+                        emit(c, lambda a, b: Sum(Product(R(x), R(a)), Product(R(x), R(b))), a, b)
+                    # Associativity: (a*b)*y -> a*(b*y)
+                    for a, b in nodes(x, Product):
+                        emit(c, lambda a, b: Product(R(a), Product(R(b), R(y))), a, b)
+                        emit(c, lambda a, b: Product(R(b), Product(R(a), R(y))), a, b)
+                    # Index sum extension: x*(sum_i b) -> sum_i x*b
+                    for b, i in nodes(y, IndexSum):
+                        if R(i).indices()[0].count() not in free_indices(x):
+                            emit(c, lambda b, i: IndexSum(Product(R(x), R(b)), R(i)), b, i)
+                x, y = ops
+                # Conjugates: conj(a)*conj(b) -> conj(a*b)
+                for a, in nodes(x, Conj):
+                    for b, in nodes(y, Conj):
+                        emit(c, lambda a, b: Conj(Product(R(a), R(b))), a, b)
+
+            elif cls is IndexSum:
+                x, i = ops
+                j = R(i).indices()[0].count()
+                # Factoring out of index sums: sum_i a*b -> a*(sum_i b)
+                for a, b in nodes(x, Product):
+                    for f, r in ((a, b), (b, a)):
+                        if j not in free_indices(f):
+                            emit(c, lambda f, r: Product(R(f), IndexSum(R(r), R(i))), f, r)
+                # Linearity: sum_i (a + b) -> sum_i a + sum_i b
+                for a, b in nodes(x, Sum):
+                    emit(c, lambda a, b: Sum(IndexSum(R(a), R(i)), IndexSum(R(b), R(i))), a, b)
+                # Reordering: sum_i sum_k e -> sum_k sum_i e
+                for e, k in nodes(x, IndexSum):
+                    emit(c, lambda e, k: IndexSum(IndexSum(R(e), R(i)), R(k)), e, k)
+
+            elif cls is Conj or cls is Real:
+                x, = ops
+                for a, b in nodes(x, Sum):
+                    emit(c, lambda a, b: Sum(cls(R(a)), cls(R(b))), a, b)
+                for a, in nodes(x, Conj):
+                    emit(c, lambda a: R(a) if cls is Conj else Real(R(a)), a)
+                if cls is Conj:
+                    for a, b in nodes(x, Product):
+                        emit(c, lambda a, b: Product(Conj(R(a)), Conj(R(b))), a, b)
+
+            elif cls is Indexed:
+                x, jj = ops
+                # Indexed(ComponentTensor) elimination: (A_ii)[jj] -> A_jj
+                for e, ii in nodes(x, ComponentTensor):
+                    emit(c, lambda e, ii: _rename_indices(R(e), R(ii), R(jj)), e, ii)
+                # Linearity: (a + b)[jj] -> a[jj] + b[jj]
+                for a, b in nodes(x, Sum):
+                    emit(c, lambda a, b: Sum(Indexed(R(a), R(jj)), Indexed(R(b), R(jj))), a, b)
+    return rewrites
+
+
+def _dag_cost(expr):
+    "Return the number of operations and the number of unique nodes of expr."
+    operations = compute_operation_counts([expr])
+    return sum(operations.values()), len(operations)
+
+
+def optimize_expression(expr, max_iterations=6, max_nodes=2000):
+    """Optimize an expression by equality saturation.
+
+    The expression is added to an e-graph, to which the expressions
+    given by algebraic rewrite rules are added and merged with the
+    expressions they are equivalent to, until no rule adds a new
+    equivalence, or for at most *max_iterations* rounds of rewrites
+    or until the e-graph has more than *max_nodes* e-nodes. The rules
+    are commutativity, associativity, distribution and factoring of
+    sums and products, linearity and reordering of index sums and
+    factoring out of index sums, distribution of complex conjugates
+    and real parts over sums and products, distribution of indexing
+    over sums, and elimination of indexed component tensors.
+
+    The cheapest expression is then extracted under the operation
+    counts of estimate_integrand_cost, and returned if it needs fewer
+    operations than expr, counting shared subexpressions once, or as
+    many operations with fewer nodes, and expr is returned otherwise.
+    """
+    egraph = EGraph()
+    root = egraph.add(expr)
+    applied = set()
+    for iteration in range(max_iterations):
+        changed = False
+        for c, e in _rewrites(egraph, applied):
+            if egraph.num_nodes() > max_nodes:
+                break
+            changed = egraph.union(c, egraph.add(e)) or changed
+        egraph.rebuild()
+        if not changed or egraph.num_nodes() > max_nodes:
+            break
+
+    result = egraph.extract(root)
+    if _dag_cost(result) < _dag_cost(expr):
+        return result
+    return expr
+
+
+def optimize_integrands(form, max_iterations=6, max_nodes=2000):
+    """Optimize the integrands of a form, integral or expression by
+    equality saturation, see optimize_expression.
+
+    The integrands are assumed to be preprocessed, e.g. by
+    compute_form_data."""
+    return map_integrands(lambda e: optimize_expression(e, max_iterations, max_nodes), form)
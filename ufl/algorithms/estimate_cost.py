@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for estimating the cost of evaluating integrands at a
+quadrature point."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from ufl.log import error
+from ufl.form import Form
+from ufl.integral import Integral
+from ufl.core.expr import Expr
+from ufl.classes import IntValue
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dags
+from ufl.utils.sequences import product
+
+
+_cost_keys = ("additions", "multiplications", "divisions", "comparisons",
+              "other_operations", "transcendental_calls",
+              "argument_evaluations", "coefficient_evaluations",
+              "geometry_evaluations")
+
+_arithmetic_keys = ("additions", "multiplications", "divisions", "comparisons",
+                    "other_operations")
+
+_operation_keys = _arithmetic_keys + ("transcendental_calls",)
+
+
+def _num_values(o):
+    "Number of scalar values represented by o, over its shape and free indices."
+    return product(o.ufl_shape) * product(o.ufl_index_dimensions)
+
+
+class CostEstimator(MultiFunction):
+    """Count the operations needed to evaluate each unique node of an
+    expression DAG.
+
+    Terminals and terminals modified by derivatives, reference values
+    and restrictions are mapped to a pair of the kind of evaluation
+    they need and the modified terminal, and other nodes to None. The
+    modified terminals used by other nodes are collected in
+    ``evaluations`` for each kind.
+    """
+
+    def __init__(self):
+        MultiFunction.__init__(self)
+        self.counts = dict((key, 0) for key in _cost_keys)
+        self.evaluations = {"argument": set(), "coefficient": set(), "geometry": set()}
+
+    def _count(self, key, o, n=1):
+        self.counts[key] += n * _num_values(o)
+
+    def _use(self, *ops):
+        for op in ops:
+            if op is not None and op[0] is not None:
+                self.evaluations[op[0]].add(op[1])
+
+    # --- Terminals
+
+    def terminal(self, o):
+        # Constant values and constants are not evaluated
+        return (None, o)
+
+    def argument(self, o):
+        return ("argument", o)
+
+    def coefficient(self, o):
+        return ("coefficient", o)
+
+    def geometric_quantity(self, o):
+        return ("geometry", o)
+
+    def multi_index(self, o):
+        return None
+
+    def label(self, o):
+        return None
+
+    def _modified_terminal(self, o, *ops):
+        if ops[0] is not None:
+            return (ops[0][0], o)
+        self._use(*ops)
+        return None
+
+    # Gradients of terminals, reference values and restrictions are
+    # evaluated as a single tabulated quantity
+    grad = _modified_terminal
+    reference_grad = _modified_terminal
+    reference_value = _modified_terminal
+    positive_restricted = _modified_terminal
+    negative_restricted = _modified_terminal
+
+    # --- Operators
+
+    def _operation(self, key, o, ops):
+        self._use(*ops)
+        self._count(key, o)
+        return None
+
+    def expr(self, o, *ops):
+        return self._operation("other_operations", o, ops)
+
+    def sum(self, o, *ops):
+        return self._operation("additions", o, ops)
+
+    def product(self, o, *ops):
+        return self._operation("multiplications", o, ops)
+
+    def division(self, o, *ops):
+        return self._operation("divisions", o, ops)
+
+    def _transcendental(self, o, *ops):
+        return self._operation("transcendental_calls", o, ops)
+
+    math_function = _transcendental
+    atan_2 = _transcendental
+    bessel_function = _transcendental
+
+    def _comparison(self, o, *ops):
+        return self._operation("comparisons", o, ops)
+
+    condition = _comparison
+    conditional = _comparison
+    min_value = _comparison
+    max_value = _comparison
+
+    def _shaping(self, o, *ops):
+        # Shaping operators and wrappers only move data
+        self._use(*ops)
+        return None
+
+    indexed = _shaping
+    component_tensor = _shaping
+    list_tensor = _shaping
+    variable = _shaping
+
+    def index_sum(self, o, A, i):
+        self._use(A)
+        self._count("additions", o, o.dimension() - 1)
+        return None
+
+    def power(self, o, a, b):
+        self._use(a, b)
+        f, g = o.ufl_operands
+        if isinstance(g, IntValue) and 0 <= g.value() <= 4:
+            # Small integer powers are computed by repeated multiplication
+            self._count("multiplications", o, max(g.value() - 1, 0))
+        else:
+            self._count("transcendental_calls", o)
+        return None
+
+
+def estimate_integrand_cost(e):
+    """Estimate the cost of evaluating an integrand at a quadrature
+    point.
+
+    The argument e is an expression, or an integral or form whose
+    integrands are considered together. These are assumed to be
+    preprocessed, i.e. with compound operators lowered and
+    derivatives applied.
+
+    Returns a dict with the number of ``additions``,
+    ``multiplications``, ``divisions``, ``comparisons``,
+    ``other_operations`` and their total ``arithmetic_operations``, the
+    number of ``transcendental_calls``, and the number of distinct
+    ``argument_evaluations``, ``coefficient_evaluations`` and
+    ``geometry_evaluations``. Each unique node of the expression DAG
+    is counted once, with one operation for each component and value
+    of its free indices, and terminals are counted by their number of
+    components, including their derivatives and restrictions. The
+    operations are counted for symbolic arguments, i.e. not repeated
+    for each basis function.
+    """
+    if isinstance(e, Form):
+        expressions = [itg.integrand() for itg in e.integrals()]
+    elif isinstance(e, Integral):
+        expressions = [e.integrand()]
+    elif isinstance(e, Expr):
+        expressions = [e]
+    else:
+        error("Expecting an Expr, Integral or Form.")
+
+    rules = CostEstimator()
+    for r in map_expr_dags(rules, expressions, compress=False):
+        rules._use(r)
+
+    cost = dict(rules.counts)
+    cost["arithmetic_operations"] = sum(cost[key] for key in _arithmetic_keys)
+    for kind, terminals in rules.evaluations.items():
+        cost[kind + "_evaluations"] = sum(_num_values(t) for t in terminals)
+    return cost
+
+
+def estimate_node_operations(o):
+    """Count the operations needed to evaluate the node o given the
+    values of its operands, i.e. the arithmetic operations and
+    transcendental calls counted for o by estimate_integrand_cost."""
+    rules = CostEstimator()
+    rules._handlers[o._ufl_typecode_](o, *[None]*len(o.ufl_operands))
+    return sum(rules.counts[key] for key in _operation_keys)
+
+
+def compute_operation_counts(expressions):
+    """Count the operations needed to evaluate each unique node of the
+    expressions given the values of its operands.
+
+    Returns a dict mapping each unique node to its number of
+    arithmetic operations and transcendental calls, counted as in
+    estimate_integrand_cost. Terminals, modified terminals and
+    shaping operators have no operations.
+    """
+    rules = CostEstimator()
+    operations = {}
+
+    def count(o, *ops):
+        before = sum(rules.counts[key] for key in _operation_keys)
+        r = rules._handlers[o._ufl_typecode_](o, *ops)
+        operations[o] = sum(rules.counts[key] for key in _operation_keys) - before
+        return r
+
+    map_expr_dags(count, expressions, compress=False)
+    return operations
@@ -17,6 +17,7 @@ from ufl.algorithms.multifunction import MultiFunction
 from ufl.corealg.map_dag import map_expr_dags
 from ufl.checks import is_cellwise_constant
 from ufl.constantvalue import IntValue
+from ufl.algorithms.analysis import extract_arguments
 
 
 class IrreducibleInt(int):
@@ -28,12 +29,29 @@ class IrreducibleInt(int):
 
 
 class SumDegreeEstimator(MultiFunction):
-    "This algorithm is exact for a few operators and heuristic for many."
+    """This algorithm is exact for a few operators and heuristic for many.
 
-    def __init__(self, default_degree, element_replace_map):
+    Nonpolynomial operators add nonpolynomial_increment to the degree
+    of their operands, bounded by max_nonpolynomial_degree if given.
+
+    If degree_sources is given, only the arguments with a number in
+    degree_sources, and the coefficients and geometric quantities if
+    None is in degree_sources, contribute to the degree, such that the
+    degree contributed by e.g. the test function can be estimated.
+    """
+
+    def __init__(self, default_degree, element_replace_map,
+                 nonpolynomial_increment=2, max_nonpolynomial_degree=None,
+                 degree_sources=None):
         MultiFunction.__init__(self)
         self.default_degree = default_degree
         self.element_replace_map = element_replace_map
+        self.nonpolynomial_increment = nonpolynomial_increment
+        self.max_nonpolynomial_degree = max_nonpolynomial_degree
+        self.degree_sources = degree_sources
+
+    def _is_source(self, number):
+        return self.degree_sources is None or number in self.degree_sources
 
     def constant_value(self, v):
         "Constant values are constant."
@@ -44,7 +62,7 @@ class SumDegreeEstimator(MultiFunction):
 
     def geometric_quantity(self, v):
         "Some geometric quantities are cellwise constant. Others are nonpolynomial and thus hard to estimate."
-        if is_cellwise_constant(v):
+        if not self._is_source(None) or is_cellwise_constant(v):
             return 0
         else:
             # As a heuristic, just returning domain degree to bump up degree somewhat
@@ -52,20 +70,28 @@ class SumDegreeEstimator(MultiFunction):
 
     def spatial_coordinate(self, v):
         "A coordinate provides additional degrees depending on coordinate field of domain."
+        if not self._is_source(None):
+            return 0
         return v.ufl_domain().ufl_coordinate_element().degree()
 
     def cell_coordinate(self, v):
         "A coordinate provides one additional degree."
+        if not self._is_source(None):
+            return 0
         return 1
 
     def argument(self, v):
         """A form argument provides a degree depending on the element,
         or the default degree if the element has no degree."""
+        if not self._is_source(v.number()):
+            return 0
         return v.ufl_element().degree()  # FIXME: Use component to improve accuracy for mixed elements
 
     def coefficient(self, v):
         """A form argument provides a degree depending on the element,
         or the default degree if the element has no degree."""
+        if not self._is_source(None):
+            return 0
         e = v.ufl_element()
         e = self.element_replace_map.get(e, e)
         d = e.degree()  # FIXME: Use component to improve accuracy for mixed elements
@@ -112,6 +138,25 @@ class SumDegreeEstimator(MultiFunction):
         else:
             return max_single(ops + (0,))
 
+    def _cap_degree(self, degree):
+        "Bound the degree of a nonpolynomial operator by max_nonpolynomial_degree."
+        cap = self.max_nonpolynomial_degree
+        if cap is None:
+            return degree
+
+        def cap_single(d):
+            if isinstance(d, IrreducibleInt):
+                return IrreducibleInt(min(d, cap))
+            return min(d, cap)
+
+        if isinstance(degree, tuple):
+            return tuple(map(cap_single, degree))
+        return cap_single(degree)
+
+    def _nonpolynomial_degree(self, v, a):
+        "Heuristic degree of a nonpolynomial operator of an operand of degree a."
+        return self._cap_degree(self._add_degrees(v, a, self.nonpolynomial_increment))
+
     def _not_handled(self, v, *args):
         error("Missing degree handler for type %s" % v._ufl_class_.__name__)
 
@@ -218,9 +263,14 @@ class SumDegreeEstimator(MultiFunction):
         else:
             return a
 
-    def division(self, v, *ops):
-        "Using the sum here is a heuristic. Consider e.g. (x+1)/(x-1)."
-        return self._add_degrees(v, *ops)
+    def division(self, v, a, b):
+        """Using the sum here is a heuristic. Consider e.g. (x+1)/(x-1).
+        Division by a nonconstant is bounded by max_nonpolynomial_degree,
+        but not below the degree of the numerator."""
+        degree = self._add_degrees(v, a, b)
+        if not b:
+            return degree
+        return self._max_degrees(v, a, self._cap_degree(degree))
 
     def power(self, v, a, b):
         """If b is a positive integer:
@@ -239,7 +289,7 @@ class SumDegreeEstimator(MultiFunction):
 
         # Something to a non-(positive integer) power, e.g. float,
         # negative integer, Coefficient, etc.
-        return self._add_degrees(v, a, 2)
+        return self._nonpolynomial_degree(v, a)
 
     def atan_2(self, v, a, b):
         """Using the heuristic
@@ -249,7 +299,7 @@ class SumDegreeEstimator(MultiFunction):
         gives a somewhat high integration degree.
         """
         if a or b:
-            return self._add_degrees(v, self._max_degrees(v, a, b), 2)
+            return self._nonpolynomial_degree(v, self._max_degrees(v, a, b))
         else:
             return self._max_degrees(v, a, b)
 
@@ -261,7 +311,7 @@ class SumDegreeEstimator(MultiFunction):
         gives a somewhat high integration degree.
         """
         if a:
-            return self._add_degrees(v, a, 2)
+            return self._nonpolynomial_degree(v, a)
         else:
             return a
 
@@ -273,7 +323,7 @@ class SumDegreeEstimator(MultiFunction):
         gives a somewhat high integration degree.
         """
         if x:
-            return self._add_degrees(v, x, 2)
+            return self._nonpolynomial_degree(v, x)
         else:
             return x
 
@@ -310,8 +360,37 @@ class SumDegreeEstimator(MultiFunction):
         return self._max_degrees(v, *o)
 
 
+def _estimate_degrees(e, default_degree, element_replace_map,
+                      nonpolynomial_increment, max_nonpolynomial_degree,
+                      degree_sources, cache):
+    de = SumDegreeEstimator(default_degree, element_replace_map,
+                            nonpolynomial_increment, max_nonpolynomial_degree,
+                            degree_sources)
+    vcache = None
+    if cache is not None:
+        # Results can only be shared between estimators with the same
+        # configuration
+        key = (default_degree, frozenset(element_replace_map.items()),
+               nonpolynomial_increment, max_nonpolynomial_degree,
+               degree_sources)
+        vcache = cache.setdefault(key, {})
+    if isinstance(e, Form):
+        if not e.integrals():
+            error("Got form with no integrals!")
+        degrees = map_expr_dags(de, [it.integrand() for it in e.integrals()], vcache=vcache)
+    elif isinstance(e, Integral):
+        degrees = map_expr_dags(de, [e.integrand()], vcache=vcache)
+    else:
+        degrees = map_expr_dags(de, [e], vcache=vcache)
+    degree = max(degrees) if degrees else default_degree
+    return degree
+
+
 def estimate_total_polynomial_degree(e, default_degree=1,
-                                     element_replace_map={}):
+                                     element_replace_map={},
+                                     nonpolynomial_increment=2,
+                                     max_nonpolynomial_degree=None,
+                                     cache=None):
     """Estimate total polynomial degree of integrand.
 
     NB! Although some compound types are supported here,
@@ -321,15 +400,41 @@ def estimate_total_polynomial_degree(e, default_degree=1,
 
     For coefficients defined on an element with unspecified degree (None),
     the degree is set to the given default degree.
+
+    Nonpolynomial operators such as math functions, powers with
+    noninteger exponents and divisions by nonconstants are estimated
+    by adding nonpolynomial_increment to the degree of their operands,
+    bounded by max_nonpolynomial_degree if given.
+
+    If a dict is given as cache, the degrees of all subexpressions
+    are stored in it and reused by later calls with the same cache,
+    e.g. for the integrals of a form sharing subexpressions.
+    """
+    return _estimate_degrees(e, default_degree, element_replace_map,
+                             nonpolynomial_increment, max_nonpolynomial_degree,
+                             None, cache)
+
+
+def estimate_argument_degrees(e, default_degree=1,
+                              element_replace_map={},
+                              nonpolynomial_increment=2,
+                              max_nonpolynomial_degree=None,
+                              cache=None):
+    """Estimate the polynomial degree contributed to an integrand by
+    each of its arguments and by its other factors.
+
+    Returns a dict mapping the number of each argument in e to the
+    degree of e in that argument, and None to the degree of e in its
+    coefficients and geometric quantities. The total polynomial
+    degree of e is bounded by the sum of these degrees. The other
+    parameters are as for estimate_total_polynomial_degree.
     """
-    de = SumDegreeEstimator(default_degree, element_replace_map)
     if isinstance(e, Form):
-        if not e.integrals():
-            error("Got form with no integrals!")
-        degrees = map_expr_dags(de, [it.integrand() for it in e.integrals()])
-    elif isinstance(e, Integral):
-        degrees = map_expr_dags(de, [e.integrand()])
+        arguments = e.arguments()
     else:
-        degrees = map_expr_dags(de, [e])
-    degree = max(degrees) if degrees else default_degree
-    return degree
+        arguments = extract_arguments(e)
+    numbers = sorted(set(a.number() for a in arguments))
+    return dict((number, _estimate_degrees(e, default_degree, element_replace_map,
+                                           nonpolynomial_increment, max_nonpolynomial_degree,
+                                           frozenset((number,)), cache))
+                for number in numbers + [None])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Algorithm for folding literals, evaluating fixed index lookups of
+literal tensors and eliminating zero and one factors in expressions
+built without constant folding."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from ufl.algebra import _fold_sum, _fold_product, _fold_division
+from ufl.indexed import _fixed_component
+from ufl.classes import Identity, Indexed, ComponentTensor, Product, MultiIndex, Index
+from ufl.corealg.multifunction import MultiFunction
+from ufl.algorithms.map_integrands import map_integrand_dags
+
+
+class ConstantFolder(MultiFunction):
+    """Fold the literals of sums, products and divisions and evaluate
+    fixed index lookups of literal and listed tensors, as done when
+    constructing expressions in the ``ufl.constantvalue.constant_folding``
+    context.
+
+    Index sums of products with an identity matrix are contracted,
+    e.g. ``I[i, j]*A[j, k]`` summed over ``j`` gives ``A[i, k]``.
+    """
+    expr = MultiFunction.reuse_if_untouched
+
+    def terminal(self, o):
+        return o
+
+    def sum(self, o, a, b):
+        folded = _fold_sum(a, b)
+        if folded is None:
+            return self.reuse_if_untouched(o, a, b)
+        return folded
+
+    def product(self, o, a, b):
+        folded = _fold_product(a, b)
+        if folded is None:
+            return self.reuse_if_untouched(o, a, b)
+        return folded
+
+    def division(self, o, a, b):
+        folded = _fold_division(a, b)
+        if folded is None:
+            return self.reuse_if_untouched(o, a, b)
+        return folded
+
+    def indexed(self, o, A, ii):
+        folded = _fixed_component(A, ii)
+        if folded is None:
+            return self.reuse_if_untouched(o, A, ii)
+        return folded
+
+    def index_sum(self, o, summand, multiindex):
+        j, = multiindex
+        if isinstance(summand, Product):
+            for a, b in (summand.ufl_operands, reversed(summand.ufl_operands)):
+                if isinstance(a, Indexed) and isinstance(a.ufl_operands[0], Identity):
+                    ii = a.ufl_operands[1].indices()
+                    if ii.count(j) != 1:
+                        continue
+                    k = ii[1] if ii[0] == j else ii[0]
+                    # The other factor must depend on j but not on k
+                    fi = b.ufl_free_indices
+                    if j.count() in fi and not (isinstance(k, Index) and k.count() in fi):
+                        return _substitute_index(b, j, k)
+        return self.reuse_if_untouched(o, summand, multiindex)
+
+
+def _substitute_index(e, j, k):
+    "Replace the free index j of e by the index k."
+    if isinstance(e, Indexed):
+        A, ii = e.ufl_operands
+        if j.count() not in A.ufl_free_indices and ii.indices().count(j) == 1:
+            return Indexed(A, MultiIndex(tuple(k if i == j else i for i in ii)))
+    return Indexed(ComponentTensor(e, MultiIndex((j,))), MultiIndex((k,)))
+
+
+def fold_constants(expr):
+    """Fold the literals of an expression or the integrands of a form,
+    evaluate fixed index lookups of identity matrices, permutation
+    symbols and list tensors, and eliminate zero and one factors.
+
+    This does not depend on the process-global
+    ``ufl.constantvalue.constant_folding`` context, see ConstantFolder.
+    """
+    return map_integrand_dags(ConstantFolder(), expr)
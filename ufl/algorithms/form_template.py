@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""This module provides the FormTemplate class for reusing the
+preprocessing of a form for other forms of the same structure that
+differ only in their coefficients and constants."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+import copy
+
+from ufl.log import error
+from ufl.classes import Coefficient, Constant, Form
+from ufl.algorithms.formdata import FormData
+from ufl.algorithms.compute_form_data import compute_form_data
+from ufl.algorithms.map_integrands import map_integrand_dags
+from ufl.algorithms.replace import Replacer
+
+
+class _TerminalReplacer(Replacer):
+    """Replace coefficients and constants, also in derivatives that
+    are not applied. Unlike replace, this keeps the form unchanged
+    otherwise, which is sound as no two terminals are merged."""
+    coefficient_derivative = Replacer.expr
+
+
+class FormTemplate(object):
+    """Preprocess a form once and instantiate form data for other
+    coefficients and constants.
+
+    The form data of an instance shares the preprocessed integrals,
+    elements and signatures of the template. Its
+    ``reduced_coefficients`` and ``reduced_constants`` hold the new
+    coefficients and constants in the order expected by the kernels
+    of the template, and the template coefficients in
+    ``function_replace_map`` are complemented by the new
+    coefficients. The ``original_form`` and ``preprocessed_form`` of
+    an instance refer to the new coefficients and constants. The
+    mapping from template to new coefficients and constants is stored
+    as ``coefficient_map``.
+    """
+
+    def __init__(self, form, **kwargs):
+        "Preprocess form, passing keyword arguments to compute_form_data."
+        if not isinstance(form, Form):
+            error("Expecting a Form.")
+        self._form_data = compute_form_data(form, **kwargs)
+        self._coefficients = set(form.coefficients())
+        self._constants = set(form.constants())
+
+    def form_data(self):
+        "Return the form data of the template form."
+        return self._form_data
+
+    def _check_mapping(self, coefficient_map):
+        for old, new in coefficient_map.items():
+            if isinstance(old, Coefficient):
+                if old not in self._coefficients:
+                    error("Coefficient %s is not in the template form." % (old,))
+                if not isinstance(new, Coefficient) or \
+                   new.ufl_function_space() != old.ufl_function_space():
+                    error("Expecting a Coefficient in the same function space as %s." % (old,))
+            elif isinstance(old, Constant):
+                if old not in self._constants:
+                    error("Constant %s is not in the template form." % (old,))
+                if not isinstance(new, Constant) or new.ufl_shape != old.ufl_shape \
+                   or new.ufl_domain() != old.ufl_domain():
+                    error("Expecting a Constant of the same shape and domain as %s." % (old,))
+            else:
+                error("Expecting a Coefficient or Constant, not %s." % old._ufl_class_.__name__)
+
+        # The kernels of the template take each coefficient and
+        # constant separately
+        terminals = list(self._coefficients) + list(self._constants)
+        if len(set(coefficient_map.get(c, c) for c in terminals)) != len(terminals):
+            error("Expecting the coefficients and constants of the template form to be mapped to distinct objects.")
+
+    def instantiate(self, coefficient_map):
+        """Return form data for the template form with coefficients and
+        constants replaced as given by coefficient_map.
+
+        The preprocessed integrals of the template are shared and not
+        visited, only the original and preprocessed forms are rebuilt
+        with the new coefficients and constants.
+        """
+        self._check_mapping(coefficient_map)
+        template = self._form_data
+
+        def mapped(c):
+            return coefficient_map.get(c, c)
+
+        form_data = FormData()
+        form_data.__dict__.update(template.__dict__)
+        form_data.coefficient_map = dict(coefficient_map)
+        replacer = _TerminalReplacer(coefficient_map)
+        form_data.original_form = map_integrand_dags(replacer, template.original_form)
+        form_data.preprocessed_form = map_integrand_dags(replacer, template.preprocessed_form)
+
+        # Keep the kernel argument order of the template, while the
+        # positions refer to the coefficients and constants of the new
+        # form
+        form_data.reduced_coefficients = [mapped(c) for c in template.reduced_coefficients]
+        positions = {c: i for i, c in enumerate(form_data.original_form.coefficients())}
+        form_data.original_coefficient_positions = [positions[c] for c in form_data.reduced_coefficients]
+        form_data.reduced_constants = [mapped(c) for c in template.reduced_constants]
+        positions = {c: i for i, c in enumerate(form_data.original_form.constants())}
+        form_data.original_constant_positions = [positions[c] for c in form_data.reduced_constants]
+
+        # The template integrands refer to the template coefficients,
+        # so keep these and add the new coefficients
+        form_data.function_replace_map = dict(template.function_replace_map)
+        for c, renumbered in template.function_replace_map.items():
+            form_data.function_replace_map[mapped(c)] = renumbered
+
+        if template.coefficient_dependencies is not None:
+            form_data.coefficient_dependencies = dict((mapped(f), dependencies) for f, dependencies
+                                                      in template.coefficient_dependencies.items())
+
+        # Copy the integral data with all cached analyses, as these
+        # depend on the integrands only
+        form_data.integral_data = []
+        for itg_data in template.integral_data:
+            new_itg_data = copy.copy(itg_data)
+            new_itg_data.integral_coefficients = set(mapped(c) for c in itg_data.integral_coefficients)
+            new_itg_data.integral_constants = set(mapped(c) for c in itg_data.integral_constants)
+            form_data.integral_data.append(new_itg_data)
+
+        return form_data
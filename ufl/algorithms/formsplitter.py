@@ -9,7 +9,12 @@
 #
 # Modified by Cecile Daversin-Catty, 2018
 
+from collections import defaultdict
+
+from ufl.log import error
+from ufl.form import Form
 from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dag
 from ufl.algorithms.map_integrands import map_integrand_dags
 from ufl.constantvalue import Zero
 from ufl.tensors import as_vector
@@ -75,44 +80,197 @@ class FormSplitter(MultiFunction):
     expr = MultiFunction.reuse_if_untouched
 
 
-def extract_blocks(form, i=None, j=None):
-    fs = FormSplitter()
-    arguments = form.arguments()
-    forms = []
+def _join_block_keys(a, b):
+    "Join two block keys, or return None if they assign different blocks to an argument."
+    if not a:
+        return b
+    if not b:
+        return a
+    blocks = dict(a)
+    for number, block in b:
+        if blocks.setdefault(number, block) != block:
+            return None
+    return tuple(sorted(blocks.items()))
 
-    numbers = tuple(sorted(set(a.number() for a in arguments)))
-    arity = len(numbers)
-    parts = tuple(sorted(set(a.part() for a in arguments)))
-    assert arity <= 2
 
-    if arity == 0:
-        return (form, )
+class BlockSplitter(MultiFunction):
+    """Split an expression into the blocks of all its arguments in a
+    single pass.
 
-    for pi in parts:
-        if arity > 1:
-            for pj in parts:
-                f = fs.split(form, pi, pj)
-                if(f.empty()):
-                    forms.append(None)
-                else:
-                    forms.append(f)
-        else:
-            f = fs.split(form, pi)
-            if(f.empty()):
-                forms.append(None)
-            else:
-                forms.append(f)
+    Each subexpression is mapped to a dict from block keys, i.e. sorted
+    tuples of (argument number, block index) pairs for the arguments the
+    subexpression depends on, to the subexpression restricted to that
+    block. Structurally zero blocks are left out.
+    """
 
-    try:
-        forms_tuple = tuple(forms)
-    except TypeError:
-        # Only one form returned
-        forms_tuple = (forms, )
+    def terminal(self, o):
+        return {(): o}
 
-    if i is not None:
-        if arity > 1 and j is not None:
-            return forms_tuple[i * len(parts) + j]
+    def argument(self, obj):
+        n = obj.number()
+        if (obj.part() is not None):
+            # Mixed element built from MixedFunctionSpace,
+            # whose sub-function spaces are indexed by obj.part()
+            if len(obj.ufl_shape) == 0:
+                return {((n, obj.part()),): obj}
+            else:
+                indices = [()]
+                for m in obj.ufl_shape:
+                    indices = [(k + (j,)) for k in indices for j in range(m)]
+                return {((n, obj.part()),): as_vector([obj[j] for j in indices])}
         else:
-            return forms_tuple[i]
+            # Mixed element built from MixedElement,
+            # whose sub-elements need their function space to be created
+            Q = obj.ufl_function_space()
+            dom = Q.ufl_domain()
+            sub_elements = obj.ufl_element().sub_elements()
+
+            # If not a mixed element, do nothing
+            if (len(sub_elements) == 0):
+                return {((n, None),): obj}
+
+            sub_args = []
+            for i, sub_elem in enumerate(sub_elements):
+                Q_i = FunctionSpace(dom, sub_elem)
+                a = Argument(Q_i, n, part=obj.part())
+
+                indices = [()]
+                for m in a.ufl_shape:
+                    indices = [(k + (j,)) for k in indices for j in range(m)]
+                sub_args.append(([a[j] for j in indices], [Zero() for j in indices]))
+
+            blocks = {}
+            for i in range(len(sub_args)):
+                args = []
+                for k, (nonzero, zero) in enumerate(sub_args):
+                    args += nonzero if k == i else zero
+                blocks[((n, i),)] = as_vector(args)
+            return blocks
+
+    def _reconstruct(self, o, operands):
+        if all(a is b for a, b in zip(operands, o.ufl_operands)):
+            return o
+        return o._ufl_expr_reconstruct_(*operands)
+
+    def expr(self, o, *ops):
+        # Operators are assumed to vanish if any operand vanishes, as
+        # do products of arguments
+        partial = {(): []}
+        for blocks in ops:
+            new_partial = {}
+            for key, operands in partial.items():
+                for op_key, op in blocks.items():
+                    new_key = _join_block_keys(key, op_key)
+                    if new_key is not None:
+                        if new_key in new_partial:
+                            error("Cannot split expression depending on different arguments.")
+                        new_partial[new_key] = operands + [op]
+            partial = new_partial
+
+        result = {}
+        for key, operands in partial.items():
+            r = self._reconstruct(o, operands)
+            if not isinstance(r, Zero):
+                result[key] = r
+        return result
+
+    def sum(self, o, *ops):
+        # Operators where a vanishing operand is replaced by zero
+        numbers = set(number for blocks in ops for key in blocks for number, _ in key)
+        keys = set(key for blocks in ops for key in blocks if len(key) == len(numbers))
+        if numbers and not keys:
+            error("Cannot split expression adding different arguments.")
+
+        result = {}
+        for key in keys:
+            operands = []
+            for blocks, operand in zip(ops, o.ufl_operands):
+                # Operands may depend on a subset of the arguments
+                op_numbers = set(number for op_key in blocks for number, _ in op_key)
+                op_key = tuple((number, block) for number, block in key if number in op_numbers)
+                op = blocks.get(op_key)
+                if op is None:
+                    op = Zero(operand.ufl_shape, operand.ufl_free_indices, operand.ufl_index_dimensions)
+                operands.append(op)
+            r = self._reconstruct(o, operands)
+            if not isinstance(r, Zero):
+                result[key] = r
+        return result
+
+    list_tensor = sum
+
+    def conditional(self, o, c, t, f):
+        if list(c) != [()]:
+            # Conditions depending on arguments are not linear
+            return self.expr(o, c, t, f)
+        return self.sum(o, c, t, f)
+
+
+def split_blocks(form):
+    """Split a form into the blocks of its arguments with a single
+    traversal of each integrand.
+
+    Returns a dict from tuples with the block index of each argument,
+    ordered by argument number, to the nonzero forms of the blocks.
+    """
+    rules = BlockSplitter()
+    cache = {}
+    integrals = defaultdict(list)
+    for itg in form.integrals():
+        blocks = map_expr_dag(rules, itg.integrand(), compress=False, vcache=cache)
+        for key, integrand in blocks.items():
+            integrals[tuple(block for _, block in key)].append(itg.reconstruct(integrand))
+    return dict((key, Form(itgs)) for key, itgs in integrals.items())
+
+
+def _block_parts(arguments):
+    "Return the sorted parts of the arguments, indexing the blocks of a form."
+    return tuple(sorted(set(a.part() for a in arguments), key=lambda p: (p is not None, p)))
+
+
+def extract_all_blocks(form):
+    """Extract all blocks of a linear or bilinear form on a mixed space
+    with a single traversal of each integrand.
+
+    Returns a tuple of forms for a linear form, and a tuple of rows of
+    forms for a bilinear form, with None for the blocks that are zero.
+    The blocks are indexed by the parts of the arguments of the form.
+    """
+    arguments = form.arguments()
+    arity = len(set(a.number() for a in arguments))
+    if arity > 2:
+        error("Expecting a linear or bilinear form.")
+
+    if arity == 0:
+        return (form, )
+
+    parts = _block_parts(arguments)
+    blocks = split_blocks(form)
+    if arity == 1:
+        return tuple(blocks.get((pi,)) for pi in parts)
     else:
-        return forms_tuple
+        return tuple(tuple(blocks.get((pi, pj)) for pj in parts) for pi in parts)
+
+
+def extract_blocks(form, i=None, j=None):
+    if i is None:
+        forms = extract_all_blocks(form)
+        if forms and isinstance(forms[0], tuple):
+            # Flatten the rows of the blocks of a bilinear form
+            forms = tuple(f for row in forms for f in row)
+        return forms
+
+    arguments = form.arguments()
+    arity = len(set(a.number() for a in arguments))
+    if arity == 0:
+        return (form, )[i]
+
+    # Only split the requested block
+    parts = _block_parts(arguments)
+    if arity > 1 and j is None:
+        # Index into the flattened blocks
+        i, j = divmod(i, len(parts))
+    f = FormSplitter().split(form, parts[i], parts[j] if arity > 1 else 0)
+    if f.empty():
+        return None
+    return f
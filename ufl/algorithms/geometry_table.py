@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for collecting the geometric subexpressions of the
+integrands of a form into a table for each domain, such that
+assemblers can compute the cell geometry once per cell and share it
+between all kernels on that cell."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from ufl.classes import PositiveRestricted, NegativeRestricted, Index, MultiIndex
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dag
+from ufl.corealg.traversal import unique_post_traversal
+from ufl.algorithms.loop_invariance import CELL_GEOMETRY, compute_dependencies
+
+
+class GeometryEntryBuilder(MultiFunction):
+    """Build the table entry of a geometric subexpression, removing
+    restrictions and renumbering indices in order of appearance, such
+    that equal subexpressions with different restrictions or index
+    numbering give equal entries."""
+    expr = MultiFunction.reuse_if_untouched
+
+    def __init__(self):
+        MultiFunction.__init__(self)
+        self.index_map = {}
+
+    def terminal(self, o):
+        return o
+
+    def multi_index(self, o):
+        indices = []
+        for i in o.indices():
+            if isinstance(i, Index):
+                i = self.index_map.setdefault(i.count(), Index(count=len(self.index_map)))
+            indices.append(i)
+        return MultiIndex(tuple(indices))
+
+    def restricted(self, o, f):
+        return f
+
+
+def _restriction_sides(integrands):
+    "Map each subexpression of the integrands to the set of its restrictions."
+    sides = {}
+    visited = set()
+    for integrand in integrands:
+        for o in unique_post_traversal(integrand, visited=visited):
+            if isinstance(o, PositiveRestricted):
+                sides[o] = frozenset("+")
+            elif isinstance(o, NegativeRestricted):
+                sides[o] = frozenset("-")
+            else:
+                sides[o] = frozenset().union(*[sides[op] for op in o.ufl_operands])
+    return sides
+
+
+def _geometry_subexpressions(integrands, dependencies, sides):
+    """Find the maximal subexpressions of the integrands depending on the
+    cell geometry only, which are cellwise constant, without free
+    indices and restricted to at most one side, in the order they are
+    first reached."""
+    geometry = frozenset((CELL_GEOMETRY,))
+    subexpressions = []
+    visited = set()
+    stack = list(reversed(integrands))
+    while stack:
+        o = stack.pop()
+        if o in visited:
+            continue
+        visited.add(o)
+        if dependencies[o] == geometry and not o.ufl_free_indices and len(sides[o]) < 2:
+            subexpressions.append(o)
+        else:
+            stack.extend(reversed(o.ufl_operands))
+    return subexpressions
+
+
+def compute_geometry_tables(integral_data):
+    """Collect the geometric subexpressions of the integrands of a list
+    of integral data into a table for each domain.
+
+    The table entries are the maximal subexpressions that depend only
+    on the cell geometry, literals and constants, are constant over
+    each cell and have no free indices, with restrictions removed and
+    indices renumbered, such that the entries of interior facet
+    integrals are shared with the integrals over the cells on either
+    side. Subexpressions
+    combining the geometry of both sides of a facet are split into
+    entries for each side. Note that facet quantities such as the
+    reference normal are constant for each facet of a cell.
+
+    Returns a dict mapping each domain to a tuple of its unique table
+    entries, in order of first use, and a list with a dict for each
+    integral data mapping its geometric subexpressions to pairs ``(i,
+    restriction)`` of the position ``i`` of the corresponding entry in
+    the table of its domain and the restriction ``"+"``, ``"-"`` or
+    None of the subexpression. The integral data are not modified,
+    but the dependencies cached by
+    ``compute_integral_data_dependencies`` are used if present.
+    """
+    tables = {}
+    positions = {}
+    all_references = []
+    for itg_data in integral_data:
+        integrands = list(dict((id(itg.integrand()), itg.integrand())
+                               for itg in itg_data.integrals).values())
+        dependencies = itg_data.expression_dependencies
+        if dependencies is None:
+            dependencies = compute_dependencies(integrands)
+        sides = _restriction_sides(integrands)
+        table = tables.setdefault(itg_data.domain, [])
+        domain_positions = positions.setdefault(itg_data.domain, {})
+        references = {}
+        for o in _geometry_subexpressions(integrands, dependencies, sides):
+            restriction = None
+            if sides[o]:
+                restriction, = sides[o]
+            entry = map_expr_dag(GeometryEntryBuilder(), o)
+            if entry not in domain_positions:
+                domain_positions[entry] = len(table)
+                table.append(entry)
+            references[o] = (domain_positions[entry], restriction)
+        all_references.append(references)
+    tables = dict((domain, tuple(table)) for domain, table in tables.items())
+    return tables, all_references
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for classifying which loops of an element tensor
+computation each subexpression of an integrand depends on, such that
+code generators can hoist loop invariant subexpressions."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from ufl.classes import FormArgument, SpatialCoordinate, ReferenceGrad, Grad, ReferenceValue
+from ufl.classes import PositiveRestricted, NegativeRestricted
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dags
+
+
+# Dependency labels
+CELL_GEOMETRY = "geometry"
+QUADRATURE_POINT = "quadrature_point"
+COEFFICIENT = "coefficient"
+TEST_FUNCTION = "test"
+TRIAL_FUNCTION = "trial"
+
+
+def argument_label(number):
+    "The dependency label of the argument with the given number."
+    if number == 0:
+        return TEST_FUNCTION
+    elif number == 1:
+        return TRIAL_FUNCTION
+    return "argument%d" % number
+
+
+def _is_constant_derivative(o):
+    """Return whether o, a derivative of a form argument or spatial
+    coordinate, is constant over each cell because the derivatives
+    reduce the polynomial degree of the element to zero."""
+    num_derivatives = 0
+    reference = True
+    t = o
+    while not t._ufl_is_terminal_:
+        if isinstance(t, (Grad, ReferenceGrad)):
+            num_derivatives += 1
+            reference = reference and isinstance(t, ReferenceGrad)
+        elif not isinstance(t, (ReferenceValue, PositiveRestricted, NegativeRestricted)):
+            return False
+        t, = t.ufl_operands
+    if isinstance(t, FormArgument):
+        degree = t.ufl_element().degree()
+    elif isinstance(t, SpatialCoordinate):
+        degree = t.ufl_domain().ufl_coordinate_element().degree()
+    else:
+        return False
+    # The degree only bounds the total degree of polynomials on simplices
+    domain = t.ufl_domain()
+    if not isinstance(degree, int) or num_derivatives < degree or \
+       not domain.ufl_cell().is_simplex():
+        return False
+    # Physical derivatives are only polynomial on affine cells
+    return reference or domain.is_piecewise_linear_simplex_domain()
+
+
+class DependencyClassifier(MultiFunction):
+    """Compute the set of dependency labels of each subexpression.
+
+    A subexpression depends on ``CELL_GEOMETRY`` if it varies with the
+    geometry of the cell, on ``QUADRATURE_POINT`` if it varies between
+    the quadrature points of a cell or facet, on ``COEFFICIENT`` if it
+    depends on the cell values of coefficients, and on the label of
+    an argument if it varies with the basis functions of that
+    argument. Subexpressions without labels are invariant over all
+    loops, e.g. constants and literals.
+    """
+
+    def __init__(self):
+        MultiFunction.__init__(self)
+        self._empty = frozenset()
+        self._point = frozenset((QUADRATURE_POINT,))
+
+    def expr(self, o, *ops):
+        return frozenset().union(*ops)
+
+    def terminal(self, o):
+        return self._empty
+
+    def multi_index(self, o):
+        return self._empty
+
+    def label(self, o):
+        return self._empty
+
+    def argument(self, o):
+        labels = frozenset((argument_label(o.number()),))
+        if o.is_cellwise_constant():
+            return labels
+        return labels | self._point
+
+    def coefficient(self, o):
+        if o.is_cellwise_constant():
+            return frozenset((COEFFICIENT,))
+        return frozenset((COEFFICIENT, QUADRATURE_POINT))
+
+    def geometric_quantity(self, o):
+        if o.is_cellwise_constant():
+            return frozenset((CELL_GEOMETRY,))
+        return frozenset((CELL_GEOMETRY, QUADRATURE_POINT))
+
+    def quadrature_weight(self, o):
+        return self._point
+
+    def cell_coordinate(self, o):
+        return self._point
+
+    def facet_coordinate(self, o):
+        return self._point
+
+    def _derivative(self, o, a):
+        if _is_constant_derivative(o):
+            a = a - self._point
+        return a
+
+    def grad(self, o, a):
+        # Physical derivatives depend on the cell geometry through the
+        # Jacobian
+        return self._derivative(o, a | frozenset((CELL_GEOMETRY,)))
+
+    def reference_grad(self, o, a):
+        return self._derivative(o, a)
+
+    def cell_avg(self, o, a):
+        return a - self._point
+
+    facet_avg = cell_avg
+
+
+def compute_dependencies(expressions, cache=None):
+    """Classify the dependencies of all subexpressions of the given
+    preprocessed integrands.
+
+    Returns a dict mapping each unique subexpression to a frozenset of
+    the labels ``CELL_GEOMETRY``, ``QUADRATURE_POINT``,
+    ``COEFFICIENT`` and the argument labels from argument_label, see
+    DependencyClassifier. If a dict is given as cache, it is updated
+    and returned, such that subexpressions shared with earlier calls
+    are only classified once.
+    """
+    if cache is None:
+        cache = {}
+    map_expr_dags(DependencyClassifier(), expressions, vcache=cache)
+    return cache
+
+
+def compute_integral_data_dependencies(integral_data):
+    """Return the dependencies of all subexpressions of the integrands
+    of integral_data, see compute_dependencies.
+
+    The dependencies are computed once and cached on the integral
+    data.
+    """
+    if integral_data.expression_dependencies is None:
+        integrands = [itg.integrand() for itg in integral_data.integrals]
+        integral_data.expression_dependencies = compute_dependencies(integrands)
+    return integral_data.expression_dependencies
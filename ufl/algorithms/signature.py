@@ -13,8 +13,9 @@ from ufl.classes import (Label,
                          Coefficient, Argument,
                          GeometricQuantity, ConstantValue, Constant,
                          ExprList, ExprMapping)
+from ufl.domain import MeshView
 from ufl.log import error
-from ufl.corealg.traversal import traverse_unique_terminals, pre_traversal
+from ufl.corealg.traversal import traverse_unique_terminals, pre_traversal, unique_post_traversal
 from ufl.algorithms.domain_analysis import canonicalize_metadata
 
 
@@ -110,6 +111,28 @@ def compute_expression_hashdata(expression, terminal_hashdata):
     return expression_hashdata
 
 
+def compute_expression_dag_hashdata(expressions, terminal_hashdata):
+    """Compute hashdata for the unique nodes of the expressions.
+
+    Each unique node is visited once, in post order, and refers to its
+    operands by their position in the hashdata, such that the cost is
+    linear in the size of the expression DAG rather than the tree.
+    Returns the hashdata and the positions of the expressions.
+    """
+    positions = {}
+    hashdata = []
+    visited = set()
+    for expression in expressions:
+        for expr in unique_post_traversal(expression, visited):
+            if expr._ufl_is_terminal_:
+                data = terminal_hashdata[expr]
+            else:
+                data = (expr._ufl_typecode_,) + tuple(positions[op] for op in expr.ufl_operands)
+            positions[expr] = len(hashdata)
+            hashdata.append(data)
+    return hashdata, [positions[expression] for expression in expressions]
+
+
 def compute_expression_signature(expr, renumbering):  # FIXME: Fix callers
     # FIXME: Rewrite in terms of compute_form_signature?
 
@@ -162,3 +185,100 @@ def compute_form_signature(form, renumbering):  # FIXME: Fix callers
     # (should we use sha1 instead?)
     data = str(hashdata).encode("utf-8")
     return hashlib.sha512(data).hexdigest()
+
+
+def compute_integral_data_signature(integral_data, function_replace_map=None):
+    """Compute a signature for the integrals of an IntegralData object.
+
+    The signature covers the integrands, integral type, metadata and
+    integration domain, with coefficients, constants and domains
+    numbered locally within the integral data. The subdomain id and
+    the other integrals of the form are not included, such that form
+    compilers can reuse kernels for identical integrals across
+    subdomains and forms.
+
+    If *function_replace_map* is given, coefficients are represented by
+    their replacements, i.e. with completed elements.
+    """
+    if function_replace_map is None:
+        function_replace_map = {}
+    integrals = integral_data.integrals
+    integrands = [itg.integrand() for itg in integrals]
+    visited = set()
+    terminals = [t for integrand in integrands
+                 for t in traverse_unique_terminals(integrand, visited)]
+
+    # Number coefficients and constants in the order they are passed
+    # to the kernel, i.e. sorted by their global count
+    coefficients = sorted((t for t in terminals if isinstance(t, Coefficient)),
+                          key=lambda c: c.count())
+    constants = sorted((t for t in terminals if isinstance(t, Constant)),
+                       key=lambda c: c.count())
+    renumbering = {}
+    for i, c in enumerate(coefficients):
+        renumbering[c] = i
+        renumbering[function_replace_map.get(c, c)] = i
+
+    # Number the integration domain first, then any other domains
+    # of coefficients and arguments
+    domains = [integral_data.domain]
+    for t in terminals:
+        if isinstance(t, (Coefficient, Argument, Constant)):
+            d = t.ufl_domain()
+            if d is not None and d not in domains:
+                domains.append(d)
+    for k, d in enumerate(domains):
+        renumbering[d] = k
+
+    terminal_hashdata = compute_terminal_hashdata(integrands, renumbering)
+    for t in terminal_hashdata:
+        if isinstance(t, Coefficient):
+            terminal_hashdata[t] = function_replace_map.get(t, t)._ufl_signature_data_(renumbering)
+        elif isinstance(t, Constant):
+            d = t.ufl_domain()
+            terminal_hashdata[t] = ("Constant", constants.index(t), t.ufl_shape,
+                                    None if d is None else renumbering[d])
+
+    # Integrands shared between integrals, and subexpressions shared
+    # between integrands, are hashed once
+    expression_hashdata, positions = compute_expression_dag_hashdata(integrands, terminal_hashdata)
+    hashdata = [integral_data.domain._ufl_signature_data_(renumbering),
+                integral_data.integral_type,
+                expression_hashdata]
+    for integral, position in zip(integrals, positions):
+        hashdata.append((position, canonicalize_metadata(integral.metadata())))
+
+    data = str(hashdata).encode("utf-8")
+    return hashlib.sha512(data).hexdigest()
+
+
+def compute_integral_digest(integral):
+    """Compute a structural digest of a single integral of a form.
+
+    Unlike the form signature, coefficients, constants and domains are
+    identified by their global count or id rather than a numbering
+    local to the form, such that two integrals have the same digest
+    only if they apply the same operators to the same terminals.
+    The subdomain id is not included.
+    """
+    integrand = integral.integrand()
+    renumbering = {}
+    domains = [integral.ufl_domain()]
+    for t in traverse_unique_terminals(integrand):
+        if isinstance(t, Coefficient):
+            renumbering[t] = t.count()
+        if isinstance(t, (Coefficient, Argument, Constant, GeometricQuantity)):
+            domains.extend(d for d in t.ufl_domains() if d is not None)
+    for d in domains:
+        renumbering[d] = d.ufl_id()
+        if isinstance(d, MeshView):
+            renumbering[d.ufl_mesh()] = d.ufl_mesh().ufl_id()
+
+    terminal_hashdata = compute_terminal_hashdata([integrand], renumbering)
+    hashdata = (compute_expression_dag_hashdata([integrand], terminal_hashdata)[0],
+                integral.ufl_domain()._ufl_signature_data_(renumbering),
+                integral.integral_type(),
+                canonicalize_metadata(integral.metadata()))
+
+    data = str(hashdata).encode("utf-8")
+    return hashlib.sha512(data).hexdigest()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for computing which components of the test and trial
+functions of a bilinear form are coupled, i.e. the component and block
+sparsity pattern of the assembled matrix."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from itertools import product
+
+from ufl.log import error
+from ufl.form import Form
+from ufl.classes import FixedIndex
+from ufl.finiteelement import MixedElement
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dag
+from ufl.algorithms.apply_algebra_lowering import apply_algebra_lowering
+from ufl.algorithms.apply_derivatives import apply_derivatives
+
+
+def _all_components(shape):
+    return product(*[range(d) for d in shape])
+
+
+def _all_keys(o):
+    "Iterate over all (component, free index values) keys of o."
+    for c in _all_components(o.ufl_shape):
+        for ii in _all_components(o.ufl_index_dimensions):
+            yield (c, ii)
+
+
+def _monomial_product(a, b):
+    return tuple(sorted(a + b, key=lambda x: (x[0], repr(x[1:]))))
+
+
+class SparsityAnalyzer(MultiFunction):
+    """Compute the argument components each component of a
+    subexpression depends on.
+
+    Each subexpression is mapped to None if it does not depend on any
+    argument, or otherwise to a dict from keys (component, free index
+    values) to the set of monomials of the subexpression in that
+    component, where a monomial is a tuple of (argument number, part,
+    argument component) triplets. Components that do not depend on any
+    argument are left out, such that an empty dict represents zero.
+    Terms that do not depend on any argument are dropped from sums, as
+    they do not contribute to the terms depending on all arguments.
+    """
+
+    def terminal(self, o):
+        return None
+
+    def zero(self, o):
+        return {}
+
+    def argument(self, o):
+        n = o.number()
+        part = o.part()
+        return dict(((c, ()), frozenset((((n, part, c),),)))
+                    for c in _all_components(o.ufl_shape))
+
+    def _scalar_table(self, o, table):
+        "Expand an argument independent scalar operand with free indices to a table."
+        if table is None:
+            return dict(((c, ii), frozenset(((),))) for c, ii in _all_keys(o))
+        return table
+
+    def expr(self, o, *ops):
+        # Conservatively assume that each component of an unknown
+        # operator depends on each component of its operands
+        tables = [table for table in ops if table is not None]
+        if not tables:
+            return None
+        monomials = frozenset(m for table in tables for ms in table.values() for m in ms)
+        if not monomials:
+            return {}
+        return dict((key, monomials) for key in _all_keys(o))
+
+    def _union(self, o, *ops):
+        tables = [table for table in ops if table is not None]
+        if not tables:
+            return None
+        result = {}
+        for table in tables:
+            for key, monomials in table.items():
+                result[key] = result.get(key, frozenset()) | monomials
+        return result
+
+    sum = _union
+
+    def conditional(self, o, c, t, f):
+        if c is not None:
+            return self.expr(o, c, t, f)
+        return self._union(o, t, f)
+
+    def product(self, o, a, b):
+        if a is None and b is None:
+            return None
+        a_expr, b_expr = o.ufl_operands
+        a = self._scalar_table(a_expr, a)
+        b = self._scalar_table(b_expr, b)
+        a_fi = a_expr.ufl_free_indices
+        b_fi = b_expr.ufl_free_indices
+        o_fi = o.ufl_free_indices
+        result = {}
+        for (ac, aii), am in a.items():
+            for (bc, bii), bm in b.items():
+                # Match the values of shared free indices
+                values = dict(zip(a_fi, aii))
+                if any(values.setdefault(i, v) != v for i, v in zip(b_fi, bii)):
+                    continue
+                key = ((), tuple(values[i] for i in o_fi))
+                monomials = frozenset(_monomial_product(x, y) for x in am for y in bm)
+                result[key] = result.get(key, frozenset()) | monomials
+        return result
+
+    def division(self, o, a, b):
+        if b is not None:
+            return self.expr(o, a, b)
+        return a
+
+    def indexed(self, o, A, ii):
+        if A is None:
+            return None
+        A_expr, multiindex = o.ufl_operands
+        A_fi = A_expr.ufl_free_indices
+        o_fi = o.ufl_free_indices
+        result = {}
+        for (c, Aii), monomials in A.items():
+            values = dict(zip(A_fi, Aii))
+            for k, i in zip(c, multiindex):
+                if isinstance(i, FixedIndex):
+                    if int(i) != k:
+                        break
+                elif values.setdefault(i.count(), k) != k:
+                    break
+            else:
+                key = ((), tuple(values[i] for i in o_fi))
+                result[key] = result.get(key, frozenset()) | monomials
+        return result
+
+    def component_tensor(self, o, A, ii):
+        if A is None:
+            return None
+        A_expr, multiindex = o.ufl_operands
+        A_fi = A_expr.ufl_free_indices
+        o_fi = o.ufl_free_indices
+        result = {}
+        for (c, Aii), monomials in A.items():
+            values = dict(zip(A_fi, Aii))
+            key = (tuple(values[i.count()] for i in multiindex),
+                   tuple(values[i] for i in o_fi))
+            result[key] = result.get(key, frozenset()) | monomials
+        return result
+
+    def index_sum(self, o, A, i):
+        if A is None:
+            return None
+        A_expr, multiindex = o.ufl_operands
+        A_fi = A_expr.ufl_free_indices
+        o_fi = o.ufl_free_indices
+        result = {}
+        for (c, Aii), monomials in A.items():
+            values = dict(zip(A_fi, Aii))
+            key = (c, tuple(values[j] for j in o_fi))
+            result[key] = result.get(key, frozenset()) | monomials
+        return result
+
+    def list_tensor(self, o, *ops):
+        if all(table is None for table in ops):
+            return None
+        result = {}
+        for k, table in enumerate(ops):
+            if table is not None:
+                for (c, ii), monomials in table.items():
+                    result[((k,) + c, ii)] = monomials
+        return result
+
+    def grad(self, o, A):
+        if A is None:
+            return None
+        dim = o.ufl_shape[-1]
+        result = {}
+        for (c, ii), monomials in A.items():
+            for d in range(dim):
+                result[(c + (d,), ii)] = monomials
+        return result
+
+    reference_grad = grad
+
+    def pass_through(self, o, A):
+        return A
+
+    # Componentwise linear operators
+    positive_restricted = pass_through
+    negative_restricted = pass_through
+    cell_avg = pass_through
+    facet_avg = pass_through
+    conj = pass_through
+    real = pass_through
+    imag = pass_through
+
+    def variable(self, o, A, l):
+        return A
+
+
+def compute_form_sparsity(form):
+    """Compute which components of the test and trial functions of a
+    bilinear form couple.
+
+    Returns a set of pairs (test, trial), where test and trial are
+    tuples (part, component) with the part of the argument in a mixed
+    function space, or None, and a value component of the argument.
+    Pairs that are not returned give structurally zero entries in the
+    element matrix. The analysis tracks the argument components through
+    indexing, index sums and tensors without expanding the indices in
+    the expressions, and is conservative for nonlinear operators.
+    """
+    if not isinstance(form, Form):
+        error("Expecting a Form.")
+    numbers = set(a.number() for a in form.arguments())
+    if numbers != set((0, 1)):
+        error("Expecting a bilinear form.")
+
+    form = apply_algebra_lowering(form)
+    form = apply_derivatives(form)
+
+    rules = SparsityAnalyzer()
+    cache = {}
+    pairs = set()
+    for itg in form.integrals():
+        table = map_expr_dag(rules, itg.integrand(), compress=False, vcache=cache)
+        if table is None:
+            continue
+        for monomials in table.values():
+            for m in monomials:
+                if len(m) == 2 and m[0][0] == 0 and m[1][0] == 1:
+                    pairs.add((m[0][1:], m[1][1:]))
+    return pairs
+
+
+def _block_index(element, part, component):
+    if part is not None:
+        return part
+    if isinstance(element, MixedElement) and element.num_sub_elements() > 0:
+        return element.extract_subelement_component(component)[0]
+    return 0
+
+
+def compute_form_block_sparsity(form):
+    """Compute which blocks of the test and trial functions of a bilinear
+    form on a mixed space couple.
+
+    Returns a set of pairs (test block, trial block) of the parts of
+    the arguments in a mixed function space, or of the sub elements of
+    a mixed element.
+    """
+    elements = dict((a.number(), a.ufl_element()) for a in form.arguments())
+    pairs = set()
+    for (test_part, test_component), (trial_part, trial_component) in compute_form_sparsity(form):
+        pairs.add((_block_index(elements[0], test_part, test_component),
+                   _block_index(elements[1], trial_part, trial_component)))
+    return pairs
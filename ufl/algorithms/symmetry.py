@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for detecting whether bilinear forms are symmetric, or
+Hermitian in complex mode, such that only half of the element tensors
+need to be computed."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from fractions import Fraction
+
+from ufl.log import error
+from ufl.form import Form
+from ufl.classes import Argument, Zero
+from ufl.corealg.multifunction import MultiFunction
+from ufl.corealg.map_dag import map_expr_dag
+from ufl.corealg.traversal import unique_post_traversal
+from ufl.algorithms.formtransformations import compute_form_adjoint
+from ufl.algorithms.apply_algebra_lowering import apply_algebra_lowering
+from ufl.algorithms.apply_derivatives import apply_derivatives
+from ufl.algorithms.remove_complex_nodes import remove_complex_nodes
+from ufl.algorithms.expand_indices import expand_indices
+
+
+_one = (Fraction(1), Fraction(0))
+
+
+def _mul_scalars(a, b):
+    return (a[0]*b[0] - a[1]*b[1], a[0]*b[1] + a[1]*b[0])
+
+
+def _add_to(poly, monomial, c):
+    c0 = poly.get(monomial)
+    if c0 is not None:
+        c = (c0[0] + c[0], c0[1] + c[1])
+    if c == (0, 0):
+        poly.pop(monomial, None)
+    else:
+        poly[monomial] = c
+
+
+def _monomial(factors):
+    return tuple(sorted(factors, key=hash))
+
+
+def _freeze(op):
+    if isinstance(op, dict):
+        return frozenset(op.items())
+    return op
+
+
+def _conj_atom(atom):
+    if atom[0] == "conj":
+        return atom[1]
+    elif atom[0] in ("real", "imag", "abs"):
+        return atom
+    return ("conj", atom)
+
+
+class CanonicalPolynomial(MultiFunction):
+    """Expand an index free scalar expression into a polynomial in
+    canonical form.
+
+    The polynomial is a dict from monomials to exact complex
+    coefficients, given as pairs of Fractions. A monomial is a sorted
+    tuple of atoms, which are terminals or nonpolynomial operators
+    with their operands in canonical form. Products are multiplied out
+    and complex conjugates propagated to the atoms, such that equal
+    polynomials imply equal expressions, while equal expressions may
+    have different polynomials."""
+
+    def __init__(self):
+        MultiFunction.__init__(self)
+        self._has_arguments = {}
+        self._visited = set()
+
+    def _depends_on_arguments(self, o):
+        "Return whether o contains an Argument, memoized for all subexpressions."
+        has_arguments = self._has_arguments
+        for e in unique_post_traversal(o, self._visited):
+            has_arguments[e] = isinstance(e, Argument) or \
+                any(has_arguments[op] for op in e.ufl_operands)
+        return has_arguments[o]
+
+    def _atom(self, atom):
+        return {(atom,): _one}
+
+    def terminal(self, o):
+        return self._atom(("terminal", repr(o)))
+
+    def zero(self, o):
+        return {}
+
+    def scalar_value(self, o):
+        v = complex(o.value())
+        return {(): (Fraction(v.real), Fraction(v.imag))}
+
+    def multi_index(self, o):
+        return ("multi_index", repr(o))
+
+    def expr(self, o, *ops):
+        return self._atom((o._ufl_handler_name_,) + tuple(_freeze(op) for op in ops))
+
+    def sum(self, o, a, b):
+        r = dict(a)
+        for m, c in b.items():
+            _add_to(r, m, c)
+        return r
+
+    def product(self, o, a, b):
+        r = {}
+        for ma, ca in a.items():
+            for mb, cb in b.items():
+                _add_to(r, _monomial(ma + mb), _mul_scalars(ca, cb))
+        return r
+
+    def division(self, o, a, b):
+        if len(b) == 1 and () in b:
+            # Division by a nonzero number
+            re, im = b[()]
+            d = re*re + im*im
+            return self.product(o, a, {(): (re/d, -im/d)})
+        if not self._depends_on_arguments(o.ufl_operands[1]):
+            # Keep the argument factors of the numerator visible by
+            # multiplying with the reciprocal of the denominator
+            return self.product(o, a, self._atom(("reciprocal", _freeze(b))))
+        return self.expr(o, a, b)
+
+    def conj(self, o, a):
+        r = {}
+        for m, (re, im) in a.items():
+            _add_to(r, _monomial(_conj_atom(atom) for atom in m), (re, -im))
+        return r
+
+
+def _canonical_polynomial(integrand, complex_mode):
+    if not complex_mode:
+        integrand = remove_complex_nodes(integrand)
+    integrand = expand_indices(integrand)
+    return map_expr_dag(CanonicalPolynomial(), integrand, compress=False)
+
+
+def _is_symmetric_integral(integral, complex_mode):
+    form = Form([integral])
+    arguments = form.arguments()
+    if len(arguments) != 2:
+        error("Expecting bilinear form.")
+    if arguments[0].ufl_function_space() != arguments[1].ufl_function_space():
+        return False
+
+    adjoint = compute_form_adjoint(form)
+    integrands = []
+    for f in (form, adjoint):
+        f = apply_algebra_lowering(f)
+        f = apply_derivatives(f)
+        f_integrands = [itg.integrand() for itg in f.integrals()]
+        if f_integrands:
+            integrands.append(sum(f_integrands[1:], f_integrands[0]))
+        else:
+            integrands.append(Zero())
+    return (_canonical_polynomial(integrands[0], complex_mode) ==
+            _canonical_polynomial(integrands[1], complex_mode))
+
+
+def compute_form_symmetry(form, complex_mode=False):
+    """Determine which integrals of a bilinear form are symmetric.
+
+    Returns a dict mapping each integral of the form to True if the
+    integral is unchanged by swapping its test and trial functions, or
+    in complex mode if it is unchanged by swapping them and taking the
+    complex conjugate, i.e. if its element tensors are Hermitian.
+
+    The integrand and its adjoint are compared after lowering
+    compound operators, applying derivatives and expanding indices,
+    up to reordering of sums and products. The detection is
+    conservative, a symmetric integral may be reported as not
+    symmetric if it can only be shown to be symmetric by other
+    algebraic manipulations.
+    """
+    if not isinstance(form, Form):
+        error("Expecting a Form.")
+    return dict((itg, _is_symmetric_integral(itg, complex_mode))
+                for itg in form.integrals())
+
+
+def is_symmetric_form(form, complex_mode=False):
+    """Return True if all integrals of the bilinear form are symmetric,
+    or Hermitian in complex mode, see compute_form_symmetry."""
+    return all(compute_form_symmetry(form, complex_mode).values())
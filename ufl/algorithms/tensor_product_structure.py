@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Algorithms for detecting whether the argument factors of integrands
+on quadrilateral, hexahedral and tensor product cells separate into
+products of one dimensional factors, such that form compilers can
+generate sum factorized kernels."""
+
+# This file is part of UFL (https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+from ufl.log import error
+from ufl.cell import TensorProductCell
+from ufl.classes import Argument, Conj, Indexed, ReferenceGrad, ReferenceValue
+from ufl.classes import PositiveRestricted, NegativeRestricted
+from ufl.finiteelement import FiniteElement, MixedElement, TensorProductElement
+from ufl.algorithms.argument_factorization import compute_integral_data_factorizations
+
+
+# Families of elements on quadrilaterals and hexahedra which are
+# tensor products of the given interval families
+_interval_families = {"Q": "Lagrange",
+                      "DQ": "Discontinuous Lagrange",
+                      "DQ L2": "Discontinuous Lagrange L2"}
+
+
+def _is_tensor_product_cell(cell):
+    return cell.cellname() in ("quadrilateral", "hexahedron") or isinstance(cell, TensorProductCell)
+
+
+def _interval_factors(element):
+    """Return the interval elements whose tensor product gives the
+    reference basis of the scalar element, one for each reference
+    direction, or None if the element is not of tensor product
+    form."""
+    if isinstance(element, TensorProductElement):
+        factors = []
+        for sub_element in element.sub_elements():
+            sub_factors = _interval_factors(sub_element)
+            if sub_factors is None:
+                return None
+            factors.extend(sub_factors)
+        return tuple(factors)
+    if type(element) != FiniteElement or element.reference_value_shape() != ():
+        return None
+    cellname = element.cell().cellname()
+    if cellname == "interval":
+        return (element,)
+    family = _interval_families.get(element.family())
+    if family is None or cellname not in ("quadrilateral", "hexahedron"):
+        return None
+    interval = FiniteElement(family, "interval", element.degree())
+    return (interval,) * element.cell().topological_dimension()
+
+
+def extract_tensor_product_factors(factor):
+    """Determine whether a scalar argument factor separates into a
+    product of one dimensional factors.
+
+    The factor is a component of an argument with reference values,
+    reference gradients and restrictions applied, as the argument
+    factors of compute_argument_factorization after function pullbacks
+    and geometry lowering.
+
+    Returns a tuple with a pair (element, number of derivatives) for
+    each reference direction of the cell, where element is the
+    interval element whose basis functions give the factor in that
+    direction, or None if the factor does not separate, e.g. for
+    physical derivatives, elements that are not of tensor product
+    form, or non-identity mappings without reference values.
+    """
+    if isinstance(factor, Conj):
+        factor, = factor.ufl_operands
+    if isinstance(factor, Indexed):
+        factor, multiindex = factor.ufl_operands
+        component = tuple(int(i) for i in multiindex)
+    else:
+        component = ()
+    if len(component) != len(factor.ufl_shape):
+        error("Expecting a scalar argument factor.")
+
+    # Walk the modifiers down to the argument
+    num_derivatives = 0
+    reference_value = False
+    t = factor
+    while not t._ufl_is_terminal_:
+        if isinstance(t, ReferenceGrad):
+            num_derivatives += 1
+        elif isinstance(t, ReferenceValue):
+            reference_value = True
+        elif not isinstance(t, (PositiveRestricted, NegativeRestricted)):
+            return None
+        t, = t.ufl_operands
+    if not isinstance(t, Argument):
+        error("Expecting an argument factor, not %s." % t._ufl_class_.__name__)
+
+    # The trailing indices of the component are the reference
+    # directions of the derivatives
+    n = len(component) - num_derivatives
+    value_component, directions = component[:n], component[n:]
+    element = t.ufl_element()
+    if reference_value:
+        if isinstance(element, MixedElement) and element.num_sub_elements() > 0:
+            value_component, element = element.extract_reference_component(value_component)
+    else:
+        if element.mapping() != "identity":
+            return None
+        if isinstance(element, MixedElement) and element.num_sub_elements() > 0:
+            value_component, element = element.extract_component(value_component)
+
+    factors = _interval_factors(element)
+    if factors is None or len(factors) != t.ufl_domain().topological_dimension():
+        return None
+    return tuple((e, directions.count(d)) for d, e in enumerate(factors))
+
+
+def compute_integral_data_tensor_product_factors(integral_data):
+    """Return the tensor product factors of the argument factors of the
+    integrands of integral_data, see extract_tensor_product_factors.
+
+    Returns a list with a dict for each integral, in the same order,
+    mapping each argument factor of compute_integral_data_factorizations
+    to its tuple of one dimensional factors, or None if it does not
+    separate. The result is computed once and cached on the integral
+    data.
+    """
+    if integral_data.tensor_product_factors is None:
+        results = {}
+        tensor_product_factors = []
+        for factorization in compute_integral_data_factorizations(integral_data):
+            factors = {}
+            for f in factorization.argument_factors:
+                if f not in results:
+                    results[f] = extract_tensor_product_factors(f)
+                factors[f] = results[f]
+            tensor_product_factors.append(factors)
+        integral_data.tensor_product_factors = tensor_product_factors
+    return integral_data.tensor_product_factors
+
+
+def is_sum_factorizable(integral_data):
+    """Return True if the integral data is on a quadrilateral,
+    hexahedral or tensor product cell and all argument factors of its
+    integrands separate into one dimensional factors, see
+    compute_integral_data_tensor_product_factors.
+
+    The coefficients of the factorizations are assumed to be evaluated
+    at the points of a tensor product quadrature rule.
+    """
+    if not _is_tensor_product_cell(integral_data.domain.ufl_cell()):
+        return False
+    return all(f is not None
+               for factors in compute_integral_data_tensor_product_factors(integral_data)
+               for f in factors.values())
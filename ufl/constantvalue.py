@@ -10,6 +10,7 @@
 # Modified by Anders Logg, 2011.
 # Modified by Massimiliano Leoni, 2016.
 
+from contextlib import contextmanager
 from math import atan2
 
 from ufl.log import error, UFLValueError
@@ -25,6 +26,29 @@ from ufl.checks import is_python_scalar, is_ufl_scalar, is_true_ufl_scalar  # no
 # Precision for float formatting
 precision = None
 
+# Whether operators fold literal operands and fixed index lookups of
+# literal tensors when constructed, see constant_folding
+_constant_folding = False
+
+
+@contextmanager
+def constant_folding():
+    """Context manager making Sum, Product, Division and Indexed fold
+    nested literals and evaluate fixed index lookups of Identity,
+    PermutationSymbol and ListTensor when constructed.
+
+    The setting is process-global: it applies to all expressions
+    constructed while the context is active, also in other threads.
+    Use ufl.algorithms.fold_constants to fold existing expressions.
+    """
+    global _constant_folding
+    enabled = _constant_folding
+    _constant_folding = True
+    try:
+        yield
+    finally:
+        _constant_folding = enabled
+
 
 def format_float(x):
     "Format float value based on global UFL precision."
@@ -14,32 +14,42 @@ from ufl.corealg.traversal import unique_post_traversal, cutoff_unique_post_trav
 from ufl.corealg.multifunction import MultiFunction
 
 
-def map_expr_dag(function, expression, compress=True):
+def map_expr_dag(function, expression, compress=True, vcache=None, rcache=None):
     """Apply a function to each subexpression node in an expression DAG.
 
     If *compress* is ``True`` (default) the output object from
     the function is cached in a ``dict`` and reused such that the
     resulting expression DAG does not contain duplicate objects.
 
+    If *vcache* and *rcache* are given, see ``map_expr_dags``.
+
     Return the result of the final function call.
     """
-    result, = map_expr_dags(function, [expression], compress=compress)
+    result, = map_expr_dags(function, [expression], compress=compress,
+                            vcache=vcache, rcache=rcache)
     return result
 
 
-def map_expr_dags(function, expressions, compress=True):
+def map_expr_dags(function, expressions, compress=True, vcache=None, rcache=None):
     """Apply a function to each subexpression node in an expression DAG.
 
     If *compress* is ``True`` (default) the output object from
     the function is cached in a ``dict`` and reused such that the
     resulting expression DAG does not contain duplicate objects.
 
+    If *vcache* and *rcache* are given, these ``dict`` objects are
+    used for the intermediate and result object caches and are
+    updated in place, such that repeated calls with the same function
+    only apply it once to subexpressions shared between calls.
+
     Return a list with the result of the final function call for each expression.
     """
 
     # Temporary data structures
-    vcache = {}  # expr -> r = function(expr,...),  cache of intermediate results
-    rcache = {}  # r -> r,  cache of result objects for memory reuse
+    if vcache is None:
+        vcache = {}  # expr -> r = function(expr,...),  cache of intermediate results
+    if rcache is None:
+        rcache = {}  # r -> r,  cache of result objects for memory reuse
 
     # Build mapping typecode:bool, for which types to skip the subtree of
     if isinstance(function, MultiFunction):
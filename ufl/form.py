@@ -11,7 +11,6 @@
 # Modified by Massimiliano Leoni, 2016.
 # Modified by Cecile Daversin-Catty, 2018.
 
-from itertools import chain
 from collections import defaultdict
 
 from ufl.log import error, warning
@@ -69,11 +68,24 @@ def _sorted_integrals(integrals):
     return tuple(all_integrals)  # integrals_dict
 
 
+def _form_sum(terms):
+    """Return a form for the sum of the given (weight, form) terms, where
+    a weight of None denotes 1. The integrals are only collected when
+    requested, such that building a sum of many forms term by term
+    takes linear time."""
+    form = Form(())
+    form._integrals = None
+    form._terms = terms
+    return form
+
+
 class Form(object):
     """Description of a weak form consisting of a sum of integrals over subdomains."""
     __slots__ = (
         # --- List of Integral objects (a Form is a sum of these Integrals, everything else is derived)
         "_integrals",
+        # --- Weighted forms of a sum of forms whose integrals have not yet been collected
+        "_terms",
         # --- Internal variables for caching various data
         "_integration_domains",
         "_domain_numbering",
@@ -99,6 +111,7 @@ class Form(object):
         # Store integrals sorted canonically to increase signature
         # stability
         self._integrals = _sorted_integrals(integrals)
+        self._terms = None
 
         # Internal variables for caching domain data
         self._integration_domains = None
@@ -112,8 +125,7 @@ class Form(object):
         self._coefficients = None
         self._coefficient_numbering = None
 
-        from ufl.algorithms.analysis import extract_constants
-        self._constants = extract_constants(self)
+        self._constants = None
 
         # Internal variables for caching of hash and signature after
         # first request
@@ -127,6 +139,8 @@ class Form(object):
 
     def integrals(self):
         "Return a sequence of all integrals in form."
+        if self._integrals is None:
+            self._collect_integrals()
         return self._integrals
 
     def integrals_by_type(self, integral_type):
@@ -235,6 +249,9 @@ class Form(object):
         return self._coefficient_numbering
 
     def constants(self):
+        if self._constants is None:
+            from ufl.algorithms.analysis import extract_constants
+            self._constants = extract_constants(self)
         return self._constants
 
     def signature(self):
@@ -268,11 +285,11 @@ class Form(object):
         "Evaluate ``bool(lhs_form == rhs_form)``."
         if type(other) != Form:
             return False
-        if len(self._integrals) != len(other._integrals):
+        if len(self.integrals()) != len(other.integrals()):
             return False
         if hash(self) != hash(other):
             return False
-        return all(a == b for a, b in zip(self._integrals, other._integrals))
+        return all(a == b for a, b in zip(self.integrals(), other.integrals()))
 
     def __radd__(self, other):
         # Ordering of form additions make no difference
@@ -280,8 +297,8 @@ class Form(object):
 
     def __add__(self, other):
         if isinstance(other, Form):
-            # Add integrals from both forms
-            return Form(list(chain(self.integrals(), other.integrals())))
+            # Add integrals from both forms when requested
+            return _form_sum(((None, self), (None, other)))
 
         elif isinstance(other, (int, float)) and other == 0:
             # Allow adding 0 or 0.0 as a no-op, needed for sum([a,b])
@@ -310,13 +327,13 @@ class Form(object):
 
         This enables the handy "-form" syntax for e.g. the
         linearized system (J, -F) from a nonlinear form F."""
-        return Form([-itg for itg in self.integrals()])
+        return _form_sum(((-1, self),))
 
     def __rmul__(self, scalar):
         "Multiply all integrals in form with constant scalar value."
         # This enables the handy "0*form" or "dt*form" syntax
         if is_scalar_constant_expression(scalar):
-            return Form([scalar * itg for itg in self.integrals()])
+            return _form_sum(((scalar, self),))
         return NotImplemented
 
     def __mul__(self, coefficient):
@@ -400,12 +417,32 @@ class Form(object):
 
     # --- Analysis functions, precomputation and caching of various quantities
 
+    def _collect_integrals(self):
+        """Collect the integrals of a sum of forms, scaling the
+        integrals of each term by its weights."""
+        integrals = []
+        # Traverse nested sums without recursion, keeping the weights
+        # of each term ordered from the innermost to the outermost
+        stack = [(self, ())]
+        while stack:
+            form, weights = stack.pop()
+            if form._integrals is None:
+                for weight, term in reversed(form._terms):
+                    stack.append((term, weights if weight is None else (weight,) + weights))
+            else:
+                for itg in form._integrals:
+                    for weight in weights:
+                        itg = weight * itg
+                    integrals.append(itg)
+        self._integrals = _sorted_integrals(integrals)
+        self._terms = None
+
     def _analyze_domains(self):
         from ufl.domain import join_domains, sort_domains
 
         # Collect unique integration domains
         integration_domains = join_domains(
-            [itg.ufl_domain() for itg in self._integrals])
+            [itg.ufl_domain() for itg in self.integrals()])
 
         # Make canonically ordered list of the domains
         self._integration_domains = sort_domains(integration_domains)
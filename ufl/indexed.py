@@ -8,7 +8,8 @@
 # SPDX-License-Identifier:    LGPL-3.0-or-later
 
 from ufl.log import error
-from ufl.constantvalue import Zero
+from ufl import constantvalue
+from ufl.constantvalue import Zero, Identity, PermutationSymbol
 from ufl.core.expr import Expr, ufl_err_str
 from ufl.core.ufl_type import ufl_type
 from ufl.core.operator import Operator
@@ -19,6 +20,28 @@ from ufl.precedence import parstr
 
 # --- Indexed expression ---
 
+def _fixed_component(expression, multiindex):
+    """Return the component of an Identity, PermutationSymbol or
+    ListTensor for a multiindex of fixed indices, or None."""
+    if not isinstance(multiindex, MultiIndex) or \
+       not all(isinstance(i, FixedIndex) for i in multiindex) or \
+       len(multiindex) != len(getattr(expression, "ufl_shape", ())) or \
+       any(int(i) >= d for i, d in zip(multiindex, expression.ufl_shape)):
+        return None
+    component = tuple(int(i) for i in multiindex)
+    if isinstance(expression, (Identity, PermutationSymbol)):
+        return expression[component]
+    if expression._ufl_handler_name_ == "list_tensor":
+        n = 0
+        while n < len(component) and expression._ufl_handler_name_ == "list_tensor":
+            expression = expression.ufl_operands[component[n]]
+            n += 1
+        if n == len(component):
+            return expression
+        return Indexed(expression, MultiIndex(multiindex.indices()[n:]))
+    return None
+
+
 @ufl_type(is_shaping=True, num_ops=2, is_terminal_modifier=True)
 class Indexed(Operator):
     __slots__ = (
@@ -42,12 +65,22 @@ class Indexed(Operator):
             else:
                 fi, fid = (), ()
             return Zero(shape=(), free_indices=fi, index_dimensions=fid)
-        else:
-            return Operator.__new__(cls)
 
-    def __init__(self, expression, multiindex):
+        # Evaluate fixed index lookups of literal and listed tensors
+        if constantvalue._constant_folding:
+            component = _fixed_component(expression, multiindex)
+            if component is not None:
+                return component
+
+        # Construction
+        self = Operator.__new__(cls)
+        self._init(expression, multiindex)
+        return self
+
+    def _init(self, expression, multiindex):
+        "Constructor, called by __new__ with already simplified arguments."
         # Store operands
-        Operator.__init__(self, (expression, multiindex))
+        self.ufl_operands = (expression, multiindex)
 
         # Error checking
         if not isinstance(expression, Expr):
@@ -94,6 +127,9 @@ class Indexed(Operator):
         self.ufl_free_indices = fi
         self.ufl_index_dimensions = fid
 
+    def __init__(self, expression, multiindex):
+        Operator.__init__(self)
+
     ufl_shape = ()
 
     def evaluate(self, x, mapping, component, index_values, derivatives=()):